@@ -0,0 +1,35 @@
+"""Add generation_cache table
+
+Revision ID: 20261017_0003
+Revises: 20250824_0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0003'
+down_revision: Union[str, Sequence[str], None] = '20250824_0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - shared cache of generated questions keyed by normalized job title."""
+    op.create_table(
+        'generation_cache',
+        sa.Column('key', sa.String(length=200), primary_key=True),
+        sa.Column('job_title', sa.String(length=50), nullable=False),
+        sa.Column('questions', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_generation_cache_expires_at', 'generation_cache', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop generation_cache."""
+    op.drop_index('ix_generation_cache_expires_at', table_name='generation_cache')
+    op.drop_table('generation_cache')
@@ -0,0 +1,26 @@
+"""Add composite (set_id, id) index for keyset pagination
+
+Revision ID: 20261017_0004
+Revises: 20261017_0003
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0004'
+down_revision: Union[str, Sequence[str], None] = '20261017_0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - index backing GET /api/questions?set_id=..&after=.."""
+    op.create_index('ix_questions_set_id_id', 'questions', ['set_id', 'id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop the keyset index."""
+    op.drop_index('ix_questions_set_id_id', table_name='questions', if_exists=True)
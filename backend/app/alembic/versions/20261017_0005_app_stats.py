@@ -0,0 +1,46 @@
+"""Add app_stats running aggregates table
+
+Revision ID: 20261017_0005
+Revises: 20261017_0004
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0005'
+down_revision: Union[str, Sequence[str], None] = '20261017_0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - single-row counters for /api/stats, seeded from existing data."""
+    op.create_table(
+        'app_stats',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('total_sets', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('total_questions', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('flagged_questions', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('difficulty_sum', sa.Float(), server_default=sa.text('0'), nullable=False),
+        sa.Column('difficulty_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    op.execute("""
+        INSERT INTO app_stats (id, total_sets, total_questions, flagged_questions, difficulty_sum, difficulty_count)
+        SELECT 1,
+               (SELECT COUNT(*) FROM qa_sets),
+               COUNT(*),
+               COUNT(*) FILTER (WHERE flagged),
+               COALESCE(SUM(difficulty), 0),
+               COUNT(difficulty)
+        FROM questions
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop app_stats."""
+    op.drop_table('app_stats')
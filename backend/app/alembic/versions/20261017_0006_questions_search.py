@@ -0,0 +1,35 @@
+"""Add full-text search vector and GIN index on questions
+
+Revision ID: 20261017_0006
+Revises: 20261017_0005
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0006'
+down_revision: Union[str, Sequence[str], None] = '20261017_0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - generated tsvector (text weighted above user_answer) + GIN index."""
+    op.execute("""
+        ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(text, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(user_answer, '')), 'B')
+        ) STORED
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop search index and column."""
+    op.drop_index('ix_questions_search_vector', table_name='questions', if_exists=True)
+    op.execute("ALTER TABLE questions DROP COLUMN IF EXISTS search_vector")
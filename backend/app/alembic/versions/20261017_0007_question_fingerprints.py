@@ -0,0 +1,49 @@
+"""Add near-duplicate fingerprints to questions
+
+Revision ID: 20261017_0007
+Revises: 20261017_0006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0007'
+down_revision: Union[str, Sequence[str], None] = '20261017_0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - content hash, duplicate link and MinHash LSH buckets.
+
+    Existing rows are fingerprinted afterwards with `python -m app.dedup backfill`.
+    """
+    op.add_column('questions', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('questions', sa.Column('duplicate_of', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_questions_duplicate_of', 'questions', 'questions', ['duplicate_of'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_questions_content_hash', 'questions', ['content_hash'])
+    op.create_index('ix_questions_duplicate_of', 'questions', ['duplicate_of'])
+
+    op.create_table(
+        'question_lsh_buckets',
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id', ondelete='CASCADE'), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'question_id'),
+    )
+    op.create_index('ix_question_lsh_buckets_question_id', 'question_lsh_buckets', ['question_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop fingerprints."""
+    op.drop_index('ix_question_lsh_buckets_question_id', table_name='question_lsh_buckets')
+    op.drop_table('question_lsh_buckets')
+    op.drop_index('ix_questions_duplicate_of', table_name='questions')
+    op.drop_index('ix_questions_content_hash', table_name='questions')
+    op.drop_constraint('fk_questions_duplicate_of', 'questions', type_='foreignkey')
+    op.drop_column('questions', 'duplicate_of')
+    op.drop_column('questions', 'content_hash')
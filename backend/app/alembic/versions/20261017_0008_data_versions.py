@@ -0,0 +1,28 @@
+"""Add version counters to app_stats and qa_sets for ETags
+
+Revision ID: 20261017_0008
+Revises: 20261017_0007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0008'
+down_revision: Union[str, Sequence[str], None] = '20261017_0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - global and per-set data versions bumped by the write endpoints."""
+    op.add_column('app_stats', sa.Column('version', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+    op.add_column('qa_sets', sa.Column('version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop the version counters."""
+    op.drop_column('qa_sets', 'version')
+    op.drop_column('app_stats', 'version')
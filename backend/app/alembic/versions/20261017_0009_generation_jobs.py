@@ -0,0 +1,47 @@
+"""Add generation_jobs table for asynchronous generation
+
+Revision ID: 20261017_0009
+Revises: 20261017_0008
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0009'
+down_revision: Union[str, Sequence[str], None] = '20261017_0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - durable generation jobs claimed by workers with SKIP LOCKED."""
+    op.create_table(
+        'generation_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job_title', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=True),
+        sa.Column('save', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='queued', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('locked_by', sa.String(length=64), nullable=True),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('questions', sa.JSON(), nullable=True),
+        sa.Column('set_id', sa.Integer(), sa.ForeignKey('qa_sets.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint(
+            "status IN ('queued', 'running', 'succeeded', 'failed')", name='ck_generation_jobs_status',
+        ),
+    )
+    op.create_index('ix_generation_jobs_status_run_after', 'generation_jobs', ['status', 'run_after'])
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop generation_jobs."""
+    op.drop_index('ix_generation_jobs_status_run_after', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
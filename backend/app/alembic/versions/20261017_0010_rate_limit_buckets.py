@@ -0,0 +1,34 @@
+"""Add rate_limit_buckets table for the shared rate limiter backend
+
+Revision ID: 20261017_0010
+Revises: 20261017_0009
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0010'
+down_revision: Union[str, Sequence[str], None] = '20261017_0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - token buckets shared across workers (RATE_LIMIT_BACKEND=db)."""
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('key', sa.String(length=200), primary_key=True),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.Column('allowed', sa.Boolean(), nullable=False),
+    )
+    op.create_index('ix_rate_limit_buckets_updated_at', 'rate_limit_buckets', ['updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop rate_limit_buckets."""
+    op.drop_index('ix_rate_limit_buckets_updated_at', table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,51 @@
+"""Add practice scheduling columns and priority indexes to questions
+
+Revision ID: 20261017_0011
+Revises: 20261017_0010
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_0011'
+down_revision: Union[str, Sequence[str], None] = '20261017_0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - practice state and the precomputed priority behind GET /api/practice/next.
+
+    No question has been practiced yet, so the backfill only applies the flagged,
+    answered and difficulty offsets (the constants in app.practice).
+    """
+    op.add_column('questions', sa.Column('practiced_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('questions', sa.Column('practice_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('questions', sa.Column('practice_streak', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('questions', sa.Column('practice_due_at', sa.Float(), nullable=True))
+    op.add_column('questions', sa.Column('practice_priority', sa.Float(), server_default=sa.text('0'), nullable=False))
+
+    op.execute("""
+        UPDATE questions SET practice_priority =
+            - CASE WHEN flagged THEN 21600 ELSE 0 END
+            + CASE WHEN COALESCE(LENGTH(user_answer), 0) > 0 THEN 10800 ELSE 0 END
+            - (COALESCE(difficulty, 3) - 3) * 3600
+        WHERE flagged OR user_answer IS NOT NULL OR difficulty IS NOT NULL
+    """)
+
+    op.create_index('ix_questions_set_practice_priority', 'questions', ['set_id', 'practice_priority', 'id'])
+    op.create_index('ix_questions_practice_priority', 'questions', ['practice_priority', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema - drop practice scheduling."""
+    op.drop_index('ix_questions_practice_priority', table_name='questions')
+    op.drop_index('ix_questions_set_practice_priority', table_name='questions')
+    op.drop_column('questions', 'practice_priority')
+    op.drop_column('questions', 'practice_due_at')
+    op.drop_column('questions', 'practice_streak')
+    op.drop_column('questions', 'practice_count')
+    op.drop_column('questions', 'practiced_at')
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import re
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.llm import _fallback_questions, async_generator, generate_questions
+
+# Token-level synonyms applied after lower-casing and stripping punctuation,
+# so "Sr. Backend Dev" and "senior back-end developer" share one cache entry.
+SYNONYMS: Dict[str, str] = {
+    "dev": "developer",
+    "devs": "developer",
+    "developers": "developer",
+    "programmer": "developer",
+    "eng": "engineer",
+    "engr": "engineer",
+    "engineers": "engineer",
+    "sr": "senior",
+    "snr": "senior",
+    "jr": "junior",
+    "jnr": "junior",
+    "mgr": "manager",
+    "swe": "software engineer",
+    "sde": "software engineer",
+    "backend": "back end",
+    "frontend": "front end",
+    "fullstack": "full stack",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "qa": "quality assurance",
+    "ui": "user interface",
+    "ux": "user experience",
+    "devops": "dev ops",
+    "js": "javascript",
+    "ts": "typescript",
+}
+
+_PUNCT_RE = re.compile(r"[^\w\s+#]")
+
+
+def normalize_job_title(job_title: str) -> str:
+    """Canonical cache key for a job title (case, whitespace, punctuation, synonyms)."""
+    # "-" and "/" separate words ("back-end", "dev/ops"); keep + and # for C++/C#
+    cleaned = _PUNCT_RE.sub(" ", job_title.lower().replace("_", " "))
+    tokens = []
+    for tok in cleaned.split():
+        tokens.extend(SYNONYMS.get(tok, tok).split())
+    return " ".join(tokens)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL and hit/miss/eviction counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class GenerationCache:
+    """
+    Two-level cache in front of generate_questions:
+    in-process LRU (hot entries) -> generation_cache table (shared, survives restarts) -> LLM.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float,
+                 generator: Callable[[str], List[Dict]] = generate_questions,
+                 agenerator: Optional[Callable[[str, str], Awaitable[List[Dict]]]] = None):
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.generator = generator
+        # async path: (job_title, normalized key) -> questions; defaults to the coalescing generator
+        self.agenerator = agenerator or (lambda title, key: async_generator.generate(title, key=key))
+        self.db_hits = 0
+        self.db_misses = 0
+        self.llm_calls = 0
+
+    def lookup(self, db: Optional[Session], job_title: str) -> Optional[List[Dict]]:
+        key = normalize_job_title(job_title)
+        questions = self.memory.get(key)
+        if questions is not None:
+            return questions
+        if db is None:
+            return None
+        return self._lookup_db(db, key)
+
+    def _lookup_db(self, db: Session, key: str) -> Optional[List[Dict]]:
+        now = datetime.now(timezone.utc)
+        try:
+            row = (
+                db.query(models.GenerationCache)
+                .filter(models.GenerationCache.key == key, models.GenerationCache.expires_at > now)
+                .first()
+            )
+        except SQLAlchemyError:
+            db.rollback()
+            row = None
+        if row is None:
+            self.db_misses += 1
+            return None
+        self.db_hits += 1
+        remaining = (_as_utc(row.expires_at) - now).total_seconds()
+        self.memory.set(key, row.questions, ttl_seconds=min(self.ttl_seconds, remaining))
+        return row.questions
+
+    def store(self, db: Optional[Session], job_title: str, questions: List[Dict]) -> None:
+        # Never pin a degraded answer: fallback output is only what we return on failure.
+        if not questions or questions == _fallback_questions(job_title):
+            return
+        key = normalize_job_title(job_title)
+        self.memory.set(key, questions)
+        if db is None:
+            return
+
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        try:
+            db.merge(models.GenerationCache(
+                key=key, job_title=job_title, questions=questions, expires_at=expires_at,
+            ))
+            db.commit()
+        except SQLAlchemyError:
+            # Another worker may have inserted the same key concurrently; theirs is as good as ours.
+            db.rollback()
+
+    def get_or_generate(self, db: Optional[Session], job_title: str) -> List[Dict]:
+        questions = self.lookup(db, job_title)
+        if questions is not None:
+            return questions
+        self.llm_calls += 1
+        questions = self.generator(job_title)
+        self.store(db, job_title, questions)
+        return questions
+
+    async def alookup(self, db: Optional[AsyncSession], job_title: str) -> Optional[List[Dict]]:
+        key = normalize_job_title(job_title)
+        questions = self.memory.get(key)
+        if questions is not None or db is None:
+            return questions
+        return await db.run_sync(self._lookup_db, key)
+
+    async def astore(self, db: Optional[AsyncSession], job_title: str, questions: List[Dict]) -> None:
+        if db is None:
+            self.store(None, job_title, questions)
+        else:
+            await db.run_sync(self.store, job_title, questions)
+
+    async def aget_or_generate(self, db: Optional[AsyncSession], job_title: str,
+                               agenerator: Optional[Callable[[str, str], Awaitable[List[Dict]]]] = None) -> List[Dict]:
+        questions = await self.alookup(db, job_title)
+        if questions is not None:
+            return questions
+        self.llm_calls += 1
+        questions = await (agenerator or self.agenerator)(job_title, normalize_job_title(job_title))
+        await self.astore(db, job_title, questions)
+        return questions
+
+    def clear(self, db: Optional[Session] = None) -> None:
+        self.memory.clear()
+        if db is not None:
+            db.query(models.GenerationCache).delete()
+            db.commit()
+
+    def stats(self) -> Dict:
+        return {
+            **self.memory.stats(),
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+            "llm_calls": self.llm_calls,
+        }
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything we write is UTC.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+generation_cache = GenerationCache(
+    max_entries=settings.generation_cache_max_entries,
+    ttl_seconds=settings.generation_cache_ttl_seconds,
+)
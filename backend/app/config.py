@@ -6,4 +6,141 @@ class Settings(BaseModel):
     gemini_api_key: str | None = os.getenv("GEMINI_API_KEY")
     cors_origins: str = os.getenv("CORS_ORIGINS", "http://localhost:3001")
 
+    # Connection pools (Postgres; applied to both the async request engine and the sync
+    # engine used by Alembic/scripts). DB_STATEMENT_TIMEOUT_MS=0 disables the timeout.
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout_seconds: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    db_pool_recycle_seconds: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    db_statement_timeout_ms: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+    # Read replicas (comma-separated sync URLs) for read-only routes; a failed replica is skipped
+    # for REPLICA_RETRY_SECONDS, and clients read from the primary for REPLICA_PIN_SECONDS after a write
+    database_replica_urls: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    replica_retry_seconds: float = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+    replica_pin_seconds: int = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+    # Generation cache (in-process LRU backed by the generation_cache table)
+    generation_cache_enabled: bool = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+    generation_cache_ttl_seconds: int = int(os.getenv("GENERATION_CACHE_TTL_SECONDS", "86400"))
+    generation_cache_max_entries: int = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1024"))
+
+    # LLM generation: "gemini" or "stub" (local, offline provider for tests and load tests)
+    llm_provider: str = os.getenv("LLM_PROVIDER", "gemini")
+    llm_stub_latency_ms: int = int(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+    llm_timeout_seconds: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_coalesce: bool = os.getenv("LLM_COALESCE", "true").lower() == "true"
+
+    # Provider routing: LLM_PROVIDERS lists providers in preference order (default: LLM_PROVIDER).
+    # A provider's circuit opens after LLM_BREAKER_FAILURES consecutive failures and fails fast for
+    # LLM_BREAKER_RESET_SECONDS; providers above LLM_ROUTE_MAX_ERROR_RATE over their last
+    # LLM_STATS_WINDOW calls are tried last. Each attempt is capped at LLM_CALL_TIMEOUT_SECONDS
+    # (keep it below LLM_TIMEOUT_SECONDS so a hanging provider counts as a failure and fails over).
+    # LLM_HEDGE_ENABLED starts the next provider when the first hasn't answered by its p95
+    # latency (LLM_HEDGE_DELAY_MS until it has LLM_HEDGE_MIN_SAMPLES successful calls).
+    llm_providers: str = os.getenv("LLM_PROVIDERS", "")
+    llm_gemini_model: str = os.getenv("LLM_GEMINI_MODEL", "gemini-1.5-flash")
+    llm_call_timeout_seconds: float = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "15"))
+    llm_breaker_failures: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    llm_breaker_reset_seconds: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    llm_route_max_error_rate: float = float(os.getenv("LLM_ROUTE_MAX_ERROR_RATE", "0.5"))
+    llm_stats_window: int = int(os.getenv("LLM_STATS_WINDOW", "100"))
+    llm_hedge_enabled: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    llm_hedge_delay_ms: float = float(os.getenv("LLM_HEDGE_DELAY_MS", "2000"))
+    llm_hedge_min_samples: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+    # Provider clients are created once in the app lifespan; LLM_WARMUP also makes a cheap call
+    # (Gemini: count_tokens) so the first request doesn't pay connection setup. Timings on /api/llm/stats.
+    llm_warmup: bool = os.getenv("LLM_WARMUP", "true").lower() == "true"
+
+    # "Similar questions" index: hashed TF-IDF vectors (SIMILAR_DIM floats per question) built in the
+    # background at startup. With SIMILAR_INDEX_DIR set they are kept in memory-mapped files there, so a
+    # restart only embeds what changed; empty keeps the index in memory. Requests wait at most
+    # SIMILAR_WAIT_SECONDS for the initial build, then get a 503.
+    similar_enabled: bool = os.getenv("SIMILAR_ENABLED", "true").lower() == "true"
+    similar_index_dir: str = os.getenv("SIMILAR_INDEX_DIR", "")
+    similar_dim: int = int(os.getenv("SIMILAR_DIM", "256"))
+    similar_wait_seconds: float = float(os.getenv("SIMILAR_WAIT_SECONDS", "5"))
+
+    # Practice scheduler: a correct answer makes a question due again after
+    # PRACTICE_BASE_INTERVAL_HOURS * 2^(streak - 1) (capped), an incorrect one after PRACTICE_RETRY_MINUTES
+    practice_base_interval_hours: float = float(os.getenv("PRACTICE_BASE_INTERVAL_HOURS", "24"))
+    practice_max_interval_days: float = float(os.getenv("PRACTICE_MAX_INTERVAL_DAYS", "60"))
+    practice_retry_minutes: float = float(os.getenv("PRACTICE_RETRY_MINUTES", "10"))
+
+    # Background pre-generation pool for the most popular job titles (off by default).
+    # The worker makes at most PREGEN_MAX_CALLS_PER_MINUTE LLM calls and holds at most
+    # PREGEN_MAX_BATCHES batches; it wakes every PREGEN_INTERVAL_SECONDS or when a batch is served.
+    pregen_enabled: bool = os.getenv("PREGEN_ENABLED", "false").lower() == "true"
+    pregen_top_n: int = int(os.getenv("PREGEN_TOP_N", "20"))
+    pregen_batches_per_title: int = int(os.getenv("PREGEN_BATCHES_PER_TITLE", "2"))
+    pregen_max_batches: int = int(os.getenv("PREGEN_MAX_BATCHES", "40"))
+    pregen_max_calls_per_minute: float = float(os.getenv("PREGEN_MAX_CALLS_PER_MINUTE", "6"))
+    pregen_interval_seconds: float = float(os.getenv("PREGEN_INTERVAL_SECONDS", "60"))
+    pregen_popularity_refresh_seconds: float = float(os.getenv("PREGEN_POPULARITY_REFRESH_SECONDS", "600"))
+
+    # Generation jobs (POST /api/generation-jobs): in-process workers per API process (0 = none;
+    # run `python -m app.jobs worker` instead), retries with exponential backoff, reclaim lease
+    jobs_workers: int = int(os.getenv("JOBS_WORKERS", "2"))
+    jobs_poll_seconds: float = float(os.getenv("JOBS_POLL_SECONDS", "2"))
+    jobs_lease_seconds: float = float(os.getenv("JOBS_LEASE_SECONDS", "300"))
+    jobs_max_attempts: int = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    jobs_backoff_seconds: float = float(os.getenv("JOBS_BACKOFF_SECONDS", "5"))
+    jobs_backoff_max_seconds: float = float(os.getenv("JOBS_BACKOFF_MAX_SECONDS", "300"))
+
+    # POST /api/sets/bulk: max sets per request, sets per INSERT batch
+    bulk_max_sets: int = int(os.getenv("BULK_MAX_SETS", "5000"))
+    bulk_batch_size: int = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+    # POST /api/import: valid rows per chunk (one COPY/executemany and commit each), errors listed in the response
+    import_chunk_size: int = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    import_max_errors: int = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+
+    # GET /api/questions/export: rows fetched per server-side cursor batch
+    export_chunk_size: int = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+    # PATCH /api/questions: max edits per request
+    batch_patch_max_items: int = int(os.getenv("BATCH_PATCH_MAX_ITEMS", "500"))
+
+    # Near-duplicate questions on insert: "link" (save, set duplicate_of), "skip" (don't save),
+    # "off" (save without lookup); threshold is the word-shingle Jaccard similarity
+    duplicate_policy: str = os.getenv("DUPLICATE_POLICY", "link")
+    duplicate_threshold: float = float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+
+    # In-process cache of GET /api/questions and /api/stats bodies, keyed by their version ETags
+    response_cache_enabled: bool = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+    response_cache_ttl_seconds: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+    # Admission control (app.ratelimit). ADMISSION_MAX_IN_FLIGHT sheds requests beyond that many
+    # concurrent ones with 503 + Retry-After (0 = unlimited). With RATE_LIMIT_ENABLED, RATE_LIMIT_ROUTES
+    # ("METHOD /path=RATE/PERIOD[:BURST]", comma-separated) gives each client (X-API-Key, else client IP;
+    # X-Forwarded-For only with RATE_LIMIT_TRUST_FORWARDED) a token bucket per route, 429 when empty.
+    # RATE_LIMIT_BACKEND: "memory" (per process) or "db" (rate_limit_buckets, shared by all workers).
+    admission_max_in_flight: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0"))
+    admission_retry_after_seconds: float = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    rate_limit_routes: str = os.getenv(
+        "RATE_LIMIT_ROUTES",
+        "POST /api/questions/generate=10/60:5,"
+        "POST /api/questions/generate/stream=10/60:5,"
+        "GET /api/questions/generate/stream=10/60:5,"
+        "POST /api/generation-jobs=10/60:5,"
+        "POST /api/import=5/60:2",
+    )
+    rate_limit_max_keys: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+    rate_limit_trust_forwarded: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+    # Prometheus metrics on GET /metrics (request latency, DB queries per request, LLM timings)
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Debug: per-request SQL profiler (slow-query log with params, N+1 warnings when one
+    # statement shape repeats >= threshold times, optional X-Query-Count/Server-Timing headers)
+    query_profiler_enabled: bool = os.getenv("QUERY_PROFILER_ENABLED", "false").lower() == "true"
+    query_profiler_slow_ms: float = float(os.getenv("QUERY_PROFILER_SLOW_MS", "100"))
+    query_profiler_n_plus_one_threshold: int = int(os.getenv("QUERY_PROFILER_N_PLUS_ONE_THRESHOLD", "5"))
+    query_profiler_headers: bool = os.getenv("QUERY_PROFILER_HEADERS", "true").lower() == "true"
+
 settings = Settings()
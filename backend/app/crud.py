@@ -0,0 +1,160 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import dedup, models, practice, schemas, stats as app_stats
+from app.config import settings
+
+PATCH_FIELDS = ("user_answer", "difficulty", "flagged")
+
+
+def _insert_returning_ids(db: Session, table, rows: List[Dict]) -> List[int]:
+    """Multi-row INSERT ... RETURNING id; ids come back in `rows` order."""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite can't batch RETURNING with sort_by_parameter_order (SQLAlchemy falls back
+        # to one statement per row), but as a single writer it assigns rowids in VALUES
+        # order, so sorting the returned ids restores payload order.
+        return sorted(r.id for r in db.execute(insert(table).returning(table.c.id), rows))
+    return [r.id for r in db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)]
+
+
+def insert_sets(db: Session, payloads: Sequence[schemas.QASetCreate]) -> List[Dict]:
+    """
+    Insert question sets with set-based statements: one INSERT ... RETURNING for the
+    sets, one for all of their questions and one for their LSH buckets. Near-duplicate
+    questions are linked or skipped according to settings.duplicate_policy.
+    No commit; returns the new sets in payload order, with the (id, text) of each saved question.
+    """
+    if not payloads:
+        return []
+
+    set_ids = insert_set_rows(db, [{"job_title": p.job_title, "name": p.name} for p in payloads])
+    pending = [(set_id, q) for set_id, p in zip(set_ids, payloads) for q in p.questions]
+    fps, matches = dedup_plan(db, [q.question for _, q in pending])
+    question_ids = insert_questions(
+        db, [{"set_id": set_id, "type": models.QuestionType(q.type), "text": q.question} for set_id, q in pending],
+        fps, matches,
+    )
+
+    saved: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+    duplicates: Dict[int, int] = defaultdict(int)
+    for (set_id, q), qid, match in zip(pending, question_ids, matches):
+        if qid is not None:
+            saved[set_id].append((qid, q.question))
+        if match is not None:
+            duplicates[set_id] += 1
+    return [
+        {"id": set_id, "job_title": p.job_title, "name": p.name,
+         "questions": len(saved[set_id]), "duplicates": duplicates[set_id], "saved": saved[set_id]}
+        for set_id, p in zip(set_ids, payloads)
+    ]
+
+
+def insert_set_rows(db: Session, rows: List[Dict]) -> List[int]:
+    """One INSERT ... RETURNING for qa_sets rows ({job_title, name}); ids in row order."""
+    # Core (table-level) inserts: the ORM bulk path splits batches whenever a row
+    # has None for a column ("name"), Core keeps every row in one statement.
+    return _insert_returning_ids(db, models.QASet.__table__, rows) if rows else []
+
+
+def dedup_plan(db: Session, texts: Sequence[str]) -> Tuple[List[dedup.Fingerprint], List[dedup.Match]]:
+    """Fingerprints of questions about to be inserted and, unless the policy is "off", their duplicate matches."""
+    fps = [dedup.fingerprint(t) for t in texts]
+    if settings.duplicate_policy in ("link", "skip") and fps:
+        return fps, dedup.find_duplicates(db, fps)
+    return fps, [None] * len(fps)
+
+
+def insert_questions(db: Session, rows: List[Dict], fps: Sequence[dedup.Fingerprint],
+                     matches: Sequence[dedup.Match]) -> List[Optional[int]]:
+    """
+    Insert question rows (column dicts) following their dedup_plan(): duplicates are
+    linked, or dropped under the "skip" policy, and LSH buckets are saved.
+    No commit; returns the new id of each row, None where it was skipped.
+    """
+    skip = settings.duplicate_policy == "skip"
+    keep = [i for i, m in enumerate(matches) if not (skip and m is not None)]
+    # Position of each kept item among inserted rows, to resolve in-batch links
+    position = {i: n for n, i in enumerate(keep)}
+    question_rows = [
+        {
+            **rows[i],
+            "content_hash": fps[i].content_hash,
+            "duplicate_of": matches[i][1] if matches[i] is not None and matches[i][0] == "db" else None,
+        }
+        for i in keep
+    ]
+    question_ids = _insert_returning_ids(db, models.Question.__table__, question_rows) if question_rows else []
+
+    # In-batch duplicates can only point at their root once it has an id
+    batch_links = [
+        {"b_id": question_ids[position[i]], "b_dup": question_ids[position[matches[i][1]]]}
+        for i in keep if matches[i] is not None and matches[i][0] == "batch"
+    ]
+    if batch_links:
+        questions = models.Question.__table__
+        db.execute(
+            update(questions).where(questions.c.id == bindparam("b_id")).values(duplicate_of=bindparam("b_dup")),
+            batch_links,
+        )
+    dedup.save_buckets(db, question_ids, [fps[i] for i in keep])
+    return [question_ids[position[i]] if i in position else None for i in range(len(rows))]
+
+
+def patch_questions(db: Session, items: Sequence[schemas.QuestionBatchPatchItem]) -> Dict[int, Dict]:
+    """
+    Apply many QuestionPatch edits with set-based UPDATEs: items with identical
+    assignments share one UPDATE ... WHERE id IN (...). No commit; the app_stats
+    delta is applied in the same transaction. Returns {id: row} for updated ids.
+    """
+    questions = models.Question.__table__
+    ids = [item.id for item in items]
+    before = {
+        row.id: row
+        for row in db.execute(
+            select(questions.c.id, questions.c.set_id, questions.c.flagged, questions.c.difficulty)
+            .where(questions.c.id.in_(ids))
+        )
+    }
+
+    groups: Dict[tuple, List[int]] = defaultdict(list)
+    delta = {"flagged": 0, "difficulty_sum": 0.0, "difficulty_count": 0}
+    for item in items:
+        old = before.get(item.id)
+        if old is None:
+            continue
+        # None means "leave unchanged", as in PATCH /api/questions/{qid}
+        values = {f: getattr(item, f) for f in PATCH_FIELDS if getattr(item, f) is not None}
+        if not values:
+            continue
+        groups[tuple(sorted(values.items()))].append(item.id)
+        new_flagged = values.get("flagged", old.flagged)
+        new_difficulty = values.get("difficulty", old.difficulty)
+        for k, v in app_stats.question_delta(old.flagged, old.difficulty, new_flagged, new_difficulty).items():
+            delta[k] += v
+
+    for assignments, group_ids in groups.items():
+        db.execute(update(questions).where(questions.c.id.in_(group_ids)).values(dict(assignments)))
+    if groups:
+        # Separate statement: SET expressions would see the pre-update column values
+        changed = [qid for group_ids in groups.values() for qid in group_ids]
+        db.execute(
+            update(questions).where(questions.c.id.in_(changed)).values(practice_priority=practice.priority_expr())
+        )
+        # Only when something changed: apply_delta bumps the global version behind every ETag
+        app_stats.apply_delta(db, **delta)
+        app_stats.touch_sets(db, (before[qid].set_id for qid in changed))
+
+    if not before:
+        return {}
+    return {
+        row.id: row._asdict()
+        for row in db.execute(
+            select(
+                questions.c.id, questions.c.set_id, questions.c.type, questions.c.text,
+                questions.c.user_answer, questions.c.difficulty, questions.c.flagged,
+            ).where(questions.c.id.in_(list(before)))
+        )
+    }
@@ -1,9 +1,69 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+# Async driver for each sync URL: requests use the async engine, Alembic and the
+# maintenance scripts (python -m app.stats / app.dedup, benchmarks) keep the sync one.
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def engine_options(url: str, is_async: bool) -> dict:
+    if make_url(url).get_backend_name() != "postgresql":
+        # SQLite picks its own pool (singleton/static for :memory:), which takes no sizing
+        return {}
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+    if settings.db_statement_timeout_ms:
+        timeout = str(settings.db_statement_timeout_ms)
+        options["connect_args"] = (
+            {"server_settings": {"statement_timeout": timeout}} if is_async
+            else {"options": f"-c statement_timeout={timeout}"}
+        )
+    return options
+
+
+def enforce_sqlite_foreign_keys(engine) -> None:
+    """
+    SQLite ignores FOREIGN KEY clauses unless each connection turns them on; the
+    ON DELETE CASCADE / SET NULL actions (dedup buckets, duplicate_of) rely on them.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+engine = create_engine(settings.database_url, pool_pre_ping=True, **engine_options(settings.database_url, False))
+enforce_sqlite_foreign_keys(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    async_database_url(settings.database_url), pool_pre_ping=True,
+    **engine_options(settings.database_url, True),
+)
+enforce_sqlite_foreign_keys(async_engine.sync_engine)
+# expire_on_commit=False: handlers serialize rows after commit without lazy reloads,
+# which AsyncSession cannot do implicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def init_db():
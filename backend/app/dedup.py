@@ -0,0 +1,254 @@
+"""
+Near-duplicate detection for questions.
+
+Every question gets a content hash of its normalized text (exact duplicates)
+and MinHash LSH buckets over word unigrams + bigrams (near duplicates), kept in
+the indexed question_lsh_buckets table. A lookup touches only the rows that
+share a bucket, then verifies them with exact Jaccard similarity.
+
+Fingerprint rows saved before this existed with:
+
+    python -m app.dedup backfill
+"""
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+import hashlib
+import random
+import re
+import sys
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+NUM_BANDS = 10
+ROWS_PER_BAND = 3
+_PRIME = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+# Fixed seed: buckets are persisted, so permutations must be stable across processes
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_BANDS * ROWS_PER_BAND)
+]
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Chunk size for IN (...) lists; keeps well under SQLite's bound-parameter limit
+_IN_CHUNK = 900
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    words = normalize_text(text).split()
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def _to_signed64(value: int) -> int:
+    # BIGINT is signed; buckets only need to be stable, not positive
+    value &= _MASK64
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def lsh_buckets(shingle_set: FrozenSet[str]) -> List[int]:
+    """One bucket per band; two texts share a bucket with probability 1-(1-J^r)^b."""
+    if not shingle_set:
+        return []
+    hashes = [_hash64(s) for s in shingle_set]
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        buckets.append(_to_signed64(_hash64(f"{band}:" + ",".join(map(str, rows)))))
+    return buckets
+
+
+@dataclass
+class Fingerprint:
+    content_hash: str
+    shingles: FrozenSet[str]
+    buckets: List[int]
+
+
+def fingerprint(text: str) -> Fingerprint:
+    s = shingles(text)
+    return Fingerprint(content_hash=content_hash(text), shingles=s, buckets=lsh_buckets(s))
+
+
+# A match is ("db", root question id) or ("batch", index of an earlier item in the same batch)
+Match = Optional[Tuple[str, int]]
+
+
+def _chunks(values: Sequence, size: int = _IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def find_duplicates(db: Session, fingerprints: Sequence[Fingerprint],
+                    threshold: Optional[float] = None) -> List[Match]:
+    """
+    For each fingerprint, the closest existing question (or earlier batch item) that is
+    an exact or near duplicate. Links always point at the root of a duplicate group.
+    """
+    threshold = settings.duplicate_threshold if threshold is None else threshold
+    Q = models.Question
+    B = models.QuestionLSHBucket
+
+    exact: Dict[str, int] = {}
+    for chunk in _chunks({fp.content_hash for fp in fingerprints}):
+        for row in db.execute(select(Q.id, Q.duplicate_of, Q.content_hash).where(Q.content_hash.in_(chunk))):
+            root = row.duplicate_of or row.id
+            exact[row.content_hash] = min(root, exact.get(row.content_hash, root))
+
+    # bucket -> [(candidate id, root id, text)]
+    by_bucket: Dict[int, List[Tuple[int, int, str]]] = {}
+    for chunk in _chunks({b for fp in fingerprints for b in fp.buckets}):
+        rows = db.execute(
+            select(B.bucket, Q.id, Q.duplicate_of, Q.text)
+            .join(Q, Q.id == B.question_id)
+            .where(B.bucket.in_(chunk))
+        )
+        for row in rows:
+            by_bucket.setdefault(row.bucket, []).append((row.id, row.duplicate_of or row.id, row.text))
+
+    matches: List[Match] = []
+    batch_hashes: Dict[str, int] = {}
+    batch_buckets: Dict[int, List[int]] = {}
+    shingle_cache: Dict[int, FrozenSet[str]] = {}
+    for i, fp in enumerate(fingerprints):
+        match: Match = None
+        if fp.content_hash in exact:
+            match = ("db", exact[fp.content_hash])
+        elif fp.content_hash in batch_hashes:
+            match = ("batch", batch_hashes[fp.content_hash])
+        else:
+            best_sim, best = -1.0, None
+            for bucket in fp.buckets:
+                for qid, root, text in by_bucket.get(bucket, ()):
+                    if qid not in shingle_cache:
+                        shingle_cache[qid] = shingles(text)
+                    sim = jaccard(fp.shingles, shingle_cache[qid])
+                    if sim > best_sim:
+                        best_sim, best = sim, ("db", root)
+                for j in batch_buckets.get(bucket, ()):
+                    sim = jaccard(fp.shingles, fingerprints[j].shingles)
+                    if sim > best_sim:
+                        best_sim, best = sim, ("batch", j)
+            if best is not None and best_sim >= threshold:
+                match = best
+        matches.append(match)
+
+        # Only group roots are registered for in-batch lookups
+        if match is None:
+            batch_hashes.setdefault(fp.content_hash, i)
+            for bucket in fp.buckets:
+                batch_buckets.setdefault(bucket, []).append(i)
+    return matches
+
+
+def resolve_match(match: Match, batch_ids: Sequence[int]) -> Optional[int]:
+    """duplicate_of value for a match, given the ids assigned to the batch."""
+    if match is None:
+        return None
+    kind, ref = match
+    return ref if kind == "db" else batch_ids[ref]
+
+
+def duplicate_groups(db: Session, set_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
+    """Duplicate groups (root question + linked duplicates), largest groups first."""
+    Q = models.Question
+    counts = select(Q.duplicate_of.label("root"), func.count().label("n")).where(Q.duplicate_of.isnot(None))
+    if set_id is not None:
+        counts = counts.where(Q.set_id == set_id)
+    counts = counts.group_by(Q.duplicate_of).order_by(func.count().desc(), Q.duplicate_of).limit(limit)
+    roots = [row.root for row in db.execute(counts)]
+    if not roots:
+        return []
+
+    members = select(Q).where((Q.id.in_(roots)) | (Q.duplicate_of.in_(roots)))
+    if set_id is not None:
+        members = members.where((Q.id.in_(roots)) | (Q.set_id == set_id))
+    originals: Dict[int, models.Question] = {}
+    duplicates: Dict[int, List[models.Question]] = {root: [] for root in roots}
+    for q in db.scalars(members.order_by(Q.id)):
+        if q.duplicate_of is None:
+            originals[q.id] = q
+        else:
+            duplicates[q.duplicate_of].append(q)
+    return [
+        {"original": originals[root], "duplicates": duplicates[root]}
+        for root in roots if root in originals
+    ]
+
+
+def backfill(db: Session, chunk_size: int = 1000) -> int:
+    """Fingerprint (and, under the link policy, link) rows saved without a content hash."""
+    Q = models.Question
+    done = 0
+    while True:
+        rows = db.execute(
+            select(Q.id, Q.text).where(Q.content_hash.is_(None)).order_by(Q.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return done
+        fps = [fingerprint(row.text) for row in rows]
+        matches = find_duplicates(db, fps) if settings.duplicate_policy == "link" else [None] * len(rows)
+        ids = [row.id for row in rows]
+        table = Q.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(content_hash=bindparam("b_hash"), duplicate_of=bindparam("b_dup")),
+            [
+                {"b_id": qid, "b_hash": fp.content_hash, "b_dup": resolve_match(match, ids)}
+                for qid, fp, match in zip(ids, fps, matches)
+            ],
+        )
+        save_buckets(db, ids, fps)
+        db.commit()
+        done += len(rows)
+
+
+def save_buckets(db: Session, question_ids: Sequence[int], fingerprints: Sequence[Fingerprint]) -> None:
+    rows = [
+        {"bucket": bucket, "question_id": qid}
+        for qid, fp in zip(question_ids, fingerprints)
+        for bucket in set(fp.buckets)
+    ]
+    if rows:
+        db.execute(models.QuestionLSHBucket.__table__.insert(), rows)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["backfill"]:
+        print("usage: python -m app.dedup backfill", file=sys.stderr)
+        return 2
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(f"fingerprinted {backfill(db)} questions")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
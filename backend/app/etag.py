@@ -0,0 +1,66 @@
+"""
+Conditional GET for the hot read endpoints.
+
+ETags are derived from version counters instead of response bodies: the
+global app_stats.version (bumped by every write through stats.apply_delta)
+and qa_sets.version (bumped by stats.touch_sets). Checking If-None-Match costs
+one primary-key lookup and never touches the questions table. With
+RESPONSE_CACHE_ENABLED the serialized body is also kept in-process under the
+same tag, so a changed version is a guaranteed miss.
+"""
+from typing import Optional
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.cache import LRUCache
+from app.config import settings
+from app.stats import STATS_ID
+
+response_cache = LRUCache(settings.response_cache_max_entries, settings.response_cache_ttl_seconds)
+
+
+async def global_version(db: AsyncSession) -> Optional[int]:
+    return await db.scalar(select(models.AppStats.version).where(models.AppStats.id == STATS_ID))
+
+
+async def set_version(db: AsyncSession, set_id: int) -> Optional[int]:
+    return await db.scalar(select(models.QASet.version).where(models.QASet.id == set_id))
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag for a resource at a version; parts include every query parameter."""
+    return '"' + hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()[:24] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2) is the one defined for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _headers(etag: str) -> dict:
+    # no-cache: browsers may store the body but must revalidate, which is what makes 304s happen
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def cached_response(request: Request, etag: str) -> Optional[Response]:
+    """304 if the client already has `etag`, the cached body if we do, else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=_headers(etag))
+    if settings.response_cache_enabled:
+        body = response_cache.get(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=_headers(etag))
+    return None
+
+
+def json_response(etag: str, body: bytes) -> Response:
+    if settings.response_cache_enabled:
+        response_cache.set(etag, body)
+    return Response(content=body, media_type="application/json", headers=_headers(etag))
@@ -0,0 +1,81 @@
+"""
+Streaming export of questions (GET /api/questions/export).
+
+Rows are read through a server-side cursor in EXPORT_CHUNK_SIZE partitions
+and encoded partition by partition, so memory stays flat regardless of table
+size and the first bytes go out as soon as the first partition is read.
+Columns match what POST /api/import accepts, so an export can be re-imported.
+"""
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+COLUMNS = ("id", "set_id", "job_title", "name", "type", "text", "user_answer", "difficulty", "flagged", "created_at")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+async def iter_rows(db: AsyncSession, set_id: Optional[int], chunk_size: int) -> AsyncIterator[List[Dict]]:
+    Q, S = models.Question, models.QASet
+    query = (
+        select(Q.id, Q.set_id, S.job_title, S.name, Q.type, Q.text, Q.user_answer, Q.difficulty, Q.flagged,
+               Q.created_at)
+        .join(S, S.id == Q.set_id)
+        .order_by(Q.id)
+        # yield_per implies stream_results: a server-side cursor where the driver supports one
+        .execution_options(yield_per=chunk_size)
+    )
+    if set_id is not None:
+        query = query.where(Q.set_id == set_id)
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        yield [
+            {
+                "id": r.id, "set_id": r.set_id, "job_title": r.job_title, "name": r.name,
+                "type": r.type.value if hasattr(r.type, "value") else r.type,
+                "text": r.text, "user_answer": r.user_answer, "difficulty": r.difficulty,
+                "flagged": r.flagged, "created_at": r.created_at.isoformat() if r.created_at else None,
+            }
+            for r in partition
+        ]
+
+
+async def encode_ndjson(chunks: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+
+
+async def encode_csv(chunks: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    yield _csv_lines([COLUMNS])
+    async for rows in chunks:
+        yield _csv_lines([["" if row[c] is None else row[c] for c in COLUMNS] for row in rows])
+
+
+def _csv_lines(rows: Iterable) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        # Sync flush per chunk: the client sees progress instead of waiting for zlib's buffer
+        out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
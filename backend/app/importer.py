@@ -0,0 +1,296 @@
+"""
+Streaming bulk import (POST /api/import).
+
+The body (NDJSON, or CSV with a header row; the GET /api/questions/export
+columns) is decoded and parsed as it arrives. Each record is validated on its
+own, and invalid ones are reported by line without stopping the load.
+Consecutive records with the same job_title/name form one set. Valid records
+are written and committed every IMPORT_CHUNK_SIZE rows, so memory stays
+bounded and a late failure keeps earlier chunks:
+
+- Postgres: ids are reserved from the sequences, the chunk is COPYed into a
+  temporary staging table and merged into qa_sets/questions with two
+  INSERT ... SELECT statements; LSH buckets are COPYed directly.
+- Other databases (SQLite): chunked executemany through crud.insert_questions.
+
+Duplicate handling follows DUPLICATE_POLICY, as on every other insert path.
+"""
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import codecs
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud, dedup, models, practice, schemas, similar, stats as app_stats
+from app.config import settings
+
+FORMATS = ("ndjson", "csv")
+
+_STAGING_DDL = """
+CREATE TEMPORARY TABLE IF NOT EXISTS import_staging (
+    id integer,
+    set_id integer NOT NULL,
+    new_set boolean NOT NULL,
+    job_title varchar(50) NOT NULL,
+    name text,
+    type text NOT NULL,
+    text text NOT NULL,
+    user_answer text,
+    difficulty double precision,
+    flagged boolean NOT NULL,
+    content_hash varchar(64),
+    duplicate_of integer,
+    practice_priority double precision NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+_STAGING_COLUMNS = ["id", "set_id", "new_set", "job_title", "name", "type", "text", "user_answer", "difficulty",
+                    "flagged", "content_hash", "duplicate_of", "practice_priority"]
+_MERGE_SETS = """
+INSERT INTO qa_sets (id, job_title, name)
+SELECT DISTINCT ON (set_id) set_id, job_title, name FROM import_staging WHERE new_set ORDER BY set_id
+"""
+_MERGE_QUESTIONS = """
+INSERT INTO questions (id, set_id, type, text, user_answer, difficulty, flagged, content_hash, duplicate_of,
+                       practice_priority)
+SELECT id, set_id, CAST(type AS question_type), text, user_answer, difficulty, flagged, content_hash, duplicate_of,
+       practice_priority
+FROM import_staging WHERE id IS NOT NULL ORDER BY id
+"""
+
+
+def detect_format(content_type: str) -> str:
+    return "csv" if "csv" in content_type.lower() else "ndjson"
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """(1-based line number, text) for each line of a UTF-8 byte stream, as chunks arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buf = ""
+    n = 0
+    async for chunk in stream:
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            n += 1
+            yield n, line.rstrip("\r")
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield n + 1, buf.rstrip("\r")
+
+
+async def parse_ndjson(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Tuple[int, object]]:
+    """(line, dict) per record, or (line, error message) when the line isn't a JSON object."""
+    async for n, line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield n, f"Invalid JSON: {e}"
+            continue
+        yield n, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+async def parse_csv(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Tuple[int, object]]:
+    """Like parse_ndjson for CSV with a header row; quoted fields may span lines."""
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    start = 0
+    async for n, line in lines:
+        if not pending:
+            if not line.strip():
+                continue
+            start = n
+        pending.append(line)
+        # An odd number of quotes so far means a quoted field continues on the next line
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        (row,) = csv.reader(["\n".join(pending)])
+        pending = []
+        if header is None:
+            header = [column.strip() for column in row]
+            continue
+        if len(row) != len(header):
+            yield start, f"Expected {len(header)} fields, got {len(row)}"
+            continue
+        # Empty cells mean "not given", so optional fields take their defaults
+        yield start, {column: value for column, value in zip(header, row) if value != ""}
+    if pending:
+        yield start, "Unterminated quoted field"
+
+
+def _priority(r: schemas.ImportRecord) -> float:
+    return practice.priority(None, r.flagged, r.user_answer, r.difficulty)
+
+
+def validate(record: object) -> schemas.ImportRecord:
+    """ImportRecord for a parsed record; ValueError with a readable message otherwise."""
+    if isinstance(record, str):
+        raise ValueError(record)
+    try:
+        item = schemas.ImportRecord.model_validate(record)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'record'}: {err['msg']}" for err in e.errors()
+        ))
+    if len(item.job_title.strip()) == 0:
+        raise ValueError("Job title cannot be empty")
+    return item
+
+
+class Importer:
+    """Accumulates validated records and writes them chunk by chunk, one commit per chunk."""
+
+    def __init__(self, db: AsyncSession, fmt: str, chunk_size: int, max_errors: int):
+        self.db = db
+        self.format = fmt
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self._pending: List[schemas.ImportRecord] = []
+        # Set of the last written record, so a set spanning chunks stays one set
+        self._set_key: Optional[Tuple[str, Optional[str]]] = None
+        self._set_id: Optional[int] = None
+        self.records = 0
+        self.sets = 0
+        self.questions = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+
+    async def run(self, stream: AsyncIterator[bytes]) -> Dict:
+        parser = parse_csv if self.format == "csv" else parse_ndjson
+        async for line, record in parser(iter_lines(stream)):
+            self.records += 1
+            try:
+                self._pending.append(validate(record))
+            except ValueError as e:
+                self.error(line, str(e))
+                continue
+            if len(self._pending) >= self.chunk_size:
+                await self.flush()
+        await self.flush()
+        return self.summary()
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    async def flush(self) -> None:
+        records, self._pending = self._pending, []
+        if not records:
+            return
+        # Set id per record: the previous chunk's last set, an existing-set continuation, or a new set
+        set_refs: List[int] = []
+        new_sets: List[Dict] = []
+        key, continued = self._set_key, False
+        for r in records:
+            if (r.job_title, r.name) != key:
+                key = (r.job_title, r.name)
+                new_sets.append({"job_title": r.job_title, "name": r.name})
+            elif not new_sets:
+                continued = True
+            set_refs.append(len(new_sets) - 1)  # -1: continues self._set_id
+
+        fps, matches = await self.db.run_sync(crud.dedup_plan, [r.question for r in records])
+        try:
+            if self.db.get_bind().dialect.name == "postgresql":
+                set_ids, question_ids = await self._copy_merge(records, set_refs, new_sets, fps, matches)
+            else:
+                set_ids, question_ids = await self.db.run_sync(
+                    self._executemany, records, set_refs, new_sets, fps, matches,
+                )
+            saved = [r for r, qid in zip(records, question_ids) if qid is not None]
+            await self.db.run_sync(
+                app_stats.apply_delta,
+                sets=len(new_sets),
+                questions=len(saved),
+                flagged=sum(r.flagged for r in saved),
+                difficulty_sum=sum(r.difficulty for r in saved if r.difficulty is not None),
+                difficulty_count=sum(r.difficulty is not None for r in saved),
+            )
+            if continued:
+                await self.db.run_sync(app_stats.touch_sets, [self._set_id])
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        await asyncio.to_thread(similar.index.add, [(qid, r.question) for qid, r in zip(question_ids, records)])
+        if new_sets:
+            self._set_key, self._set_id = key, set_ids[-1]
+        self.sets += len(new_sets)
+        self.questions += len(saved)
+        self.duplicates += sum(m is not None for m in matches)
+
+    def _set_id_for(self, ref: int, set_ids: List[int]) -> int:
+        return self._set_id if ref < 0 else set_ids[ref]
+
+    def _question_row(self, r: schemas.ImportRecord, set_id: int) -> Dict:
+        return {"set_id": set_id, "type": models.QuestionType(r.type), "text": r.question,
+                "user_answer": r.user_answer, "difficulty": r.difficulty, "flagged": r.flagged,
+                "practice_priority": _priority(r)}
+
+    def _executemany(self, session: Session, records, set_refs, new_sets, fps, matches):
+        set_ids = crud.insert_set_rows(session, new_sets)
+        rows = [self._question_row(r, self._set_id_for(ref, set_ids)) for r, ref in zip(records, set_refs)]
+        return set_ids, crud.insert_questions(session, rows, fps, matches)
+
+    async def _reserve_ids(self, table: str, n: int) -> List[int]:
+        if n == 0:
+            return []
+        result = await self.db.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+            {"table": table, "n": n},
+        )
+        return sorted(result.scalars())
+
+    async def _copy_merge(self, records, set_refs, new_sets, fps, matches):
+        # The DDL also opens the transaction the COPYs below run in
+        await self.db.execute(text(_STAGING_DDL))
+        skip = settings.duplicate_policy == "skip"
+        keep = [i for i, m in enumerate(matches) if not (skip and m is not None)]
+        set_ids = await self._reserve_ids("qa_sets", len(new_sets))
+        reserved = iter(await self._reserve_ids("questions", len(keep)))
+        question_ids: List[Optional[int]] = [None] * len(records)
+        for i in keep:
+            question_ids[i] = next(reserved)
+
+        staging = []
+        for i, (r, ref) in enumerate(zip(records, set_refs)):
+            # Ids are known up front, so in-batch duplicates link straight to their root
+            dup = dedup.resolve_match(matches[i], question_ids)
+            staging.append((
+                question_ids[i], self._set_id_for(ref, set_ids), ref >= 0, r.job_title, r.name, r.type,
+                r.question, r.user_answer, r.difficulty, r.flagged, fps[i].content_hash,
+                dup if question_ids[i] is not None else None, _priority(r),
+            ))
+        buckets = [
+            (bucket, question_ids[i]) for i in keep for bucket in set(fps[i].buckets)
+        ]
+
+        conn = await (await self.db.connection()).get_raw_connection()
+        driver = conn.driver_connection  # asyncpg.Connection
+        await driver.copy_records_to_table("import_staging", records=staging, columns=_STAGING_COLUMNS)
+        await self.db.execute(text(_MERGE_SETS))
+        await self.db.execute(text(_MERGE_QUESTIONS))
+        if buckets:
+            await driver.copy_records_to_table(
+                models.QuestionLSHBucket.__tablename__, records=buckets, columns=["bucket", "question_id"],
+            )
+        return set_ids, question_ids
+
+    def summary(self) -> Dict:
+        return {
+            "format": self.format,
+            "records": self.records,
+            "sets": self.sets,
+            "questions": self.questions,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
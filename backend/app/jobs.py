@@ -0,0 +1,260 @@
+"""
+Durable asynchronous generation jobs.
+
+POST /api/generation-jobs stores a row in generation_jobs and returns at once;
+workers claim queued rows, call the LLM with retries and exponential backoff,
+and optionally save the result as a new question set. Claims use
+SELECT ... FOR UPDATE SKIP LOCKED on Postgres; on SQLite (no row locks) a
+guarded UPDATE ... WHERE status = 'queued' decides which worker wins. A job
+whose worker died is requeued with the usual backoff once its lease
+(JOBS_LEASE_SECONDS) expires, or failed if it is out of attempts.
+
+Workers run inside the API process (JOBS_WORKERS per process, started from
+the lifespan) or standalone, scaled independently of the web tier:
+
+    python -m app.jobs worker
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import socket
+import sys
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas, similar, stats as app_stats
+from app.cache import normalize_job_title
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.llm import _fallback_questions, async_generator
+
+logger = logging.getLogger("app.jobs")
+
+J = models.GenerationJob
+S = models.JobStatus
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue(db: AsyncSession, job_title: str, name: Optional[str] = None, save: bool = False) -> models.GenerationJob:
+    now = _now()
+    # Defaults set client-side so the response needs no refresh round trip
+    job = J(job_title=job_title, name=name, save=save, status=S.queued.value, attempts=0,
+            run_after=now, created_at=now)
+    db.add(job)
+    await db.commit()
+    workers.wake()
+    return job
+
+
+def _runnable(now: datetime):
+    return and_(J.status == S.queued.value, J.run_after <= now)
+
+
+async def _expire_leases(db: AsyncSession, now: datetime, lease_seconds: float, max_attempts: int,
+                         backoff_base_seconds: float, backoff_max_seconds: float) -> int:
+    """Settle running jobs whose lease expired (their worker died) like a failed attempt.
+
+    Jobs out of attempts are marked failed; the others are requeued after the
+    same backoff as an ordinary retry. Returns the number of jobs settled; no commit.
+    """
+    expired = and_(J.status == S.running.value, J.locked_at < now - timedelta(seconds=lease_seconds))
+    stmt = select(J.id, J.attempts).where(expired).order_by(J.id).limit(100)
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    settled = 0
+    for job_id, attempts in (await db.execute(stmt)).all():
+        if attempts >= max_attempts:
+            values = dict(status=S.failed.value, error=f"Lease expired after {attempts} attempts", finished_at=now)
+        else:
+            delay = backoff_seconds(attempts, backoff_base_seconds, backoff_max_seconds)
+            values = dict(status=S.queued.value, error="Lease expired", run_after=now + timedelta(seconds=delay))
+        # The repeated WHERE keeps a concurrent worker from settling the same job twice
+        result = await db.execute(
+            update(J).where(J.id == job_id, expired)
+            .values(locked_by=None, locked_at=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        settled += result.rowcount
+    return settled
+
+
+async def claim(db: AsyncSession, worker_id: str, lease_seconds: float, max_attempts: int,
+                backoff_base_seconds: float = 0.0, backoff_max_seconds: float = 0.0) -> Optional[models.GenerationJob]:
+    """Atomically take the oldest runnable job, or None.
+
+    Expired leases are settled first (see _expire_leases), so a reclaimed job
+    waits out its backoff and never runs more than max_attempts times.
+    """
+    now = _now()
+    if await _expire_leases(db, now, lease_seconds, max_attempts, backoff_base_seconds, backoff_max_seconds):
+        await db.commit()
+    runnable = _runnable(now)
+    candidate = select(J.id).where(runnable).order_by(J.id).limit(1)
+    if db.get_bind().dialect.name == "postgresql":
+        candidate = candidate.with_for_update(skip_locked=True)
+    job_id = await db.scalar(candidate)
+    if job_id is None:
+        await db.rollback()
+        return None
+    # On Postgres the row is already locked; on SQLite the repeated WHERE makes the
+    # claim exclusive, since only one writer's UPDATE can still see it runnable
+    result = await db.execute(
+        update(J).where(J.id == job_id, runnable)
+        .values(status=S.running.value, locked_by=worker_id, locked_at=now, attempts=J.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount != 1:
+        return None
+    return await db.get(J, job_id, populate_existing=True)
+
+
+def backoff_seconds(attempts: int, base: float, cap: float) -> float:
+    return min(cap, base * 2 ** max(0, attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+def _save_set(session: Session, job: models.GenerationJob, questions: List[Dict]) -> Dict:
+    payload = schemas.QASetCreate(
+        job_title=job.job_title, name=job.name,
+        questions=[schemas.QuestionCreate(type=q["type"], text=q["text"]) for q in questions],
+    )
+    (row,) = crud.insert_sets(session, [payload])
+    app_stats.apply_delta(session, sets=1, questions=row["questions"])
+    return row
+
+
+class JobWorkers:
+    """A pool of asyncio workers draining generation_jobs."""
+
+    def __init__(self, concurrency: int, poll_seconds: float, lease_seconds: float, max_attempts: int,
+                 backoff_base_seconds: float, backoff_max_seconds: float,
+                 provider: Optional[Callable[[str], Awaitable[List[Dict]]]] = None,
+                 session_factory=AsyncSessionLocal):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        # Same bounded, timeout-guarded path as POST /api/questions/generate
+        self.provider = provider or (lambda title: async_generator.generate(title, key=normalize_job_title(title)))
+        self.session_factory = session_factory
+        self._wake: Optional[asyncio.Event] = None
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run_once(self, worker_id: str) -> bool:
+        """Claim and finish one job; False when nothing was runnable."""
+        async with self.session_factory() as db:
+            job = await claim(db, worker_id, self.lease_seconds, self.max_attempts,
+                              self.backoff_base_seconds, self.backoff_max_seconds)
+        if job is None:
+            return False
+
+        error = None
+        try:
+            questions = await self.provider(job.job_title)
+            # The LLM path degrades to the fallback questions instead of raising
+            if not questions or questions == _fallback_questions(job.job_title):
+                error = "LLM returned no usable questions"
+        except Exception as e:
+            questions, error = None, f"{type(e).__name__}: {e}"
+
+        now = _now()
+        saved = None
+        async with self.session_factory() as db:
+            if error is None:
+                saved = await db.run_sync(_save_set, job, questions) if job.save else None
+                values = dict(status=S.succeeded.value, questions=questions, set_id=saved["id"] if saved else None,
+                              error=None, finished_at=now)
+            elif job.attempts >= self.max_attempts:
+                values = dict(status=S.failed.value, error=error, finished_at=now)
+            else:
+                delay = backoff_seconds(job.attempts, self.backoff_base_seconds, self.backoff_max_seconds)
+                values = dict(status=S.queued.value, error=error, run_after=now + timedelta(seconds=delay))
+            # Only the current lease holder may finish the job; otherwise drop our result
+            result = await db.execute(
+                update(J).where(J.id == job.id, J.locked_by == worker_id, J.status == S.running.value)
+                .values(locked_by=None, locked_at=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                await db.rollback()
+                logger.warning("job %s: lease lost by %s, result discarded", job.id, worker_id)
+                return True
+            await db.commit()
+
+        if saved is not None:
+            await asyncio.to_thread(similar.index.add, saved["saved"])
+        if error is None:
+            self.succeeded += 1
+        elif values["status"] == S.failed.value:
+            self.failed += 1
+        else:
+            self.retried += 1
+        return True
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                if await self.run_once(worker_id):
+                    continue
+            except Exception:
+                logger.exception("job worker %s failed", worker_id)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run(self) -> None:
+        self._wake = asyncio.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        await asyncio.gather(*(self._worker(f"{prefix}:{i}") for i in range(self.concurrency)))
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.concurrency,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+workers = JobWorkers(
+    concurrency=settings.jobs_workers,
+    poll_seconds=settings.jobs_poll_seconds,
+    lease_seconds=settings.jobs_lease_seconds,
+    max_attempts=settings.jobs_max_attempts,
+    backoff_base_seconds=settings.jobs_backoff_seconds,
+    backoff_max_seconds=settings.jobs_backoff_max_seconds,
+)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["worker"]:
+        print("usage: python -m app.jobs worker", file=sys.stderr)
+        return 2
+    logging.basicConfig(level=logging.INFO)
+    if workers.concurrency < 1:
+        workers.concurrency = 1
+    asyncio.run(workers.run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
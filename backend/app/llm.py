@@ -1,9 +1,42 @@
+from app import metrics
 from app.config import settings
-from typing import List, Dict
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
 import json , time , random
+import logging
 
-# Using Google AI Studio (Gemini) via google-generativeai
-# If key is not provided, we return a simple fallback.
+logger = logging.getLogger("app.llm")
+
+# Prompts are built once: the system prompt is a constant and the per-title
+# contents list is memoized, so a call only formats a title it hasn't seen.
+SYSTEM_PROMPT = (
+    "You are generating interview questions. Respond ONLY with valid compact JSON. "
+    'Schema: {"questions": [{"type": "technical|behavioral", "text": "string"}, ...]}. '
+    "No markdown, no backticks, no commentary."
+)
+USER_PROMPT_TEMPLATE = (
+    "Generate 8 interview questions (4 technical, 4 behavioral) for the job title: '{job_title}'. "
+    "Vary difficulty. Use concise phrasing."
+)
+
+
+def _user_prompt(job_title: str) -> str:
+    return USER_PROMPT_TEMPLATE.format(job_title=job_title)
+
+
+@lru_cache(maxsize=2048)
+def _contents(job_title: str) -> Tuple[str, str]:
+    return SYSTEM_PROMPT, _user_prompt(job_title)
+
+
+# Last (source, question) pair of a stream that stopped early (timeout or provider
+# error after some questions were sent): the questions before it are a partial list
+INCOMPLETE = "incomplete"
+
+
+# Returned when no provider produced usable questions (no API key, errors, open circuits)
 def _fallback_questions(job_title: str) -> List[Dict]:
     return [
         {"type": "technical", "text": f"What are common data structures used by a {job_title}?"},
@@ -12,46 +45,801 @@ def _fallback_questions(job_title: str) -> List[Dict]:
         {"type": "behavioral", "text": "Describe a conflict with a teammate and how you resolved it."},
     ]
 
-def generate_questions(job_title: str) -> List[Dict]:
-    api_key = settings.gemini_api_key
-    if not api_key:
-        return _fallback_questions(job_title)
 
+# Local stand-in for the LLM (LLM_PROVIDER=stub): deterministic output and a
+# configurable delay, so generation can be tested and load-tested offline.
+def _stub_questions(job_title: str) -> List[Dict]:
+    return [
+        {"type": "technical", "text": f"How would you design a core system as a {job_title}?"},
+        {"type": "technical", "text": f"Which tools does a {job_title} use daily, and why?"},
+        {"type": "technical", "text": f"How do you test and debug your work as a {job_title}?"},
+        {"type": "technical", "text": f"Explain a performance problem a {job_title} might face."},
+        {"type": "behavioral", "text": f"Why do you want to work as a {job_title}?"},
+        {"type": "behavioral", "text": "Describe a project you are proud of."},
+        {"type": "behavioral", "text": "Tell me about a time you received difficult feedback."},
+        {"type": "behavioral", "text": "How do you prioritize competing tasks?"},
+    ]
+
+
+def _parse_questions(text: str) -> List[Dict]:
+    text = text.strip()
+
+    # If it isn't clean JSON, try to extract the JSON object best-effort
+    start = text.find("{")
+    end = text.rfind("}")
+    if start != -1 and end != -1:
+        text = text[start:end+1]
+
+    data = json.loads(text)
+    questions = data.get("questions", [])
+    cleaned = []
+    for q in questions:
+        q = _clean_question(q)
+        if q is not None:
+            cleaned.append(q)
+    return cleaned
+
+
+def _clean_question(q) -> Optional[Dict]:
+    if not isinstance(q, dict):
+        return None
+    t = str(q.get("type", "")).lower()
+    text = str(q.get("text", "")).strip()
+    if t not in ("technical", "behavioral") or not text:
+        return None
+    return {"type": t, "text": text}
+
+
+def _parse_response(text: str) -> List[Dict]:
+    """_parse_questions, timed and counted for /metrics."""
+    start = time.perf_counter()
+    try:
+        return _parse_questions(text)
+    except (ValueError, AttributeError):
+        metrics.LLM_PARSE_FAILURES.inc()
+        raise ValueError("Unparseable LLM response")
+    finally:
+        metrics.LLM_PARSE_LATENCY.observe(time.perf_counter() - start)
+
+
+def _degraded(job_title: str, reason: str) -> List[Dict]:
+    metrics.LLM_FALLBACKS.inc(reason=reason)
+    return _fallback_questions(job_title)
+
+
+def _observe_call(provider: str, mode: str, start: float, outcome: str = "ok") -> None:
+    metrics.LLM_LATENCY.observe(time.perf_counter() - start, provider=provider, mode=mode)
+    metrics.LLM_CALLS.inc(provider=provider, outcome=outcome)
+
+
+class QuestionStreamParser:
+    """
+    Incremental parser for a streamed {"questions": [{...}, ...]} payload.
+    feed() returns each question object as soon as its closing brace arrives;
+    text outside the top-level object (markdown fences, chatter) is ignored.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._in_questions = False
+        self._item_start: Optional[int] = None
+        self.parse_errors = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self._buf += chunk
+        out = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:  # a key (or value) of the top-level object
+                        self._last_key = buf[self._string_start + 1:i]
+            elif c == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif c in "{[":
+                if c == "[" and self._stack == ["{"]:
+                    self._in_questions = self._last_key == "questions"
+                elif c == "{" and self._in_questions and self._stack == ["{", "["]:
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in "}]" and self._stack:
+                self._stack.pop()
+                if c == "}" and self._item_start is not None and self._stack == ["{", "["]:
+                    try:
+                        q = _clean_question(json.loads(buf[self._item_start:i + 1]))
+                    except ValueError:
+                        q = None
+                        self.parse_errors += 1
+                    if q is not None:
+                        out.append(q)
+                    self._item_start = None
+                elif c == "]" and self._stack == ["{"]:
+                    self._in_questions = False
+            i += 1
+
+        # Drop consumed text, keeping a partially received question object
+        keep = self._item_start if self._item_start is not None else i
+        if self._in_string and self._string_start < keep:
+            keep = self._string_start
+        self._buf = buf[keep:]
+        self._pos = i - keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        self._string_start -= keep
+        return out
+
+
+class ProviderError(Exception):
+    """A provider call that produced no usable questions; `reason` labels the fallback and metrics."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _validated(text: str) -> List[Dict]:
     try:
-        import google.generativeai as genai
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-
-        system_prompt = """
-            You are generating interview questions. Respond ONLY with valid compact JSON.
-            Schema: {"questions": [{"type": "technical|behavioral", "text": "string"}, ...]}.
-            No markdown, no backticks, no commentary.
-            """
-
-        user_prompt = (
-            f"Generate 8 interview questions (4 technical, 4 behavioral) for the job title: '{job_title}'. "
-            "Vary difficulty. Use concise phrasing."
-        )
-
-        resp = model.generate_content([system_prompt, user_prompt])
-        text = resp.text.strip()
-
-        # If it isn't clean JSON, try to extract the JSON object best-effort
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            text = text[start:end+1]
-
-        data = json.loads(text)
-        questions = data.get("questions", [])
-        cleaned = []
-        for q in questions:
-            t = q.get("type", "").lower()
-            if t not in ("technical", "behavioral"):
+        cleaned = _parse_response(text)
+    except ValueError:
+        raise ProviderError("parse_error")
+    if not cleaned:
+        raise ProviderError("empty")
+    return cleaned
+
+
+class Provider:
+    """
+    One LLM backend. generate/agenerate return validated questions or raise
+    ProviderError; astream yields questions as each one completes.
+    New backends subclass this and are registered in PROVIDERS.
+    """
+
+    name = "base"
+    source = "llm"  # "source" reported by the streaming endpoint
+    # Client-side time before each request is sent (client lookup, prompt build)
+    prepared = 0
+    prepare_seconds = 0.0
+
+    def unavailable_reason(self) -> Optional[str]:
+        """Why the provider can't be called at all (e.g. no API key), or None."""
+        return None
+
+    async def start(self, warm_up: bool = False) -> Dict:
+        """Create long-lived clients (and optionally make a cheap call); returns timings in ms."""
+        return {}
+
+    async def aclose(self) -> None:
+        pass
+
+    def _prepared(self, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        self.prepared += 1
+        self.prepare_seconds += elapsed
+        metrics.LLM_CALL_OVERHEAD.observe(elapsed, provider=self.name)
+
+    def generate(self, job_title: str) -> List[Dict]:
+        raise NotImplementedError
+
+    async def agenerate(self, job_title: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def astream(self, job_title: str) -> AsyncIterator[Dict]:
+        raise NotImplementedError
+
+
+class GeminiProvider(Provider):
+    """
+    Google AI Studio (Gemini) via google-generativeai. The SDK import, configure()
+    and the GenerativeModel (with its gRPC channel, kept alive between calls) are
+    created once, at startup when the lifespan calls start(), and reused.
+    """
+
+    name = "gemini"
+    _client: Optional[Tuple[Tuple[str, str], object]] = None
+
+    def unavailable_reason(self) -> Optional[str]:
+        return None if settings.gemini_api_key else "no_api_key"
+
+    def _model(self):
+        # Rebuilt only if the key or model name changes (settings are read per call)
+        config = (settings.gemini_api_key, settings.llm_gemini_model)
+        if self._client is None or self._client[0] != config:
+            import google.generativeai as genai
+            genai.configure(api_key=settings.gemini_api_key)
+            self._client = (config, genai.GenerativeModel(settings.llm_gemini_model))
+        return self._client[1]
+
+    async def start(self, warm_up: bool = False) -> Dict:
+        if self.unavailable_reason():
+            return {}
+        start = time.perf_counter()
+        model = self._model()
+        timings = {"init_ms": round((time.perf_counter() - start) * 1000, 1)}
+        if warm_up:
+            # count_tokens opens the connection without spending generation quota
+            start = time.perf_counter()
+            await model.count_tokens_async(list(_contents("warm-up")))
+            timings["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return timings
+
+    async def aclose(self) -> None:
+        self._client = None
+
+    def generate(self, job_title: str) -> List[Dict]:
+        start = time.perf_counter()
+        try:
+            model, contents = self._model(), list(_contents(job_title))
+            self._prepared(start)
+            text = model.generate_content(contents).text
+        except Exception:
+            raise ProviderError("provider_error")
+        return _validated(text)
+
+    async def agenerate(self, job_title: str) -> List[Dict]:
+        start = time.perf_counter()
+        try:
+            model, contents = self._model(), list(_contents(job_title))
+            self._prepared(start)
+            resp = await model.generate_content_async(contents)
+            text = resp.text
+        except Exception:
+            raise ProviderError("provider_error")
+        return _validated(text)
+
+    async def astream(self, job_title: str) -> AsyncIterator[Dict]:
+        parser = QuestionStreamParser()
+        start = time.perf_counter()
+        try:
+            model, contents = self._model(), list(_contents(job_title))
+            self._prepared(start)
+            resp = await model.generate_content_async(contents, stream=True)
+            async for chunk in resp:
+                for q in parser.feed(chunk.text):
+                    yield q
+        except Exception:
+            raise ProviderError("provider_error")
+        finally:
+            if parser.parse_errors:
+                metrics.LLM_PARSE_FAILURES.inc(parser.parse_errors)
+
+
+class StubProvider(Provider):
+    name = "stub"
+    source = "stub"
+
+    def generate(self, job_title: str) -> List[Dict]:
+        time.sleep(settings.llm_stub_latency_ms / 1000)
+        return _stub_questions(job_title)
+
+    async def agenerate(self, job_title: str) -> List[Dict]:
+        await asyncio.sleep(settings.llm_stub_latency_ms / 1000)
+        return _stub_questions(job_title)
+
+    async def astream(self, job_title: str) -> AsyncIterator[Dict]:
+        # Serialize and re-parse in chunks so the stub exercises the same parser
+        payload = json.dumps({"questions": _stub_questions(job_title)})
+        step = max(1, len(payload) // 8)
+        parser = QuestionStreamParser()
+        for i in range(0, len(payload), step):
+            await asyncio.sleep(settings.llm_stub_latency_ms / 1000 / 8)
+            for q in parser.feed(payload[i:i + step]):
+                yield q
+
+
+PROVIDERS: Dict[str, Callable[[], Provider]] = {"gemini": GeminiProvider, "stub": StubProvider}
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures. An open circuit
+    fails fast for `reset_seconds`, then lets one trial call through (half-open):
+    success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._trial = False
+
+    def ready(self) -> bool:
+        """Whether a call could go through now (no state change)."""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self._opened_at >= self.reset_seconds
+        return not self._trial
+
+    def allow(self) -> bool:
+        """Take permission for one call."""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+        if self._trial:
+            return False
+        self._trial = True
+        return True
+
+    def release(self) -> None:
+        # Call abandoned without an outcome (cancelled): let another trial through
+        self._trial = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._trial = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if this opened the circuit."""
+        self._trial = False
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self.opens += 1
+            return True
+        return False
+
+
+class ProviderStats:
+    """Outcomes of a provider's last `window` calls: success latencies and error rate."""
+
+    def __init__(self, window: int):
+        self._recent: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, ok: bool, seconds: float) -> None:
+        self._recent.append((ok, seconds))
+        self.calls += 1
+        self.failures += not ok
+
+    def error_rate(self) -> float:
+        if not self._recent:
+            return 0.0
+        return sum(not ok for ok, _ in self._recent) / len(self._recent)
+
+    def samples(self) -> int:
+        return sum(ok for ok, _ in self._recent)
+
+    def latency(self, quantile: float) -> Optional[float]:
+        latencies = sorted(seconds for ok, seconds in self._recent if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+
+class ProviderRouter:
+    """
+    Routes generation over LLM_PROVIDERS in preference order. Providers whose
+    circuit is open are skipped, those above LLM_ROUTE_MAX_ERROR_RATE go last,
+    and a failed call fails over to the next one. With LLM_HEDGE_ENABLED the
+    next provider is also started when the current one is slower than its p95,
+    and the first valid answer wins. Raises ProviderError when nothing answered.
+    """
+
+    def __init__(self, registry: Optional[Dict[str, Callable[[], Provider]]] = None):
+        self.registry = PROVIDERS if registry is None else registry
+        self._providers: Dict[str, Provider] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, ProviderStats] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.startup: Dict[str, Dict] = {}
+
+    async def start(self, warm_up: bool = False, timeout_seconds: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Lifespan hook: create every configured provider's client, optionally warming
+        it up. Failures are logged and recorded, never raised: the app still starts
+        and the first real call retries the setup.
+        """
+        for name in self.names():
+            start = time.perf_counter()
+            try:
+                timings = await asyncio.wait_for(self.provider(name).start(warm_up), timeout_seconds)
+                timings["ok"] = True
+            except Exception as e:
+                logger.warning("LLM provider %s failed to start: %s", name, e)
+                timings = {"ok": False, "error": type(e).__name__}
+            timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self.startup[name] = timings
+        return self.startup
+
+    async def aclose(self) -> None:
+        for provider in self._providers.values():
+            await provider.aclose()
+
+    def names(self) -> List[str]:
+        # Read per call, so LLM_PROVIDER/LLM_PROVIDERS changes apply without a restart
+        configured = settings.llm_providers or settings.llm_provider
+        return [n.strip() for n in configured.split(",") if n.strip() in self.registry]
+
+    def provider(self, name: str) -> Provider:
+        if name not in self._providers:
+            self._providers[name] = self.registry[name]()
+        return self._providers[name]
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_seconds)
+        return self._breakers[name]
+
+    def provider_stats(self, name: str) -> ProviderStats:
+        if name not in self._stats:
+            self._stats[name] = ProviderStats(settings.llm_stats_window)
+        return self._stats[name]
+
+    def candidates(self) -> Tuple[List[str], str]:
+        """Providers to try, best first, and the fallback reason if there are none."""
+        ranked, reason = [], "no_provider"
+        for i, name in enumerate(self.names()):
+            unavailable = self.provider(name).unavailable_reason()
+            if unavailable:
+                reason = unavailable
+            elif not self.breaker(name).ready():
+                reason = "circuit_open"
+            else:
+                error_rate = self.provider_stats(name).error_rate()
+                degraded = error_rate > settings.llm_route_max_error_rate
+                ranked.append((degraded, error_rate if degraded else 0.0, i, name))
+        return [name for *_, name in sorted(ranked)], reason
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self.provider_stats(name)
+        if stats.samples() < settings.llm_hedge_min_samples:
+            return settings.llm_hedge_delay_ms / 1000
+        return stats.latency(0.95)
+
+    def _record(self, name: str, mode: str, start: float, reason: Optional[str] = None) -> None:
+        self.provider_stats(name).record(reason is None, time.perf_counter() - start)
+        if reason is None:
+            self.breaker(name).record_success()
+        elif self.breaker(name).record_failure():
+            metrics.LLM_CIRCUIT_OPENS.inc(provider=name)
+        outcome = "ok" if reason is None else "error" if reason == "provider_error" else reason
+        _observe_call(name, mode, start, outcome)
+
+    def generate(self, job_title: str) -> List[Dict]:
+        """Sync path: failover in order, no hedging."""
+        order, reason = self.candidates()
+        error = ProviderError(reason)
+        for name in order:
+            if not self.breaker(name).allow():
+                error = ProviderError("circuit_open")
+                continue
+            start = time.perf_counter()
+            try:
+                questions = self.provider(name).generate(job_title)
+            except ProviderError as e:
+                error = e
+            except Exception:
+                error = ProviderError("provider_error")
+            else:
+                self._record(name, "sync", start)
+                return questions
+            self._record(name, "sync", start, error.reason)
+        raise error
+
+    async def _acall(self, name: str, job_title: str) -> List[Dict]:
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            raise ProviderError("circuit_open")
+        start = time.perf_counter()
+        try:
+            questions = await asyncio.wait_for(
+                self.provider(name).agenerate(job_title), settings.llm_call_timeout_seconds,
+            )
+        except asyncio.CancelledError:
+            # Lost a hedge race or the request went away: no outcome to record
+            breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            error = ProviderError("timeout")
+        except ProviderError as e:
+            error = e
+        except Exception:
+            error = ProviderError("provider_error")
+        else:
+            self._record(name, "async", start)
+            return questions
+        self._record(name, "async", start, error.reason)
+        raise error
+
+    async def agenerate(self, job_title: str) -> List[Dict]:
+        order, reason = self.candidates()
+        error = ProviderError(reason)
+        queue = list(order)
+        tasks: Dict[asyncio.Future, str] = {}
+        hedged = False
+
+        def launch() -> str:
+            name = queue.pop(0)
+            tasks[asyncio.ensure_future(self._acall(name, job_title))] = name
+            return name
+
+        try:
+            current = launch() if queue else None
+            while tasks:
+                delay = None
+                if settings.llm_hedge_enabled and queue and not hedged and len(tasks) == 1:
+                    delay = self.hedge_delay(current)
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than its p95: race the next provider, keep the first valid answer
+                    hedged = True
+                    self.hedges += 1
+                    metrics.LLM_HEDGES.inc(provider=launch())
+                    continue
+                for task in done:
+                    name = tasks.pop(task)
+                    try:
+                        questions = task.result()
+                    except ProviderError as e:
+                        error = e
+                        continue
+                    if name != current:
+                        self.hedge_wins += 1
+                    return questions
+                if not tasks and queue:
+                    current = launch()  # failover
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream(self, job_title: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        (source, question) pairs from the first provider that yields anything.
+        Failover only happens before the first question; a later failure raises
+        ProviderError after the partial stream, so callers can tell it from a complete one.
+        """
+        order, reason = self.candidates()
+        error = ProviderError(reason)
+        for name in order:
+            breaker = self.breaker(name)
+            if not breaker.allow():
+                error = ProviderError("circuit_open")
                 continue
-            cleaned.append({"type": t, "text": q.get("text", "").strip()})
-        if not cleaned:
-            return _fallback_questions(job_title)
-        return cleaned
-    except Exception:
-        return _fallback_questions(job_title)
\ No newline at end of file
+            provider = self.provider(name)
+            start = time.perf_counter()
+            emitted = 0
+            try:
+                async for q in provider.astream(job_title):
+                    emitted += 1
+                    yield provider.source, q
+            except ProviderError as e:
+                error = e
+            except Exception:
+                error = ProviderError("provider_error")
+            except BaseException:
+                # Consumer closed the stream (timeout/disconnect) mid-response
+                if emitted:
+                    self._record(name, "stream", start)
+                else:
+                    breaker.release()
+                raise
+            else:
+                if emitted:
+                    self._record(name, "stream", start)
+                    return
+                error = ProviderError("empty")
+            self._record(name, "stream", start, error.reason)
+            if emitted:
+                break  # questions were already sent: no failover, the stream is partial
+        raise error
+
+    def stats(self) -> Dict:
+        providers = {}
+        for name in self.names():
+            stats, breaker, provider = self.provider_stats(name), self.breaker(name), self.provider(name)
+            p50, p95 = stats.latency(0.5), stats.latency(0.95)
+            providers[name] = {
+                "startup": self.startup.get(name),
+                "overhead_ms_avg": (
+                    round(provider.prepare_seconds / provider.prepared * 1000, 3) if provider.prepared else None
+                ),
+                "available": provider.unavailable_reason() is None,
+                "circuit": breaker.state,
+                "consecutive_failures": breaker.failures,
+                "circuit_opens": breaker.opens,
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "error_rate": round(stats.error_rate(), 3),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+        return {
+            "providers": providers,
+            "hedging": settings.llm_hedge_enabled,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+router = ProviderRouter()
+
+
+def generate_questions(job_title: str) -> List[Dict]:
+    try:
+        return router.generate(job_title)
+    except ProviderError as e:
+        return _degraded(job_title, e.reason)
+
+
+async def agenerate_questions(job_title: str) -> List[Dict]:
+    """Asyncio-native counterpart of generate_questions (no threadpool worker is held)."""
+    try:
+        return await router.agenerate(job_title)
+    except ProviderError as e:
+        return _degraded(job_title, e.reason)
+
+
+async def astream_questions(job_title: str) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Streaming counterpart of agenerate_questions: yields (source, question) pairs as
+    soon as each question is complete. source is "llm", "stub" or "fallback".
+    """
+    emitted = 0
+    try:
+        async for item in router.astream(job_title):
+            emitted += 1
+            yield item
+    except ProviderError as e:
+        # Same degradation as generate_questions, but only if nothing was streamed yet;
+        # after that the list is partial and the caller must not treat it as complete
+        if emitted:
+            raise
+        for q in _degraded(job_title, e.reason):
+            yield "fallback", q
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight task."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: a cancelled/disconnected waiter must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+class AsyncGenerator:
+    """
+    Bounded-concurrency, timeout-guarded, coalescing front for agenerate_questions.
+    Timeouts and provider errors degrade to the fallback questions, like generate_questions.
+    """
+
+    def __init__(self, max_concurrency: int, timeout_seconds: float, coalesce: bool = True,
+                 provider: Callable[[str], Awaitable[List[Dict]]] = agenerate_questions,
+                 stream_provider: Callable[[str], AsyncIterator[Tuple[str, Dict]]] = astream_questions):
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.coalesce = coalesce
+        self.provider = provider
+        self.stream_provider = stream_provider
+        self.single_flight = SingleFlight()
+        self.timeouts = 0
+        self.incomplete = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to one event loop; tests and scripts may run several
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _call(self, job_title: str) -> List[Dict]:
+        async def bounded():
+            async with self._get_semaphore():
+                return await self.provider(job_title)
+        try:
+            return await asyncio.wait_for(bounded(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return _degraded(job_title, "timeout")
+        except Exception:
+            return _degraded(job_title, "provider_error")
+
+    async def generate(self, job_title: str, key: Optional[str] = None) -> List[Dict]:
+        if not self.coalesce:
+            return await self._call(job_title)
+        return await self.single_flight.do(key or job_title, lambda: self._call(job_title))
+
+    async def stream(self, job_title: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Streams (source, question) pairs under the same semaphore. For streams the
+        timeout bounds the wait for each next question rather than the whole response.
+        A stream cut short after its first question ends with (INCOMPLETE, None).
+        """
+        semaphore = self._get_semaphore()
+        emitted = 0
+        complete = True
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            metrics.LLM_FALLBACKS.inc(reason="timeout")
+        else:
+            agen = self.stream_provider(job_title)
+            try:
+                while True:
+                    try:
+                        item = await asyncio.wait_for(agen.__anext__(), self.timeout_seconds)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        self.timeouts += 1
+                        metrics.LLM_FALLBACKS.inc(reason="timeout")
+                        complete = False
+                        break
+                    except Exception:
+                        # Before the first question this degrades to the fallback below
+                        logger.warning("question stream for %r failed", job_title, exc_info=True)
+                        complete = False
+                        break
+                    emitted += 1
+                    yield item
+            finally:
+                await agen.aclose()
+                semaphore.release()
+        if not emitted:
+            for q in _fallback_questions(job_title):
+                yield "fallback", q
+        elif not complete:
+            self.incomplete += 1
+            yield INCOMPLETE, None
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout_seconds,
+            "coalesce": self.coalesce,
+            "timeouts": self.timeouts,
+            "incomplete_streams": self.incomplete,
+            **self.single_flight.stats(),
+        }
+
+
+async_generator = AsyncGenerator(
+    max_concurrency=settings.llm_max_concurrency,
+    timeout_seconds=settings.llm_timeout_seconds,
+    coalesce=settings.llm_coalesce,
+)
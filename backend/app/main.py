@@ -1,26 +1,58 @@
 
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Literal, Optional
+import asyncio
+import json
+import logging
+import orjson
 
-from app.database import SessionLocal, init_db
-from app import models, schemas
+from app.database import AsyncSessionLocal, async_engine, init_db
+from app import crud, dedup, etag, export, importer, jobs, metrics, models, practice, pregen, profiler, ratelimit, replicas, schemas, similar, stats as app_stats
+from app.search import search_questions
 from app.config import settings
-from app.llm import generate_questions
-from sqlalchemy import func, text
+from app.llm import INCOMPLETE, async_generator, router as llm_router
+from app.cache import generation_cache, normalize_job_title
+from app.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger("app.main")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     init_db()
+    if settings.similar_enabled:
+        similar.index.start()
+    # Long-lived LLM clients (SDK import, configure, model) built before the first request
+    startup = await llm_router.start(warm_up=settings.llm_warmup, timeout_seconds=settings.llm_call_timeout_seconds)
+    logger.info("LLM providers started: %s", startup)
+    tasks = []
+    if settings.pregen_enabled:
+        tasks.append(asyncio.create_task(
+            pregen.pool.run(settings.pregen_interval_seconds, settings.pregen_popularity_refresh_seconds)
+        ))
+    if settings.jobs_workers > 0:
+        tasks.append(asyncio.create_task(jobs.workers.run()))
     yield
-    pass 
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await llm_router.aclose()
+    await similar.index.aclose()
 
 app = FastAPI(title="Interview Prep Platform", version="1.0.0", lifespan=lifespan)
 
+if settings.rate_limit_enabled or settings.admission_max_in_flight > 0:
+    # Added before CORS so it runs inside it: browsers can read the 429/503 and Retry-After
+    app.add_middleware(ratelimit.AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[origin.strip() for origin in settings.cors_origins.split(",")],
@@ -29,16 +61,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    for _engine in [async_engine, *replicas.router.engines]:
+        metrics.instrument_engine(_engine.sync_engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if replicas.router:
+    app.add_middleware(replicas.PrimaryPinMiddleware)
+
+if settings.query_profiler_enabled:
+    for _engine in [async_engine, *replicas.router.engines]:
+        profiler.instrument_engine(_engine.sync_engine)
+    app.add_middleware(profiler.QueryProfilerMiddleware)
+
 # Dependency
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    # Sync helper modules (crud, stats, dedup, search) run on this session via db.run_sync()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def _open_read_session(request: Request) -> AsyncSession:
+    # Read-only routes: a replica when configured and healthy, else the primary
+    db = None
+    if replicas.router and not replicas.wants_primary(request.headers, request.cookies):
+        db = await replicas.router.open_session()
+    return db or AsyncSessionLocal()
+
+
+async def get_read_db(request: Request):
+    db = await _open_read_session(request)
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
 @app.post("/api/questions/generate", response_model=schemas.GenerateResponse)
-def api_generate(req: schemas.GenerateRequest):
+async def api_generate(req: schemas.GenerateRequest, db: AsyncSession = Depends(get_db)):
     # Additional validation (Pydantic already validates, but let's be explicit)
     if len(req.job_title.strip()) == 0:
         raise HTTPException(status_code=400, detail="Job title cannot be empty")
@@ -46,7 +105,18 @@ def api_generate(req: schemas.GenerateRequest):
         raise HTTPException(status_code=400, detail="Job title must be 50 characters or less")
     
     try:
-        questions = generate_questions(req.job_title)
+        # The pre-generation pool comes first: a batch is served once and never cached,
+        # so popular titles keep drawing fresh batches instead of one cached list
+        if settings.pregen_enabled:
+            pregen.pool.record(req.job_title)
+            questions = pregen.pool.take(req.job_title)
+            if questions is not None:
+                return {"questions": questions}
+        if settings.generation_cache_enabled:
+            questions = await generation_cache.aget_or_generate(db, req.job_title)
+        else:
+            key = normalize_job_title(req.job_title)
+            questions = await async_generator.generate(req.job_title, key=key)
         return {"questions": questions}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -54,8 +124,112 @@ def api_generate(req: schemas.GenerateRequest):
         raise HTTPException(status_code=500, detail="Failed to generate questions")
 
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _generate_events(job_title: str, cached: Optional[list]):
+    """SSE body: one "question" event per validated question, then a "done" summary."""
+    count = 0
+    if cached is not None:
+        source = "cache"
+        for q in cached:
+            count += 1
+            yield _sse("question", q)
+    else:
+        source = None
+        complete = True
+        streamed = []
+        async for item_source, q in async_generator.stream(job_title):
+            if item_source == INCOMPLETE:
+                complete = False
+                continue
+            source = item_source
+            count += 1
+            streamed.append(q)
+            yield _sse("question", q)
+        if not complete:
+            # A partial list must not be cached: generate would serve it for the whole TTL
+            yield _sse("done", {"count": count, "source": source, "incomplete": True})
+            return
+        if settings.generation_cache_enabled and source in ("llm", "stub"):
+            # The request's session is already closed once the body streams
+            async with AsyncSessionLocal() as db:
+                await generation_cache.astore(db, job_title, streamed)
+    yield _sse("done", {"count": count, "source": source})
+
+
+async def _generate_stream_response(job_title: str, db: AsyncSession) -> StreamingResponse:
+    if len(job_title.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Job title cannot be empty")
+    cached = None
+    if settings.generation_cache_enabled:
+        cached = await generation_cache.alookup(db, job_title)
+    return StreamingResponse(
+        _generate_events(job_title, cached),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/questions/generate/stream", responses={400: {"model": schemas.ErrorResponse}})
+async def api_generate_stream(req: schemas.GenerateRequest, db: AsyncSession = Depends(get_db)):
+    return await _generate_stream_response(req.job_title, db)
+
+
+@app.get("/api/questions/generate/stream", responses={400: {"model": schemas.ErrorResponse}})
+async def api_generate_stream_get(
+    job_title: str = Query(..., min_length=1, max_length=50, description="Job title (max 50 characters)"),
+    db: AsyncSession = Depends(get_db),
+):
+    # GET variant so browsers can consume it with EventSource
+    return await _generate_stream_response(job_title, db)
+
+
+@app.post(
+    "/api/generation-jobs",
+    response_model=schemas.GenerationJobOut,
+    status_code=202,
+    responses={400: {"model": schemas.ErrorResponse}},
+)
+async def create_generation_job(payload: schemas.GenerationJobCreate, db: AsyncSession = Depends(get_db)):
+    """Queue a generation and return immediately; poll GET /api/generation-jobs/{id}."""
+    if len(payload.job_title.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Job title cannot be empty")
+    return await jobs.enqueue(db, payload.job_title, name=payload.name, save=payload.save)
+
+
+@app.get(
+    "/api/generation-jobs/{job_id}",
+    response_model=schemas.GenerationJobOut,
+    responses={404: {"model": schemas.ErrorResponse}},
+)
+async def get_generation_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    # Primary, not a replica: clients poll right after enqueueing
+    job = await db.get(models.GenerationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return job
+
+
+@app.get("/api/generation-cache/stats")
+async def generation_cache_stats():
+    return {"enabled": settings.generation_cache_enabled, **generation_cache.stats()}
+
+
+@app.get("/api/pregen/stats")
+async def pregen_stats():
+    return pregen.pool.stats()
+
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    # Per-provider circuit state, error rate and latency percentiles drive the routing
+    return {**async_generator.stats(), **llm_router.stats()}
+
+
 @app.post("/api/questions", response_model=schemas.QASetOut, status_code=201)
-def create_set(payload: schemas.QASetCreate, db: Session = Depends(get_db)):
+async def create_set(payload: schemas.QASetCreate, db: AsyncSession = Depends(get_db)):
     # Additional validation
     if len(payload.job_title.strip()) == 0:
         raise HTTPException(status_code=400, detail="Job title cannot be empty")
@@ -63,20 +237,88 @@ def create_set(payload: schemas.QASetCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Job title must be 50 characters or less")
 
     try:
-        qa_set = models.QASet(job_title=payload.job_title, name=payload.name)
-        db.add(qa_set)
-        db.flush()  # to get set id
-
-        for q in payload.questions:
-            qtype = models.QuestionType(q.type)
-            db.add(models.Question(set_id=qa_set.id, type=qtype, text=q.question))
-
-        db.commit()
-        db.refresh(qa_set)
-        return qa_set
+        (qa_set,) = await db.run_sync(crud.insert_sets, [payload])
+        await db.run_sync(app_stats.apply_delta, sets=1, questions=qa_set["questions"])
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to create question set")
+    await asyncio.to_thread(similar.index.add, qa_set["saved"])
+    return qa_set
+
+
+@app.post(
+    "/api/sets/bulk",
+    response_model=schemas.QASetBulkOut,
+    status_code=201,
+    responses={400: {"model": schemas.ErrorResponse}},
+)
+async def create_sets_bulk(payload: schemas.QASetBulkCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Import many sets in one transaction using batched INSERTs.
+    Sets failing validation are reported per index and skipped; the rest are written.
+    """
+    if len(payload.sets) > settings.bulk_max_sets:
+        raise HTTPException(status_code=400, detail=f"At most {settings.bulk_max_sets} sets per request")
+
+    results: list = [None] * len(payload.sets)
+    saved = []
+    valid = []
+    for i, s in enumerate(payload.sets):
+        if len(s.job_title.strip()) == 0:
+            results[i] = schemas.QASetBulkResult(index=i, status="error", error="Job title cannot be empty")
+        else:
+            valid.append((i, s))
+
+    def write(session: Session) -> None:
+        saved_questions = 0
+        for start in range(0, len(valid), settings.bulk_batch_size):
+            batch = valid[start:start + settings.bulk_batch_size]
+            created = crud.insert_sets(session, [s for _, s in batch])
+            for (i, _), row in zip(batch, created):
+                results[i] = schemas.QASetBulkResult(index=i, status="created", **row)
+                saved_questions += row["questions"]
+                saved.extend(row["saved"])
+        app_stats.apply_delta(session, sets=len(valid), questions=saved_questions)
+
+    try:
+        await db.run_sync(write)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to import question sets")
+    await asyncio.to_thread(similar.index.add, saved)
+
+    created_count = len(valid)
+    return {"created": created_count, "failed": len(results) - created_count, "results": results}
+
+
+@app.post(
+    "/api/import",
+    response_model=schemas.ImportSummary,
+    status_code=201,
+    responses={500: {"model": schemas.ErrorResponse}},
+)
+async def import_questions(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(None, description="Defaults from Content-Type"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Load flat question records (the export columns) from an NDJSON or CSV body,
+    parsed as it streams in. Consecutive records with the same job_title/name
+    form one set. Invalid records are reported by line and skipped; valid ones
+    are committed every IMPORT_CHUNK_SIZE rows.
+    """
+    fmt = format or importer.detect_format(request.headers.get("content-type", ""))
+    loader = importer.Importer(db, fmt, settings.import_chunk_size, settings.import_max_errors)
+    try:
+        return await loader.run(request.stream())
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Import failed after {loader.records} records; {loader.questions} questions were saved",
+        )
 
 
 @app.get(
@@ -84,38 +326,188 @@ def create_set(payload: schemas.QASetCreate, db: Session = Depends(get_db)):
     response_model=schemas.QuestionsPage,
     responses={400: {"model": schemas.ErrorResponse}},
 )
-def list_questions(
+async def list_questions(
+    request: Request,
     set_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(None, description="Opaque cursor from next_cursor; empty string starts cursor mode"),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
-    Paginated list of questions with optional set_id filter.
-    Returns: { items, total, page, size, pages }
+    Paginated list of questions (newest first) with optional set_id filter.
+    Offset mode returns: { items, total, page, size, pages, next_cursor }
+    Cursor mode (?after=...) skips OFFSET and count(): { items, size, next_cursor }
+    Sends an ETag; a matching If-None-Match gets 304 without querying questions.
     """
-    query = db.query(models.Question)
+    # Version first: a write landing between the two reads only makes the tag stale, never the body
+    version = await (etag.set_version(db, set_id) if set_id is not None else etag.global_version(db))
+    tag = etag.make_etag("questions", version, set_id, page, size, after)
+    cached = etag.cached_response(request, tag)
+    if cached is not None:
+        return cached
+    # response_model stays for the OpenAPI schema; the body is encoded once, here
+    return etag.json_response(tag, orjson.dumps(await _list_page(db, set_id, page, size, after)))
+
+
+_ITEM_COLUMNS = (
+    models.Question.id, models.Question.set_id, models.Question.type, models.Question.text,
+    models.Question.user_answer, models.Question.difficulty, models.Question.flagged,
+)
+
+
+def _item(row) -> dict:
+    # QuestionOut's shape, built from a column tuple: no ORM hydration and no second validation
+    return {
+        "id": row.id, "set_id": row.set_id, "type": row.type.value, "text": row.text,
+        "user_answer": row.user_answer, "difficulty": row.difficulty, "flagged": row.flagged,
+    }
+
+
+async def _list_page(db: AsyncSession, set_id: Optional[int], page: int, size: int, after: Optional[str]) -> dict:
+    """A QuestionsPage as plain JSON-ready values (every field, in schema order)."""
+    filters = []
     if set_id is not None:
-        query = query.filter(models.Question.set_id == set_id)
-    total = query.count()
+        filters.append(models.Question.set_id == set_id)
+    query = select(*_ITEM_COLUMNS).where(*filters)
+
+    if after is not None:
+        if after:
+            try:
+                last_id = decode_cursor(after)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(models.Question.id < last_id)
+        # Fetch one extra row to learn whether another page exists
+        rows = (await db.execute(query.order_by(models.Question.id.desc()).limit(size + 1))).all()
+        has_more = len(rows) > size
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1].id) if has_more else None
+        return {"items": [_item(r) for r in rows], "total": None, "page": None, "size": size, "pages": None,
+                "next_cursor": next_cursor}
+
+    total = await db.scalar(select(func.count()).select_from(models.Question).where(*filters))
     pages = (total + size - 1) // size  # Calculate total pages
-    rows = (
+    rows = (await db.execute(
         query.order_by(models.Question.id.desc())
         .offset((page - 1) * size)
         .limit(size)
-        .all()
-    )
-    items = [schemas.QuestionOut.model_validate(r) for r in rows]
-    return {"items": items, "total": total, "page": page, "size": size, "pages": pages}
+    )).all()
+    # Lets offset clients switch to cursor mode for the remaining pages
+    next_cursor = encode_cursor(rows[-1].id) if rows and page < pages else None
+    return {"items": [_item(r) for r in rows], "total": total, "page": page, "size": size, "pages": pages,
+            "next_cursor": next_cursor}
+
+
+@app.get(
+    "/api/questions/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media: {} for media in export.MEDIA_TYPES.values()}}},
+)
+async def export_questions(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    set_id: Optional[int] = None,
+):
+    """
+    Streams every question (optionally one set) as NDJSON or CSV, oldest first.
+    Rows come from a server-side cursor in EXPORT_CHUNK_SIZE batches; gzip is
+    applied on the fly when the client sends Accept-Encoding: gzip.
+    """
+    async def body():
+        # Not a dependency: the request's session is closed before the body streams
+        db = await _open_read_session(request)
+        try:
+            rows = export.iter_rows(db, set_id, settings.export_chunk_size)
+            async for chunk in (export.encode_csv(rows) if format == "csv" else export.encode_ndjson(rows)):
+                yield chunk
+        finally:
+            await db.close()
+
+    headers = {"Content-Disposition": f'attachment; filename="questions.{format}"', "Vary": "Accept-Encoding"}
+    stream = body()
+    if export.accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        stream = export.gzip_stream(stream)
+    return StreamingResponse(stream, media_type=export.MEDIA_TYPES[format], headers=headers)
+
+
+@app.get("/api/questions/duplicates", response_model=schemas.DuplicatesReport)
+async def duplicates_report(
+    set_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Near-duplicate groups linked on insert, largest first."""
+    groups = await db.run_sync(dedup.duplicate_groups, set_id=set_id, limit=limit)
+    return {"policy": settings.duplicate_policy, "groups": groups}
+
+
+@app.get("/api/questions/search", response_model=schemas.SearchResults)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    set_id: Optional[int] = None,
+    type: Optional[Literal["technical", "behavioral"]] = None,
+    flagged: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Ranked full-text search over question text and user answers."""
+    items = await db.run_sync(search_questions, q, set_id=set_id, qtype=type, flagged=flagged, limit=limit)
+    return {"q": q, "items": items}
+
+
+@app.get(
+    "/api/questions/{qid}/similar",
+    response_model=schemas.SimilarQuestions,
+    responses={404: {"model": schemas.ErrorResponse}, 503: {"model": schemas.ErrorResponse}},
+)
+async def similar_questions(
+    qid: int,
+    k: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """The k questions with the most similar text (cosine over local TF-IDF vectors), best first."""
+    if not settings.similar_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not await similar.index.wait_ready(settings.similar_wait_seconds):
+        raise HTTPException(status_code=503, detail="Similar questions index is still building",
+                            headers={"Retry-After": "5"})
+    hits = await asyncio.to_thread(similar.index.query, qid, k)
+    if hits is None:
+        # Not indexed yet (e.g. written by another worker): index it now
+        question_text = await db.scalar(select(models.Question.text).where(models.Question.id == qid))
+        if question_text is None:
+            raise HTTPException(status_code=404, detail="Question not found")
+        await asyncio.to_thread(similar.index.add, [(qid, question_text)])
+        hits = await asyncio.to_thread(similar.index.query, qid, k)
+    rows = {}
+    if hits:
+        result = await db.execute(select(*_ITEM_COLUMNS).where(models.Question.id.in_([i for i, _ in hits])))
+        rows = {row.id: row for row in result}
+    # Rows deleted by another worker may still be in this process's index
+    items = [{**_item(rows[i]), "score": score} for i, score in hits or [] if i in rows]
+    return {"id": qid, "items": items}
+
+
+@app.get("/api/similar/stats")
+async def similar_stats():
+    return similar.index.stats()
 
 
 @app.delete("/api/questions/{qid}", responses={404: {"model": schemas.ErrorResponse}})
-def delete_question(qid: int, db: Session = Depends(get_db)):
-    q = db.get(models.Question, qid)
+async def delete_question(qid: int, db: AsyncSession = Depends(get_db)):
+    q = await db.get(models.Question, qid)
     if not q:
         raise HTTPException(status_code=404, detail="Question not found")
-    db.delete(q)
-    db.commit()
+    await db.delete(q)
+    await db.run_sync(
+        app_stats.apply_delta, questions=-1,
+        **app_stats.question_delta(q.flagged, q.difficulty, False, None),
+    )
+    await db.run_sync(app_stats.touch_sets, [q.set_id])
+    await db.commit()
+    await asyncio.to_thread(similar.index.remove, [qid])
     return {"ok": True}
 
 
@@ -124,10 +516,11 @@ def delete_question(qid: int, db: Session = Depends(get_db)):
     response_model=schemas.QuestionOut,
     responses={404: {"model": schemas.ErrorResponse}, 400: {"model": schemas.ErrorResponse}},
 )
-def update_question(qid: int, payload: schemas.QuestionPatch, db: Session = Depends(get_db)):
-    q = db.get(models.Question, qid)
+async def update_question(qid: int, payload: schemas.QuestionPatch, db: AsyncSession = Depends(get_db)):
+    q = await db.get(models.Question, qid)
     if not q:
         raise HTTPException(status_code=404, detail="Question not found")
+    old_flagged, old_difficulty = q.flagged, q.difficulty
 
     if payload.user_answer is not None:
         q.user_answer = payload.user_answer
@@ -139,42 +532,106 @@ def update_question(qid: int, payload: schemas.QuestionPatch, db: Session = Depe
 
     if payload.flagged is not None:
         q.flagged = payload.flagged
+    practice.refresh(q)
 
-    db.commit()
-    db.refresh(q)
+    await db.run_sync(
+        app_stats.apply_delta, **app_stats.question_delta(old_flagged, old_difficulty, q.flagged, q.difficulty)
+    )
+    await db.run_sync(app_stats.touch_sets, [q.set_id])
+    await db.commit()
+    # expire_on_commit=False: every field is still loaded, so no refresh round trip
     return q
 
 
+@app.patch(
+    "/api/questions",
+    response_model=schemas.QuestionBatchPatchOut,
+    responses={400: {"model": schemas.ErrorResponse}},
+)
+async def update_questions_batch(items: List[schemas.QuestionBatchPatchItem], db: AsyncSession = Depends(get_db)):
+    """Apply many {id, difficulty?, flagged?, user_answer?} edits in one transaction."""
+    if not items:
+        raise HTTPException(status_code=400, detail="No questions to update")
+    if len(items) > settings.batch_patch_max_items:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_patch_max_items} questions per request")
+    if len({item.id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Duplicate question ids in batch")
+
+    try:
+        rows = await db.run_sync(crud.patch_questions, items)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to update questions")
+
+    results = [
+        {"id": item.id, "status": "updated", "item": rows[item.id]} if item.id in rows
+        else {"id": item.id, "status": "not_found"}
+        for item in items
+    ]
+    return {"updated": len(rows), "not_found": len(items) - len(rows), "results": results}
+
+
+@app.get(
+    "/api/practice/next",
+    response_model=schemas.PracticeQuestion,
+    responses={404: {"model": schemas.ErrorResponse}},
+)
+async def practice_next(set_id: Optional[int] = None, db: AsyncSession = Depends(get_read_db)):
+    """The question to practice next (most overdue first), from one set or all; one indexed lookup."""
+    q = await db.run_sync(practice.next_question, set_id)
+    if q is None:
+        raise HTTPException(status_code=404, detail="No questions to practice")
+    return practice.state(q)
+
+
+@app.post(
+    "/api/practice/{qid}/result",
+    response_model=schemas.PracticeQuestion,
+    responses={404: {"model": schemas.ErrorResponse}},
+)
+async def practice_result(qid: int, payload: schemas.PracticeResult, db: AsyncSession = Depends(get_db)):
+    """Record a practice outcome and reschedule the question."""
+    q = await db.get(models.Question, qid)
+    if not q:
+        raise HTTPException(status_code=404, detail="Question not found")
+    practice.record(q, payload.outcome)
+    await db.commit()
+    return practice.state(q)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/api/stats")
-def stats(db: Session = Depends(get_db)):
-    total_sets = db.query(models.QASet).count()
-    total_questions = db.query(models.Question).count()
-    flagged = db.query(models.Question).filter(models.Question.flagged.is_(True)).count()
-    avg_diff = db.query(func.avg(models.Question.difficulty)).scalar()
-    return {
-        "total_sets": total_sets,
-        "total_questions": total_questions,
-        "flagged_questions": flagged,
-        "avg_difficulty": round(avg_diff,2) if avg_diff is not None else None,
-    }
+async def stats(request: Request, db: AsyncSession = Depends(get_read_db)):
+    # Single-row read of the counters maintained by the write endpoints
+    tag = etag.make_etag("stats", await etag.global_version(db))
+    cached = etag.cached_response(request, tag)
+    if cached is not None:
+        return cached
+    return etag.json_response(tag, json.dumps(await db.run_sync(app_stats.read), separators=(",", ":")).encode())
 
 
 @app.get("/healthz")
-def healthz(db: Session = Depends(get_db)):
+async def healthz(db: AsyncSession = Depends(get_read_db)):
     # quick DB ping (portable)
-    db.execute(text("SELECT 1"))
+    await db.execute(text("SELECT 1"))
+    if replicas.router:
+        return {"status": "ok", **replicas.router.stats()}
     return {"status": "ok"}
 
 
 @app.get("/api/questions/page", response_model=schemas.QuestionsPage, responses={404: {"model": schemas.ErrorResponse}})
-def list_questions_legacy(
+async def list_questions_legacy(
     set_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = list_questions(set_id=set_id, page=page, size=page_size, db=db)
-    # include page_size for backward-compat
-    result_dict = result if isinstance(result, dict) else result.model_dump()
-    result_dict["page_size"] = result_dict.get("size")
-    return result_dict
+    # Same body as the offset mode of GET /api/questions, without a second validation pass
+    return ORJSONResponse(await _list_page(db, set_id, page, page_size, None))
@@ -0,0 +1,256 @@
+"""
+Minimal in-process Prometheus metrics: per-route latency histograms, in-flight
+gauge, DB query count/time per request (SQLAlchemy engine events) and LLM call
+timings. Exposed as Prometheus text on GET /metrics.
+
+Hot-path cost is a dict lookup plus a lock per observation, so it stays on.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-1] += value
+
+    def count(self, **labels) -> int:
+        row = self._values.get(self._key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def sum(self, **labels) -> float:
+        row = self._values.get(self._key(labels))
+        return row[-1] if row else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {row[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."))
+HTTP_SHED = REGISTRY.register(Counter(
+    "http_requests_shed_total", "Requests rejected before routing (rate_limit: 429, overload: 503).", ("reason",)))
+HTTP_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "DB statements executed per HTTP request.", ("method", "route"), COUNT_BUCKETS))
+HTTP_DB_TIME = REGISTRY.register(Histogram(
+    "http_request_db_seconds", "Time spent in DB statements per HTTP request.", ("method", "route")))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "DB statements executed."))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "DB statement latency."))
+LLM_CALLS = REGISTRY.register(Counter(
+    "llm_calls_total", "LLM provider calls by outcome (ok|error|parse_error|empty|timeout).", ("provider", "outcome")))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "llm_call_duration_seconds", "LLM provider round-trip latency.", ("provider", "mode")))
+LLM_CALL_OVERHEAD = REGISTRY.register(Histogram(
+    "llm_call_overhead_seconds", "Client-side time before an LLM request is sent (client, prompt).", ("provider",)))
+LLM_PARSE_LATENCY = REGISTRY.register(Histogram(
+    "llm_parse_duration_seconds", "Time spent parsing/validating LLM output."))
+LLM_FALLBACKS = REGISTRY.register(Counter(
+    "llm_fallbacks_total", "Requests answered with the fallback questions, by reason.", ("reason",)))
+LLM_PARSE_FAILURES = REGISTRY.register(Counter(
+    "llm_parse_failures_total", "LLM responses that could not be parsed as the questions JSON."))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "llm_hedges_total", "Hedge calls started because the first provider was slower than its p95.", ("provider",)))
+LLM_CIRCUIT_OPENS = REGISTRY.register(Counter(
+    "llm_circuit_opens_total", "Times a provider's circuit breaker opened.", ("provider",)))
+
+
+class RequestDBStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware; sync handlers run in a threadpool with a copy of the
+# context, which still references the same (mutable) stats object.
+current_request_db: ContextVar[Optional[RequestDBStats]] = ContextVar("current_request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = current_request_db.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Attach query counting/timing to a SQLAlchemy engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # Route templates keep label cardinality bounded; unmatched paths share one label
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, safe for streaming responses)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        db_stats = RequestDBStats()
+        token = current_request_db.set(db_stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            current_request_db.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            HTTP_DB_QUERIES.observe(db_stats.queries, method=method, route=route)
+            HTTP_DB_TIME.observe(db_stats.seconds, method=method, route=route)
@@ -1,7 +1,8 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Float,
-    Index, CheckConstraint, func
+    Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Enum, Float,
+    Index, CheckConstraint, JSON, func
 )
+from sqlalchemy import DDL, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 import sqlalchemy as sa
@@ -20,6 +21,8 @@ class QASet(Base):
     job_title = Column(String(50), nullable=False, index=True)
     name = Column(String(200), nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Bumped whenever one of the set's questions changes; feeds ETags (see app.etag)
+    version = Column(Integer, nullable=False, server_default=sa.text("0"))
 
     questions = relationship(
         "Question",
@@ -45,14 +48,30 @@ class Question(Base):
     # DB-side default; avoids None when not provided (use sa.text to avoid shadowing by the 'text' column above):
     flagged = Column(Boolean, nullable=False, server_default=sa.text("false"))
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Near-duplicate detection (see app.dedup): sha256 of the normalized text, and the
+    # root question of the duplicate group this one was linked to on insert
+    content_hash = Column(String(64), nullable=True, index=True)
+    duplicate_of = Column(Integer, ForeignKey("questions.id", ondelete="SET NULL"), nullable=True, index=True)
+    # Practice scheduling (see app.practice): due time in epoch seconds (NULL: never practiced)
+    # and the precomputed sort key GET /api/practice/next reads through an index
+    practiced_at = Column(DateTime(timezone=True), nullable=True)
+    practice_count = Column(Integer, nullable=False, server_default=sa.text("0"))
+    practice_streak = Column(Integer, nullable=False, server_default=sa.text("0"))
+    practice_due_at = Column(Float, nullable=True)
+    practice_priority = Column(Float, nullable=False, server_default=sa.text("0"))
 
     qa_set = relationship("QASet", back_populates="questions")
 
     __table_args__ = (
         # Common pattern: filter by set_id and sort by created_at
         Index("ix_questions_set_created_at", "set_id", "created_at"),
+        # Keyset pagination: WHERE set_id = ? AND id < ? ORDER BY id DESC
+        Index("ix_questions_set_id_id", "set_id", "id"),
         # Useful filter in UI
         Index("ix_questions_flagged", "flagged"),
+        # Next question to practice: ORDER BY practice_priority, id LIMIT 1, per set or overall
+        Index("ix_questions_set_practice_priority", "set_id", "practice_priority", "id"),
+        Index("ix_questions_practice_priority", "practice_priority", "id"),
         # Enforce difficulty range at the DB level (or allow NULL):
         CheckConstraint(
             "(difficulty IS NULL) OR (difficulty >= 1 AND difficulty <= 5)",
@@ -61,4 +80,143 @@ class Question(Base):
     )
 
     def __repr__(self) -> str:
-        return f"<Question id={self.id} set_id={self.set_id} type={self.type}>"
\ No newline at end of file
+        return f"<Question id={self.id} set_id={self.set_id} type={self.type}>"
+
+
+class QuestionLSHBucket(Base):
+    """MinHash LSH bucket membership; one row per (band bucket, question)."""
+    __tablename__ = "question_lsh_buckets"
+
+    bucket = Column(BigInteger, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    def __repr__(self) -> str:
+        return f"<QuestionLSHBucket bucket={self.bucket} question_id={self.question_id}>"
+
+
+# Full-text search over questions.text / user_answer (see app.search).
+# Postgres: generated tsvector column + GIN index (also added by migration 20261017_0006).
+# SQLite: external-content FTS5 table kept in sync by triggers, so tests and
+# local dev exercise the same feature offline.
+_SEARCH_DDL = [
+    DDL("""
+        ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(text, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(user_answer, '')), 'B')
+        ) STORED
+    """).execute_if(dialect="postgresql"),
+    DDL("CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)")
+    .execute_if(dialect="postgresql"),
+    DDL("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts
+        USING fts5(text, user_answer, content='questions', content_rowid='id')
+    """).execute_if(dialect="sqlite"),
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+            INSERT INTO questions_fts(rowid, text, user_answer) VALUES (new.id, new.text, new.user_answer);
+        END
+    """).execute_if(dialect="sqlite"),
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, text, user_answer)
+            VALUES ('delete', old.id, old.text, old.user_answer);
+        END
+    """).execute_if(dialect="sqlite"),
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF text, user_answer ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, text, user_answer)
+            VALUES ('delete', old.id, old.text, old.user_answer);
+            INSERT INTO questions_fts(rowid, text, user_answer) VALUES (new.id, new.text, new.user_answer);
+        END
+    """).execute_if(dialect="sqlite"),
+]
+for _ddl in _SEARCH_DDL:
+    event.listen(Question.__table__, "after_create", _ddl)
+event.listen(Question.__table__, "before_drop", DDL("DROP TABLE IF EXISTS questions_fts").execute_if(dialect="sqlite"))
+
+
+class AppStats(Base):
+    """Single-row running aggregates behind GET /api/stats (see app.stats)."""
+    __tablename__ = "app_stats"
+
+    id = Column(Integer, primary_key=True)  # always 1
+    total_sets = Column(Integer, nullable=False, server_default=sa.text("0"))
+    total_questions = Column(Integer, nullable=False, server_default=sa.text("0"))
+    flagged_questions = Column(Integer, nullable=False, server_default=sa.text("0"))
+    difficulty_sum = Column(Float, nullable=False, server_default=sa.text("0"))
+    difficulty_count = Column(Integer, nullable=False, server_default=sa.text("0"))
+    # Bumped by every write that goes through apply_delta; feeds ETags (see app.etag)
+    version = Column(BigInteger, nullable=False, server_default=sa.text("0"))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<AppStats sets={self.total_sets} questions={self.total_questions}>"
+
+
+class GenerationCache(Base):
+    __tablename__ = "generation_cache"
+
+    # Normalized job title (see app.cache.normalize_job_title)
+    key = Column(String(200), primary_key=True)
+    job_title = Column(String(50), nullable=False)
+    questions = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<GenerationCache key={self.key!r}>"
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class GenerationJob(Base):
+    """Durable generate request, run by the workers in app.jobs."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True)
+    job_title = Column(String(50), nullable=False)
+    name = Column(String(200), nullable=True)
+    save = Column(Boolean, nullable=False, server_default=sa.false())
+    status = Column(String(16), nullable=False, server_default=JobStatus.queued.value)
+    attempts = Column(Integer, nullable=False, server_default=sa.text("0"))
+    # Not claimable before this time (retry backoff)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(64), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    questions = Column(JSON, nullable=True)
+    set_id = Column(Integer, ForeignKey("qa_sets.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Claim query: next runnable queued job, or a running one whose lease expired
+        Index("ix_generation_jobs_status_run_after", "status", "run_after"),
+        CheckConstraint(
+            "status IN ('queued', 'running', 'succeeded', 'failed')", name="ck_generation_jobs_status",
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return f"<GenerationJob id={self.id} status={self.status}>"
+
+
+class RateLimitBucket(Base):
+    """Token bucket state shared by all workers (RATE_LIMIT_BACKEND=db), see app.ratelimit."""
+    __tablename__ = "rate_limit_buckets"
+
+    # "<METHOD> <route>|<client>"
+    key = Column(String(200), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Epoch seconds of the last refill; epoch floats keep the refill arithmetic portable
+    updated_at = Column(Float, nullable=False, index=True)
+    # Outcome of the last take, so a single upsert ... RETURNING reports it
+    allowed = Column(Boolean, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RateLimitBucket key={self.key!r} tokens={self.tokens}>"
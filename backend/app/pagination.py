@@ -0,0 +1,21 @@
+import base64
+import json
+
+
+# Opaque keyset cursors for id DESC listings. Clients must treat them as
+# tokens; the encoding is free to change as long as decode accepts old ones.
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = data["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid cursor")
+    return last_id
@@ -0,0 +1,107 @@
+"""
+Practice scheduler (GET /api/practice/next, POST /api/practice/{qid}/result).
+
+Spaced-repetition style: a correct answer pushes a question's next due time
+out by PRACTICE_BASE_INTERVAL_HOURS * 2^(streak - 1), shorter for harder
+questions and capped at PRACTICE_MAX_INTERVAL_DAYS. An incorrect answer
+resets the streak and brings it back after PRACTICE_RETRY_MINUTES. Questions
+never practiced are due immediately.
+
+questions.practice_priority stores the due time (epoch seconds, 0 if never
+practiced), shifted earlier for flagged and harder questions and later for
+answered ones. Writers keep it current: this module on results,
+PATCH on flagged/difficulty/user_answer edits. "Next" is then one lookup on
+ix_questions_set_practice_priority (or ix_questions_practice_priority without
+a set): ORDER BY practice_priority, id LIMIT 1.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import time
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+# Priority offsets in seconds. A plain new question (not flagged, no answer,
+# no difficulty) has priority 0, the column's server default.
+FLAGGED_BOOST = 21600.0
+ANSWERED_DELAY = 10800.0
+DIFFICULTY_BOOST = 3600.0  # per difficulty point above 3
+DEFAULT_DIFFICULTY = 3.0
+
+
+def priority(due_at: Optional[float], flagged: bool, user_answer: Optional[str],
+             difficulty: Optional[float]) -> float:
+    """practice_priority for a question; lower is practiced sooner. Mirrors priority_expr()."""
+    return (
+        (due_at or 0.0)
+        - (FLAGGED_BOOST if flagged else 0.0)
+        + (ANSWERED_DELAY if user_answer else 0.0)
+        - ((DEFAULT_DIFFICULTY if difficulty is None else difficulty) - DEFAULT_DIFFICULTY) * DIFFICULTY_BOOST
+    )
+
+
+def priority_expr():
+    """priority() as a SQL expression over the questions columns, for set-based UPDATEs."""
+    Q = models.Question
+    return (
+        func.coalesce(Q.practice_due_at, 0.0)
+        - case((Q.flagged, FLAGGED_BOOST), else_=0.0)
+        + case((func.coalesce(func.length(Q.user_answer), 0) > 0, ANSWERED_DELAY), else_=0.0)
+        - (func.coalesce(Q.difficulty, DEFAULT_DIFFICULTY) - DEFAULT_DIFFICULTY) * DIFFICULTY_BOOST
+    )
+
+
+def refresh(q: models.Question) -> None:
+    """Recompute practice_priority after flagged/difficulty/user_answer changed."""
+    q.practice_priority = priority(q.practice_due_at, q.flagged, q.user_answer, q.difficulty)
+
+
+def interval_seconds(correct: bool, streak: int, difficulty: Optional[float]) -> float:
+    if not correct:
+        return settings.practice_retry_minutes * 60.0
+    # Difficulty 1 stretches the interval by 5/3, difficulty 5 shrinks it to 1/3
+    ease = (6.0 - (DEFAULT_DIFFICULTY if difficulty is None else difficulty)) / 3.0
+    interval = settings.practice_base_interval_hours * 3600.0 * 2 ** (streak - 1) * ease
+    return min(interval, settings.practice_max_interval_days * 86400.0)
+
+
+def record(q: models.Question, outcome: str, now: Optional[float] = None) -> None:
+    """Apply a practice outcome ("correct" or "incorrect") to q; no commit."""
+    now = time.time() if now is None else now
+    correct = outcome == "correct"
+    q.practice_count = (q.practice_count or 0) + 1
+    q.practice_streak = (q.practice_streak or 0) + 1 if correct else 0
+    q.practiced_at = datetime.fromtimestamp(now, timezone.utc)
+    q.practice_due_at = now + interval_seconds(correct, q.practice_streak, q.difficulty)
+    refresh(q)
+
+
+def next_question(db: Session, set_id: Optional[int] = None) -> Optional[models.Question]:
+    Q = models.Question
+    stmt = select(Q).order_by(Q.practice_priority, Q.id).limit(1)
+    if set_id is not None:
+        stmt = stmt.where(Q.set_id == set_id)
+    return db.scalars(stmt).first()
+
+
+def state(q: models.Question, now: Optional[float] = None) -> Dict:
+    """PracticeQuestion fields for q."""
+    now = time.time() if now is None else now
+    due_at = q.practice_due_at
+    return {
+        "id": q.id,
+        "set_id": q.set_id,
+        "type": q.type,
+        "text": q.text,
+        "user_answer": q.user_answer,
+        "difficulty": q.difficulty,
+        "flagged": q.flagged,
+        "practiced_at": q.practiced_at,
+        "practice_count": q.practice_count or 0,
+        "practice_streak": q.practice_streak or 0,
+        "due_at": datetime.fromtimestamp(due_at, timezone.utc) if due_at is not None else None,
+        "due": due_at is None or due_at <= now,
+    }
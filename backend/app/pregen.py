@@ -0,0 +1,168 @@
+"""
+Background pre-generation pool (PREGEN_ENABLED=true).
+
+Generate traffic is skewed toward a few dozen job titles. A worker started
+from the app lifespan keeps up to PREGEN_BATCHES_PER_TITLE validated question
+batches ready for the PREGEN_TOP_N most popular titles, ranked by saved sets
+(qa_sets.job_title, refreshed periodically) plus recent generate requests.
+api_generate takes a batch when one is ready and wakes the worker to refill.
+The pool is checked before the generation cache and its batches are never
+stored there: with both on, a popular title is served fresh pool batches and
+only falls through to the cache (and then the LLM) when its batches run out.
+
+The worker never makes more than PREGEN_MAX_CALLS_PER_MINUTE LLM calls and
+stops filling at PREGEN_MAX_BATCHES in total, so it cannot exhaust the quota.
+"""
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from app import models
+from app.cache import normalize_job_title
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.llm import _fallback_questions, async_generator
+
+logger = logging.getLogger("app.pregen")
+
+
+class PregenPool:
+    """Ready batches per normalized job title, plus the popularity ranking that decides what to fill."""
+
+    def __init__(self, top_n: int, batches_per_title: int, max_batches: int, max_calls_per_minute: float,
+                 generator: Optional[Callable[[str, str], Awaitable[List[Dict]]]] = None):
+        self.top_n = top_n
+        self.batches_per_title = batches_per_title
+        self.max_batches = max_batches
+        self.min_call_interval = 60.0 / max_calls_per_minute if max_calls_per_minute > 0 else float("inf")
+        # (job_title, coalescing key) -> questions; a separate key keeps pool fills from
+        # sharing a call (and so a batch) with a live request for the same title
+        self.generator = generator or (lambda title, key: async_generator.generate(title, key=f"pregen:{key}"))
+        self._pool: Dict[str, Deque[List[Dict]]] = {}
+        self._titles: Dict[str, str] = {}
+        self._request_counts: Counter = Counter()
+        self._db_counts: Counter = Counter()
+        self._next_call_at = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self.rejected = 0
+
+    # -- request side -------------------------------------------------------
+
+    def record(self, job_title: str) -> None:
+        key = normalize_job_title(job_title)
+        self._request_counts[key] += 1
+        self._titles.setdefault(key, job_title)
+
+    def take(self, job_title: str) -> Optional[List[Dict]]:
+        batches = self._pool.get(normalize_job_title(job_title))
+        if not batches:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._wake is not None:
+            self._wake.set()
+        return batches.popleft()
+
+    # -- worker side --------------------------------------------------------
+
+    def size(self) -> int:
+        return sum(len(b) for b in self._pool.values())
+
+    def top_titles(self) -> List[Tuple[str, str]]:
+        scores = self._db_counts + self._request_counts
+        return [(key, self._titles[key]) for key, _ in scores.most_common(self.top_n) if key in self._titles]
+
+    def load_popularity(self, rows) -> None:
+        """Replace the saved-set counts with (job_title, count) rows; decay request counts."""
+        counts: Counter = Counter()
+        for job_title, n in rows:
+            key = normalize_job_title(job_title)
+            counts[key] += n
+            self._titles.setdefault(key, job_title)
+        self._db_counts = counts
+        # Halve request counts each refresh so popularity follows recent traffic
+        self._request_counts = Counter({k: v // 2 for k, v in self._request_counts.items() if v // 2})
+        # Forget display titles nothing refers to any more, or every title ever requested stays
+        self._titles = {k: t for k, t in self._titles.items()
+                        if k in counts or k in self._request_counts or k in self._pool}
+
+    async def _rate_limit(self) -> None:
+        delay = self._next_call_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_call_at = time.monotonic() + self.min_call_interval
+
+    async def fill_once(self) -> int:
+        """One pass over the top titles; returns the number of batches added."""
+        added = 0
+        top = self.top_titles()
+        # Titles that dropped out of the top N give their slots back
+        keep = {key for key, _ in top}
+        for key in [k for k in self._pool if k not in keep]:
+            del self._pool[key]
+        for key, title in top:
+            while len(self._pool.get(key, ())) < self.batches_per_title:
+                if self.size() >= self.max_batches:
+                    return added
+                await self._rate_limit()
+                self.llm_calls += 1
+                questions = await self.generator(title, key)
+                # Degraded answers are what live requests get on failure; never pool them
+                if not questions or questions == _fallback_questions(title):
+                    self.rejected += 1
+                    break
+                self._pool.setdefault(key, deque()).append(questions)
+                added += 1
+        return added
+
+    async def run(self, interval_seconds: float, popularity_refresh_seconds: float) -> None:
+        """Worker loop for the lifespan task: refill every interval or when a batch is taken."""
+        self._wake = asyncio.Event()
+        refreshed_at = float("-inf")
+        while True:
+            try:
+                if time.monotonic() - refreshed_at >= popularity_refresh_seconds:
+                    async with AsyncSessionLocal() as db:
+                        rows = await db.execute(
+                            select(models.QASet.job_title, func.count())
+                            .group_by(models.QASet.job_title)
+                            .order_by(func.count().desc())
+                            .limit(self.top_n * 4)
+                        )
+                        self.load_popularity(rows.all())
+                    refreshed_at = time.monotonic()
+                await self.fill_once()
+            except Exception:
+                logger.exception("pre-generation pass failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": settings.pregen_enabled,
+            "batches": self.size(),
+            "max_batches": self.max_batches,
+            "titles": {self._titles[k]: len(b) for k, b in self._pool.items() if b},
+            "hits": self.hits,
+            "misses": self.misses,
+            "llm_calls": self.llm_calls,
+            "rejected": self.rejected,
+        }
+
+
+pool = PregenPool(
+    top_n=settings.pregen_top_n,
+    batches_per_title=settings.pregen_batches_per_title,
+    max_batches=settings.pregen_max_batches,
+    max_calls_per_minute=settings.pregen_max_calls_per_minute,
+)
@@ -0,0 +1,137 @@
+"""
+Per-request SQL profiler (debug aid, QUERY_PROFILER_ENABLED=true).
+
+Collects every statement a request executes on the request engine with its
+duration and normalized shape, logs slow statements with their parameters,
+warns when one shape repeats often enough to look like an N+1 loop, and can
+report the totals in Server-Timing / X-Query-Count response headers.
+"""
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import logging
+import re
+import time
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger("app.profiler")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|:\w+|\$\d+|\?|%s")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement shape: literals and bind markers become ?, IN lists collapse to IN (?...)."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (?...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+@dataclass
+class QueryRecord:
+    sql: str
+    shape: str
+    seconds: float
+    executemany: bool
+
+
+@dataclass
+class RequestProfile:
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(q.seconds for q in self.queries)
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times, most frequent first."""
+        counts = Counter(q.shape for q in self.queries)
+        return [(shape, n) for shape, n in counts.most_common() if n >= threshold]
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profiler_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    starts = conn.info.get("profiler_query_start")
+    if profile is None or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    profile.queries.append(QueryRecord(statement, normalize_sql(statement), elapsed, executemany))
+    if elapsed * 1000 >= settings.query_profiler_slow_ms:
+        logger.warning(
+            "slow query (%.1f ms): %s params=%r",
+            elapsed * 1000, _SPACE_RE.sub(" ", statement).strip(), _truncate(parameters),
+        )
+
+
+def _truncate(parameters, limit: int = 10):
+    # executemany batches can carry thousands of rows; the first few are enough to reproduce
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+        return list(parameters[:limit]) + ([f"... {len(parameters) - limit} more"] if len(parameters) > limit else [])
+    return parameters
+
+
+def instrument_engine(engine) -> None:
+    """Attach the profiler to a SQLAlchemy engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryProfilerMiddleware:
+    """
+    Pure ASGI middleware. Headers carry the statements executed before the response
+    started; statements run while a streaming body is produced appear only in the log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.query_profiler_headers:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(profile.count).encode()))
+                headers.append((b"server-timing", f"db;dur={profile.seconds * 1000:.3f};desc=\"{profile.count} queries\"".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            _report(scope, profile)
+
+
+def _report(scope, profile: RequestProfile) -> None:
+    path = scope.get("path")
+    for shape, n in profile.repeated_shapes(settings.query_profiler_n_plus_one_threshold):
+        logger.warning("possible N+1 on %s %s: %d x %s", scope["method"], path, n, shape)
+    logger.info("%s %s: %d queries, %.1f ms in DB", scope["method"], path, profile.count, profile.seconds * 1000)
@@ -0,0 +1,259 @@
+"""
+Admission control and per-client rate limiting (RATE_LIMIT_ENABLED=true).
+
+AdmissionMiddleware runs before routing, so rejected requests cost no
+body parsing, DB session or threadpool slot:
+
+- Global in-flight cap (ADMISSION_MAX_IN_FLIGHT): excess requests are shed
+  with 503 + Retry-After instead of queuing without bound.
+- Per-route token buckets (RATE_LIMIT_ROUTES), keyed by API key (X-API-Key)
+  or client IP: 429 + Retry-After once a client's bucket is empty.
+
+Buckets live in process memory by default; RATE_LIMIT_BACKEND=db keeps them
+in the rate_limit_buckets table so every worker shares one budget.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+
+from sqlalchemy import case, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics, models
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger("app.ratelimit")
+
+API_KEY_HEADER = b"x-api-key"
+_EXEMPT_PATHS = {"/healthz", "/metrics"}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """`rate` requests per `period` seconds, with bursts of up to `burst`."""
+    method: str
+    path: str
+    pattern: Pattern
+    rate: float
+    period: float
+    burst: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+    @property
+    def per_second(self) -> float:
+        return self.rate / self.period
+
+
+def parse_rules(spec: str) -> List[Rule]:
+    """
+    "METHOD /path/{param}=RATE/PERIOD[:BURST], ..." -> rules; BURST defaults to RATE.
+    ValueError on a malformed entry, so a typo fails at startup rather than disabling a limit.
+    """
+    rules = []
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        try:
+            target, limit = entry.rsplit("=", 1)
+            method, path = target.split()
+            rate, _, rest = limit.partition("/")
+            period, _, burst = rest.partition(":")
+            rate_f, period_f = float(rate), float(period)
+            burst_f = float(burst) if burst else rate_f
+        except ValueError:
+            raise ValueError(f"Invalid rate limit rule {entry!r}; expected 'METHOD /path=RATE/PERIOD[:BURST]'")
+        if rate_f <= 0 or period_f <= 0 or burst_f < 1:
+            raise ValueError(f"Invalid rate limit rule {entry!r}; rate and period must be > 0, burst >= 1")
+        pattern = re.compile("^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path)) + "$")
+        rules.append(Rule(method.upper(), path, pattern, rate_f, period_f, burst_f))
+    return rules
+
+
+def match_rule(rules: List[Rule], method: str, path: str) -> Optional[Rule]:
+    for rule in rules:
+        if rule.method == method and rule.pattern.match(path):
+            return rule
+    return None
+
+
+def client_key(scope) -> str:
+    """API key (hashed; never stored in clear) if sent, else the client IP."""
+    headers = dict(scope.get("headers") or [])
+    api_key = headers.get(API_KEY_HEADER)
+    if api_key:
+        return "key:" + hashlib.sha256(api_key).hexdigest()[:32]
+    if settings.rate_limit_trust_forwarded:
+        forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",")[0].strip()
+        if forwarded:
+            return "ip:" + forwarded
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def refill(tokens: float, updated_at: float, now: float, rule: Rule) -> float:
+    return min(rule.burst, tokens + max(0.0, now - updated_at) * rule.per_second)
+
+
+def retry_after(tokens: float, rule: Rule) -> float:
+    """Seconds until the bucket holds one whole token again."""
+    return max(0.0, 1.0 - tokens) / rule.per_second
+
+
+class MemoryBackend:
+    """Per-process buckets (LRU-bounded); each worker enforces the limit on its own."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rule: Rule, now: float) -> Tuple[bool, float]:
+        """(allowed, tokens left). No await between read and write, so it's atomic on the event loop."""
+        tokens, updated_at = self._buckets.pop(key, (rule.burst, now))
+        tokens = refill(tokens, updated_at, now, rule)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class DBBackend:
+    """
+    Buckets in rate_limit_buckets, shared by every worker. Each take is one
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING, so concurrent workers can't
+    both spend the last token. Rows idle for a day are pruned now and then.
+    """
+
+    PRUNE_EVERY = 1000
+    IDLE_SECONDS = 86400
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._takes = 0
+
+    def _upsert(self, dialect: str):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
+
+    async def take(self, key: str, rule: Rule, now: float) -> Tuple[bool, float]:
+        B = models.RateLimitBucket
+        async with self.session_factory() as db:
+            insert = self._upsert(db.get_bind().dialect.name)
+            # Guarded against a worker whose clock is behind the stored timestamp
+            elapsed = case((B.updated_at < now, now - B.updated_at), else_=0.0)
+            refilled = B.tokens + elapsed * rule.per_second
+            current = case((refilled > rule.burst, rule.burst), else_=refilled)
+            stmt = insert(B).values(key=key, tokens=rule.burst - 1, updated_at=now, allowed=True)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[B.key],
+                set_={
+                    "tokens": case((current >= 1, current - 1), else_=current),
+                    "updated_at": now,
+                    "allowed": current >= 1,
+                },
+            ).returning(B.allowed, B.tokens)
+            allowed, tokens = (await db.execute(stmt)).one()
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                await self._prune(db, now)
+            await db.commit()
+        return bool(allowed), tokens
+
+    async def _prune(self, db: AsyncSession, now: float) -> None:
+        B = models.RateLimitBucket
+        await db.execute(delete(B).where(B.updated_at < now - self.IDLE_SECONDS))
+
+
+class RateLimiter:
+    def __init__(self, rules: List[Rule], backend):
+        self.rules = rules
+        self.backend = backend
+        self.limited = 0
+        self.errors = 0
+
+    async def check(self, rule: Rule, client: str) -> Tuple[bool, float, float]:
+        """(allowed, tokens left, retry-after seconds). Fails open if the backend is down."""
+        try:
+            allowed, tokens = await self.backend.take(f"{rule.name}|{client}", rule, time.time())
+        except Exception:
+            self.errors += 1
+            logger.exception("rate limit backend failed; allowing request")
+            return True, 0.0, 0.0
+        if not allowed:
+            self.limited += 1
+        return allowed, tokens, (0.0 if allowed else retry_after(tokens, rule))
+
+
+def _reject(status: int, detail: str, retry: float, extra: Optional[Dict[bytes, bytes]] = None):
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"retry-after", str(max(1, math.ceil(retry))).encode()),
+    ]
+    headers += list((extra or {}).items())
+    body = json.dumps({"detail": detail}).encode()
+    return [
+        {"type": "http.response.start", "status": status, "headers": headers},
+        {"type": "http.response.body", "body": body},
+    ]
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: global in-flight cap (503) and per-route token buckets (429)."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None, max_in_flight: Optional[int] = None):
+        self.app = app
+        self.limiter = limiter or default_limiter()
+        self.max_in_flight = settings.admission_max_in_flight if max_in_flight is None else max_in_flight
+        self.in_flight = 0
+        self.shed = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in _EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            metrics.HTTP_SHED.inc(reason="overload")
+            for message in _reject(503, "Server busy, retry shortly", settings.admission_retry_after_seconds):
+                await send(message)
+            return
+
+        rule = match_rule(self.limiter.rules, scope["method"], scope["path"])
+        if rule is not None:
+            allowed, tokens, retry = await self.limiter.check(rule, client_key(scope))
+            if not allowed:
+                metrics.HTTP_SHED.inc(reason="rate_limit")
+                extra = {b"x-ratelimit-limit": f"{rule.rate:g}/{rule.period:g}s".encode(),
+                         b"x-ratelimit-remaining": b"0"}
+                for message in _reject(429, "Rate limit exceeded", retry, extra):
+                    await send(message)
+                return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def default_limiter() -> RateLimiter:
+    backend = DBBackend() if settings.rate_limit_backend == "db" else MemoryBackend(settings.rate_limit_max_keys)
+    rules = parse_rules(settings.rate_limit_routes) if settings.rate_limit_enabled else []
+    return RateLimiter(rules, backend)
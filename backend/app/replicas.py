@@ -0,0 +1,122 @@
+"""
+Read-replica routing (DATABASE_REPLICA_URLS).
+
+Read-only routes take their session from get_read_db, which round-robins over
+the replicas and falls back to the primary when none is reachable. A replica
+whose connection fails is skipped for REPLICA_RETRY_SECONDS, then tried again.
+
+Read-your-writes: after a successful write the response carries a short-lived
+primary pin cookie, and any request can ask for the primary explicitly with
+the X-Read-Primary header.
+"""
+from typing import Dict, List, Optional
+import itertools
+import time
+
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+from app.database import engine_options, async_database_url
+
+PIN_COOKIE = "read_primary_until"
+PIN_HEADER = "x-read-primary"
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReplicaRouter:
+    """Round-robin over replica engines with passive health checks."""
+
+    def __init__(self, urls: List[str], retry_seconds: float):
+        self.urls = urls
+        self.retry_seconds = retry_seconds
+        self.engines = [
+            create_async_engine(async_database_url(url), pool_pre_ping=True, **engine_options(url, True))
+            for url in urls
+        ]
+        self._sessionmakers = [
+            async_sessionmaker(e, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            for e in self.engines
+        ]
+        self._next = itertools.count()
+        self._down_until = [0.0] * len(urls)
+        self.reads = [0] * len(urls)
+        self.failovers = 0
+        self.primary_fallbacks = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    async def open_session(self) -> Optional[AsyncSession]:
+        """Connected session on the next healthy replica, or None to use the primary."""
+        for _ in range(len(self.engines)):
+            i = next(self._next) % len(self.engines)
+            if self._down_until[i] > time.monotonic():
+                continue
+            db = self._sessionmakers[i]()
+            try:
+                # Checks out (and pre-pings) a connection now, so a dead replica
+                # fails here instead of inside the handler
+                await db.connection()
+            except (DBAPIError, PoolTimeoutError, OSError):
+                # PoolTimeoutError: the replica's pool is exhausted, as bad as unreachable for this read
+                await db.close()
+                self._down_until[i] = time.monotonic() + self.retry_seconds
+                self.failovers += 1
+                continue
+            self.reads[i] += 1
+            return db
+        self.primary_fallbacks += 1
+        return None
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "replicas": [
+                {
+                    "url": make_url(url).render_as_string(hide_password=True),
+                    "healthy": self._down_until[i] <= now,
+                    "reads": self.reads[i],
+                }
+                for i, url in enumerate(self.urls)
+            ],
+            "failovers": self.failovers,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
+
+
+def wants_primary(headers, cookies) -> bool:
+    if headers.get(PIN_HEADER, "").lower() in ("1", "true"):
+        return True
+    try:
+        return float(cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class PrimaryPinMiddleware:
+    """Pure ASGI middleware: pins the client's reads to the primary for a few seconds after a write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in _WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                pin = settings.replica_pin_seconds
+                cookie = f"{PIN_COOKIE}={time.time() + pin:.0f}; Max-Age={pin}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+router = ReplicaRouter(
+    [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()],
+    retry_seconds=settings.replica_retry_seconds,
+)
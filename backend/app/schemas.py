@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Literal
 
@@ -22,12 +23,68 @@ class QuestionOut(BaseModel):
     flagged: bool = False
 
 
+class SearchHit(QuestionOut):
+    rank: float
+
+
+class SearchResults(BaseModel):
+    q: str
+    items: List[SearchHit]
+
+
+class SimilarQuestion(QuestionOut):
+    score: float
+
+
+class SimilarQuestions(BaseModel):
+    id: int
+    items: List[SimilarQuestion]
+
+
+class PracticeQuestion(QuestionOut):
+    practiced_at: Optional[datetime] = None
+    practice_count: int = 0
+    practice_streak: int = 0
+    due_at: Optional[datetime] = None
+    due: bool
+
+
+class PracticeResult(BaseModel):
+    outcome: Literal["correct", "incorrect"]
+
+
+class DuplicateGroup(BaseModel):
+    original: QuestionOut
+    duplicates: List[QuestionOut]
+
+
+class DuplicatesReport(BaseModel):
+    policy: str
+    groups: List[DuplicateGroup]
+
+
 class QuestionPatch(BaseModel):
     user_answer: Optional[str] = None
     difficulty: Optional[float] = Field(None, ge=1, le=5)
     flagged: Optional[bool] = None
 
 
+class QuestionBatchPatchItem(QuestionPatch):
+    id: int
+
+
+class QuestionBatchResult(BaseModel):
+    id: int
+    status: Literal["updated", "not_found"]
+    item: Optional[QuestionOut] = None
+
+
+class QuestionBatchPatchOut(BaseModel):
+    updated: int
+    not_found: int
+    results: List[QuestionBatchResult]
+
+
 # ---------- Sets ----------
 class QASetCreate(BaseModel):
     job_title: str = Field(..., min_length=1, max_length=50, description="Job title (max 50 characters)")
@@ -42,6 +99,52 @@ class QASetOut(BaseModel):
     name: Optional[str] = None
 
 
+class QASetBulkCreate(BaseModel):
+    sets: List[QASetCreate] = Field(..., min_length=1)
+
+
+class QASetBulkResult(BaseModel):
+    index: int  # position in the request's "sets" list
+    status: Literal["created", "error"]
+    id: Optional[int] = None
+    job_title: Optional[str] = None
+    name: Optional[str] = None
+    questions: int = 0  # questions saved (duplicates are not saved under the "skip" policy)
+    duplicates: int = 0
+    error: Optional[str] = None
+
+
+class QASetBulkOut(BaseModel):
+    created: int
+    failed: int
+    results: List[QASetBulkResult]
+
+
+class ImportRecord(QuestionCreate):
+    # One flat line of POST /api/import (the GET /api/questions/export columns);
+    # consecutive lines with the same job_title/name form one set
+    job_title: str = Field(..., min_length=1, max_length=50, description="Job title (max 50 characters)")
+    name: Optional[str] = None
+    user_answer: Optional[str] = None
+    difficulty: Optional[float] = Field(None, ge=1, le=5)
+    flagged: bool = False
+
+
+class ImportLineError(BaseModel):
+    line: int  # 1-based line of the body where the record starts
+    error: str
+
+
+class ImportSummary(BaseModel):
+    format: Literal["ndjson", "csv"]
+    records: int  # records read, valid or not
+    sets: int
+    questions: int  # questions saved (duplicates are not saved under the "skip" policy)
+    duplicates: int
+    failed: int
+    errors: List[ImportLineError]  # first IMPORT_MAX_ERRORS failures
+
+
 # ---------- Generation ----------
 class GenerateRequest(BaseModel):
     job_title: str = Field(..., min_length=1, max_length=50, description="Job title (max 50 characters)")
@@ -51,13 +154,37 @@ class GenerateResponse(BaseModel):
     questions: List[QuestionCreate]
 
 
+class GenerationJobCreate(BaseModel):
+    job_title: str = Field(..., min_length=1, max_length=50, description="Job title (max 50 characters)")
+    name: Optional[str] = None
+    # Save the generated questions as a new set (set_id in the job result)
+    save: bool = False
+
+
+class GenerationJobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    job_title: str
+    name: Optional[str] = None
+    save: bool
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    questions: Optional[List[QuestionCreate]] = None
+    set_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
 # ---------- Pagination & Errors ----------
 class QuestionsPage(BaseModel):
     items: List[QuestionOut]
-    total: int
-    page: int
+    # total/page/pages are only computed in offset mode; cursor mode skips the count
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int  # Add this field for frontend compatibility
+    pages: Optional[int] = None  # Add this field for frontend compatibility
+    next_cursor: Optional[str] = None  # pass as ?after= to fetch the following page
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,64 @@
+from typing import Dict, List, Optional
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+_COLUMNS = "q.id, q.set_id, q.type, q.text, q.user_answer, q.difficulty, q.flagged"
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every token: user input must never be parsed as FTS5 syntax (AND/NEAR/col:...)
+    return " ".join(f'"{tok}"' for tok in _TOKEN_RE.findall(q))
+
+
+def search_questions(
+    db: Session,
+    q: str,
+    set_id: Optional[int] = None,
+    qtype: Optional[str] = None,
+    flagged: Optional[bool] = None,
+    limit: int = 20,
+) -> List[Dict]:
+    """Ranked full-text search over question text and user answers (best match first)."""
+    filters = []
+    params: Dict = {"limit": limit}
+    if set_id is not None:
+        filters.append("q.set_id = :set_id")
+        params["set_id"] = set_id
+    if qtype is not None:
+        filters.append("q.type = :qtype")
+        params["qtype"] = qtype
+    if flagged is not None:
+        filters.append("q.flagged = :flagged")
+        params["flagged"] = flagged
+    where = "".join(f" AND {f}" for f in filters)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        params["q"] = q
+        sql = f"""
+            SELECT {_COLUMNS}, ts_rank(q.search_vector, query) AS rank
+            FROM questions q, websearch_to_tsquery('english', :q) query
+            WHERE q.search_vector @@ query{where}
+            ORDER BY rank DESC, q.id DESC
+            LIMIT :limit
+        """
+    elif dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return []
+        params["q"] = match
+        # bm25() is "lower is better"; negate it so rank sorts like ts_rank
+        sql = f"""
+            SELECT {_COLUMNS}, -bm25(questions_fts) AS rank
+            FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid
+            WHERE questions_fts MATCH :q{where}
+            ORDER BY rank DESC, q.id DESC
+            LIMIT :limit
+        """
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+
+    return [dict(row._mapping) for row in db.execute(text(sql), params)]
@@ -0,0 +1,540 @@
+"""
+"Similar questions" index (GET /api/questions/{qid}/similar).
+
+Question texts are embedded locally, with no LLM call, as hashed TF-IDF vectors:
+word unigrams and bigrams are hashed into DF_SLOTS document-frequency slots,
+weighted by (1 + log tf) * idf and folded into SIMILAR_DIM signed dimensions,
+then L2-normalized. All vectors sit in one float32 matrix. A query is a single
+matrix-vector product (cosine similarity) plus argpartition for the top k. At 1M
+questions and 256 dimensions that is a 1 GB matrix and about 0.1 s per query on
+one core, bound by memory bandwidth (python -m benchmarks.similar).
+
+The index is built in a background thread at startup (retried if that fails)
+and kept current by the write routes (add/remove per question id). With SIMILAR_INDEX_DIR set it lives
+in memory-mapped files. A restart maps them back and embeds only the questions
+added, changed (by content_hash) or deleted since. Only one process writes the
+files (an flock on the directory); other workers map them copy-on-write.
+
+IDF weights come from the document frequencies at the time a question is
+embedded, so they drift slightly as questions are added. Re-embed everything with
+
+    python -m app.similar rebuild
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+from sqlalchemy import select
+
+from app import dedup, models
+from app.config import settings
+from app.database import SessionLocal
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process keeps its own copy
+    fcntl = None
+
+logger = logging.getLogger("app.similar")
+
+VERSION = 1
+DF_SLOTS = 1 << 20
+_SLOT_SHIFT = 32 - 20
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Rows per DB fetch and embedding batch while building or catching up
+_CHUNK = 5000
+_MIN_CAPACITY = 1024
+# Ids per IN (...) list when fetching texts to catch up (SQLite bound-parameter limit)
+_IN_CHUNK = 900
+_FILES = {"vectors": np.float32, "ids": np.int64, "hashes": np.int64}
+# Seconds between meta.json rewrites on the write path. A stale count only hides
+# the newest rows, which the catch-up after a restart embeds again.
+_META_INTERVAL = 30.0
+# Writes queued while loading; past this the queue is dropped and the load reconciles with the DB again
+_MAX_PENDING = 1000
+# Seconds before a failed load is retried
+_RETRY_SECONDS = 30.0
+
+
+def text_hash(content_hash: Optional[str]) -> int:
+    """content_hash as a nonzero int64 (0 marks a deleted row), or 0 when unknown."""
+    if not content_hash:
+        return 0
+    return int(content_hash[:15], 16) or 1
+
+
+def _terms(text: str) -> List[int]:
+    words = dedup.normalize_text(text).split()
+    return [zlib.crc32(t.encode()) for t in words + [f"{a} {b}" for a, b in zip(words, words[1:])]]
+
+
+def term_counts(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(doc index, 32-bit term hash, term frequency) for each distinct term of each text."""
+    hashes = [_terms(t) for t in texts]
+    docs = np.repeat(np.arange(len(texts), dtype=np.uint64), [len(h) for h in hashes])
+    flat = np.fromiter((h for hs in hashes for h in hs), dtype=np.uint64, count=len(docs))
+    keys, tf = np.unique((docs << np.uint64(32)) | flat, return_counts=True)
+    return (keys >> np.uint64(32)).astype(np.int64), keys & np.uint64(0xFFFFFFFF), tf
+
+
+def embed(docs: np.ndarray, terms: np.ndarray, tf: np.ndarray, n: int, dim: int,
+          df: np.ndarray, total_docs: int) -> np.ndarray:
+    """(n, dim) float32 matrix of L2-normalized TF-IDF vectors from term_counts output."""
+    slots = (terms >> np.uint64(_SLOT_SHIFT)).astype(np.int64)
+    mixed = terms * _MIX
+    dims = ((mixed >> np.uint64(33)) % np.uint64(dim)).astype(np.int64)
+    signs = np.where((mixed >> np.uint64(32)) & np.uint64(1), 1.0, -1.0)
+    idf = np.log((1.0 + total_docs) / (1.0 + df[slots])) + 1.0
+    weights = (1.0 + np.log(tf)) * idf * signs
+    vectors = np.bincount(docs * dim + dims, weights=weights, minlength=n * dim).reshape(n, dim)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def count_docs(df: np.ndarray, terms: np.ndarray) -> None:
+    """Add one document occurrence per distinct (doc, term) from term_counts to the slot counts, in place."""
+    if len(terms):
+        df += np.bincount((terms >> np.uint64(_SLOT_SHIFT)).astype(np.int64), minlength=DF_SLOTS).astype(df.dtype)
+
+
+class SimilarIndex:
+    """
+    Row-per-question vector matrix with parallel id and text-hash arrays.
+    Rows are appended and never moved; a deleted question's row is zeroed
+    (hash 0), and re-adding an id rewrites its row in place.
+    """
+
+    def __init__(self, dim: int, path: str = "", session_factory=SessionLocal):
+        self.dim = dim
+        self.path = path
+        self.session_factory = session_factory
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closing = False
+        self._lock_file = None
+        self._owner = False
+        # Writes seen while loading, replayed after it; _overflowed once some were dropped
+        self._pending: List[Tuple[str, tuple]] = []
+        self._overflowed = False
+        self._retry: Optional[threading.Timer] = None
+        self._meta_saved_at = 0.0
+        self._reset_arrays()
+        self.build_seconds: Optional[float] = None
+        self.loaded_from_disk = False
+        self.embedded = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def _reset_arrays(self) -> None:
+        self.count = 0
+        self.docs = 0
+        self.capacity = 0
+        self.vectors = np.zeros((0, self.dim), np.float32)
+        self.ids = np.zeros(0, np.int64)
+        self.hashes = np.zeros(0, np.int64)
+        self.df = np.zeros(DF_SLOTS, np.int32)
+        # Ids are usually appended in ascending order; otherwise lookups go through a cached argsort
+        self._ascending = True
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    # -- storage --------------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _acquire(self) -> bool:
+        os.makedirs(self.path, exist_ok=True)
+        if fcntl is None:
+            return False
+        self._lock_file = open(self._file("lock"), "a+")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+
+    def _map(self, name: str, rows: int, mode: str) -> np.ndarray:
+        shape = (rows, self.dim) if name == "vectors" else (rows,)
+        if self._owner and mode == "r+":
+            # Extend the file first: rows are appended, so growing never moves data
+            size = int(np.prod(shape)) * np.dtype(_FILES[name]).itemsize
+            with open(self._file(f"{name}.bin"), "ab") as f:
+                f.truncate(max(size, os.path.getsize(self._file(f"{name}.bin"))))
+        return np.memmap(self._file(f"{name}.bin"), dtype=_FILES[name], mode=mode, shape=shape)
+
+    def _open_files(self) -> bool:
+        """Map an existing, compatible index from self.path; False if there is none."""
+        try:
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta.get("version") != VERSION or meta.get("dim") != self.dim or meta.get("df_slots") != DF_SLOTS:
+            logger.info("similar index in %s is incompatible; rebuilding", self.path)
+            return False
+        mode = "r+" if self._owner else "c"
+        try:
+            self.capacity = meta["capacity"]
+            self.vectors = self._map("vectors", self.capacity, mode)
+            self.ids = self._map("ids", self.capacity, mode)
+            self.hashes = self._map("hashes", self.capacity, mode)
+            self.df = np.memmap(self._file("df.bin"), dtype=np.int32, mode=mode, shape=(DF_SLOTS,))
+        except (OSError, ValueError):
+            logger.warning("similar index files in %s are unreadable; rebuilding", self.path)
+            self._reset_arrays()
+            return False
+        self.count, self.docs = meta["count"], meta["docs"]
+        ids = self.ids[:self.count]
+        self._ascending = bool(np.all(ids[1:] > ids[:-1]))
+        return True
+
+    def _create_files(self) -> None:
+        for name in _FILES:
+            path = self._file(f"{name}.bin")
+            if os.path.exists(path):
+                os.remove(path)
+        np.memmap(self._file("df.bin"), dtype=np.int32, mode="w+", shape=(DF_SLOTS,)).flush()
+        self.df = np.memmap(self._file("df.bin"), dtype=np.int32, mode="r+", shape=(DF_SLOTS,))
+
+    def _grow(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity, _MIN_CAPACITY)
+        if self._owner:
+            self.vectors = self._map("vectors", capacity, "r+")
+            self.ids = self._map("ids", capacity, "r+")
+            self.hashes = self._map("hashes", capacity, "r+")
+        else:
+            vectors = np.zeros((capacity, self.dim), np.float32)
+            ids, hashes = np.zeros(capacity, np.int64), np.zeros(capacity, np.int64)
+            vectors[:self.count], ids[:self.count], hashes[:self.count] = (
+                self.vectors[:self.count], self.ids[:self.count], self.hashes[:self.count])
+            self.vectors, self.ids, self.hashes = vectors, ids, hashes
+        self.capacity = capacity
+
+    def _save_meta(self) -> None:
+        if not self._owner:
+            return
+        meta = {"version": VERSION, "dim": self.dim, "df_slots": DF_SLOTS,
+                "count": self.count, "docs": self.docs, "capacity": self.capacity}
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file("meta.json"))
+        self._meta_saved_at = time.monotonic()
+
+    def _maybe_save_meta(self) -> None:
+        if time.monotonic() - self._meta_saved_at >= _META_INTERVAL:
+            self._save_meta()
+
+    def flush(self) -> None:
+        with self._lock:
+            for array in (self.vectors, self.ids, self.hashes, self.df):
+                if isinstance(array, np.memmap) and self._owner:
+                    array.flush()
+            self._save_meta()
+
+    # -- lookups and writes (callers hold self._lock) --------------------------
+
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each id, or -1 for ids not in the index."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.count == 0:
+            return np.full(len(ids), -1, np.int64)
+        if self._ascending:
+            order, keys = None, self.ids[:self.count]
+        else:
+            if self._sorted is None:
+                order = np.argsort(self.ids[:self.count], kind="stable")
+                self._sorted = (order, self.ids[:self.count][order])
+            order, keys = self._sorted
+        pos = np.minimum(np.searchsorted(keys, ids), self.count - 1)
+        found = keys[pos] == ids
+        rows = pos if order is None else order[pos]
+        return np.where(found, rows, -1)
+
+    def _upsert(self, ids: Sequence[int], texts: Sequence[str], hashes: Sequence[int]) -> None:
+        # Last write wins for an id repeated in the batch; appended in id order
+        latest = {qid: (text, h) for qid, text, h in zip(ids, texts, hashes)}
+        ids = np.array(sorted(latest), dtype=np.int64)
+        if not len(ids):
+            return
+        texts = [latest[qid][0] for qid in ids.tolist()]
+        rows = self._rows(ids)
+        new = (rows < 0) | (self.hashes[np.maximum(rows, 0)] == 0) if self.count else np.ones(len(ids), bool)
+
+        docs, terms, tf = term_counts(texts)
+        # Only questions entering the index count toward document frequencies
+        counted = new[docs]
+        count_docs(self.df, terms[counted])
+        self.docs += int(new.sum())
+        vectors = embed(docs, terms, tf, len(ids), self.dim, self.df, max(self.docs, 1))
+
+        appended = rows < 0
+        n_new = int(appended.sum())
+        if n_new:
+            self._grow(self.count + n_new)
+            if self.count and ids[appended][0] <= self.ids[self.count - 1]:
+                self._ascending = False
+            rows[appended] = np.arange(self.count, self.count + n_new)
+            self.ids[rows[appended]] = ids[appended]
+            self.count += n_new
+            self._sorted = None
+        self.vectors[rows] = vectors
+        self.hashes[rows] = [latest[qid][1] or 1 for qid in ids.tolist()]
+        self.embedded += len(ids)
+
+    def _remove(self, ids: Sequence[int]) -> None:
+        rows = self._rows(np.array(list(ids), dtype=np.int64))
+        rows = rows[rows >= 0]
+        self.vectors[rows] = 0.0
+        self.hashes[rows] = 0
+
+    # -- loading ----------------------------------------------------------------
+
+    def load(self) -> None:
+        """Map or build the index, catch up with the database and replay writes seen meanwhile."""
+        start = time.perf_counter()
+        with self._lock:
+            self._reset_arrays()
+            # Writes queued so far committed before the reads below, which will see them
+            self._pending, self._overflowed = [], False
+            if self.path and self._lock_file is None:
+                self._owner = self._acquire()
+            self.loaded_from_disk = bool(self.path) and self._open_files()
+        catch_up = self.loaded_from_disk
+        while True:
+            with self.session_factory() as db:
+                self._catch_up(db) if catch_up else self._build(db)
+            with self._lock:
+                if not self._overflowed:
+                    for op, args in self._pending:
+                        self._upsert(*args) if op == "upsert" else self._remove(*args)
+                    self._pending = []
+                    self._ready.set()
+                    break
+                # Too many writes to queue: the database has them all, reconcile again
+                self._overflowed = False
+            catch_up = True
+        self.flush()
+        self.build_seconds = round(time.perf_counter() - start, 3)
+        logger.info("similar index ready: %d questions in %.1fs (%s)", self.count, self.build_seconds,
+                    "mapped from disk" if self.loaded_from_disk else "built")
+
+    def _stream(self, db, stmt):
+        for partition in db.execute(stmt.execution_options(yield_per=_CHUNK)).partitions():
+            if self._closing:
+                return
+            yield partition
+
+    def _build(self, db) -> None:
+        Q = models.Question
+        with self._lock:
+            if self._owner:
+                self._create_files()
+        # Two passes: document frequencies over the whole table first, so every vector gets the same idf
+        df = np.zeros(DF_SLOTS, np.int64)
+        total = 0
+        for rows in self._stream(db, select(Q.text).order_by(Q.id)):
+            _, terms, _ = term_counts([row.text for row in rows])
+            count_docs(df, terms)
+            total += len(rows)
+        with self._lock:
+            self.df[:] = df
+            self.docs = total
+            self._grow(total)
+        for rows in self._stream(db, select(Q.id, Q.text, Q.content_hash).order_by(Q.id)):
+            ids = np.array([row.id for row in rows], dtype=np.int64)
+            docs, terms, tf = term_counts([row.text for row in rows])
+            vectors = embed(docs, terms, tf, len(rows), self.dim, self.df, max(self.docs, 1))
+            with self._lock:
+                self._grow(self.count + len(rows))
+                end = self.count + len(rows)
+                self.vectors[self.count:end] = vectors
+                self.ids[self.count:end] = ids
+                self.hashes[self.count:end] = [
+                    text_hash(row.content_hash) or text_hash(dedup.content_hash(row.text)) for row in rows
+                ]
+                self.count = end
+                self.embedded += len(rows)
+
+    def _catch_up(self, db) -> None:
+        """Embed questions added or changed since the files were written; drop deleted ones."""
+        Q = models.Question
+        db_ids, db_hashes = [], []
+        for rows in self._stream(db, select(Q.id, Q.content_hash)):
+            db_ids.append(np.fromiter((row.id for row in rows), np.int64, len(rows)))
+            db_hashes.append(np.fromiter((text_hash(row.content_hash) for row in rows), np.int64, len(rows)))
+        ids = np.concatenate(db_ids) if db_ids else np.zeros(0, np.int64)
+        hashes = np.concatenate(db_hashes) if db_hashes else np.zeros(0, np.int64)
+        with self._lock:
+            rows = self._rows(ids)
+            stored = self.hashes[np.maximum(rows, 0)] if self.count else np.zeros(len(ids), np.int64)
+            # An unknown (NULL) content_hash can't be compared: such rows are only added if missing
+            stale = (rows < 0) | (stored == 0) | ((hashes != 0) & (stored != hashes))
+            alive = self.ids[:self.count][self.hashes[:self.count] != 0]
+            self._remove(alive[~np.isin(alive, ids)])
+        stale_ids = ids[stale].tolist()
+        for i in range(0, len(stale_ids), _IN_CHUNK):
+            chunk = stale_ids[i:i + _IN_CHUNK]
+            if self._closing:
+                return
+            found = db.execute(select(Q.id, Q.text, Q.content_hash).where(Q.id.in_(chunk))).all()
+            with self._lock:
+                self._upsert(
+                    [row.id for row in found], [row.text for row in found],
+                    [text_hash(row.content_hash) or text_hash(dedup.content_hash(row.text)) for row in found],
+                )
+
+    def start(self) -> None:
+        """Load in a daemon thread: once, or again if the previous load failed."""
+        with self._start_lock:
+            if self._ready.is_set() or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._load_logged, name="similar-index", daemon=True)
+            self._thread.start()
+
+    def _load_logged(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            logger.exception("similar index load failed; retrying in %.0fs", _RETRY_SECONDS)
+            with self._lock:
+                self._pending, self._overflowed = [], False
+            if not self._closing:
+                self._retry = threading.Timer(_RETRY_SECONDS, self.start)
+                self._retry.daemon = True
+                self._retry.start()
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Start loading if needed and wait up to timeout seconds for it to finish."""
+        if self._ready.is_set():
+            return True
+        self.start()
+        return await asyncio.to_thread(self._ready.wait, timeout)
+
+    async def aclose(self) -> None:
+        self._closing = True
+        if self._retry is not None:
+            self._retry.cancel()
+        if self._ready.is_set():
+            self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _queue(self, op: Tuple[str, tuple]) -> None:
+        if self._overflowed:
+            return
+        if len(self._pending) >= _MAX_PENDING:
+            self._pending, self._overflowed = [], True
+            return
+        self._pending.append(op)
+
+    # -- public API ---------------------------------------------------------------
+
+    def add(self, items: Iterable[Tuple[int, str]]) -> None:
+        """
+        Index (or re-index) questions by (id, text), after their transaction committed.
+        Embeds and may grow the files: call it from a thread (asyncio.to_thread) in async code.
+        """
+        items = [(qid, text) for qid, text in items if qid is not None]
+        if not items or not settings.similar_enabled:
+            return
+        args = ([qid for qid, _ in items], [text for _, text in items],
+                [text_hash(dedup.content_hash(text)) for _, text in items])
+        with self._lock:
+            if not self._ready.is_set():
+                self._queue(("upsert", args))
+                return
+            self._upsert(*args)
+            self._maybe_save_meta()
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        if not ids or not settings.similar_enabled:
+            return
+        with self._lock:
+            if not self._ready.is_set():
+                self._queue(("remove", (ids,)))
+                return
+            self._remove(ids)
+            self._maybe_save_meta()
+
+    def query(self, qid: int, k: int) -> Optional[List[Tuple[int, float]]]:
+        """Up to k (id, cosine similarity) pairs, most similar first; None if qid isn't indexed."""
+        start = time.perf_counter()
+        with self._lock:
+            row = int(self._rows([qid])[0])
+            if row < 0 or self.hashes[row] == 0:
+                return None
+            # Rows are only appended or rewritten in place, so the scan can run outside the lock
+            n, vectors, ids = self.count, self.vectors, self.ids
+            target = np.array(vectors[row])
+        scores = vectors[:n] @ target
+        scores[row] = -1.0
+        k = min(k, n - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        hits = [(int(ids[r]), round(float(scores[r]), 4)) for r in top if scores[r] > 0]
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - start
+        return hits
+
+    def stats(self) -> Dict:
+        with self._lock:
+            alive = int(np.count_nonzero(self.hashes[:self.count])) if self._ready.is_set() else None
+        return {
+            "enabled": settings.similar_enabled,
+            "ready": self._ready.is_set(),
+            "dim": self.dim,
+            "rows": self.count,
+            "questions": alive,
+            "persisted": self._owner,
+            "loaded_from_disk": self.loaded_from_disk,
+            "build_seconds": self.build_seconds,
+            "embedded": self.embedded,
+            "queries": self.queries,
+            "query_ms_avg": round(self.query_seconds / self.queries * 1000, 3) if self.queries else None,
+        }
+
+
+index = SimilarIndex(settings.similar_dim, settings.similar_index_dir)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["rebuild"]:
+        print("usage: python -m app.similar rebuild", file=sys.stderr)
+        return 2
+    if not settings.similar_index_dir:
+        print("SIMILAR_INDEX_DIR is not set; the index is rebuilt in memory at every start", file=sys.stderr)
+        return 2
+    index._owner = index._acquire()
+    if not index._owner:
+        print(f"{settings.similar_index_dir} is locked by a running process; stop it first", file=sys.stderr)
+        return 1
+    meta = os.path.join(settings.similar_index_dir, "meta.json")
+    if os.path.exists(meta):
+        os.remove(meta)
+    index.load()
+    asyncio.run(index.aclose())
+    print(f"embedded {index.count} questions in {index.build_seconds}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Running aggregates for GET /api/stats.
+
+Writers call apply_delta() inside their own transaction, so the counters
+commit (or roll back) together with the rows they describe. Every call also
+bumps the global data version, and touch_sets() the per-set versions, that
+ETags are derived from. rebuild() recomputes everything from the base tables
+to repair drift:
+
+    python -m app.stats rebuild
+"""
+from typing import Dict, Iterable, Optional
+import sys
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+STATS_ID = 1
+
+
+def question_delta(old_flagged: bool, old_difficulty: Optional[float],
+                   new_flagged: bool, new_difficulty: Optional[float]) -> Dict:
+    """Counter deltas for a question whose flagged/difficulty changed."""
+    return {
+        "flagged": int(bool(new_flagged)) - int(bool(old_flagged)),
+        "difficulty_sum": (new_difficulty or 0.0) - (old_difficulty or 0.0),
+        "difficulty_count": int(new_difficulty is not None) - int(old_difficulty is not None),
+    }
+
+
+def apply_delta(db: Session, sets: int = 0, questions: int = 0, flagged: int = 0,
+                difficulty_sum: float = 0.0, difficulty_count: int = 0) -> None:
+    """
+    Atomically add deltas to the stats row and bump the data version
+    (no commit; runs in the caller's transaction).
+    """
+    S = models.AppStats
+    result = db.execute(
+        update(S)
+        .where(S.id == STATS_ID)
+        .values(
+            total_sets=S.total_sets + sets,
+            total_questions=S.total_questions + questions,
+            flagged_questions=S.flagged_questions + flagged,
+            difficulty_sum=S.difficulty_sum + difficulty_sum,
+            difficulty_count=S.difficulty_count + difficulty_count,
+            version=S.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # Row missing (fresh DB without the migration seed): derive it from the
+        # base tables, which already include this transaction's flushed changes.
+        db.flush()
+        rebuild(db)
+
+
+def touch_sets(db: Session, set_ids: Iterable[int]) -> None:
+    """Bump the version of sets whose questions changed (no commit)."""
+    set_ids = sorted(set(set_ids))
+    if set_ids:
+        S = models.QASet
+        db.execute(
+            update(S).where(S.id.in_(set_ids)).values(version=S.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def rebuild(db: Session) -> models.AppStats:
+    """Recompute all counters from scratch (no commit)."""
+    Q = models.Question
+    total_sets = db.query(func.count(models.QASet.id)).scalar()
+    total_questions, flagged, diff_sum, diff_count = db.query(
+        func.count(Q.id),
+        func.count(Q.id).filter(Q.flagged.is_(True)),
+        func.coalesce(func.sum(Q.difficulty), 0.0),
+        func.count(Q.difficulty),
+    ).one()
+
+    row = db.get(models.AppStats, STATS_ID)
+    if row is None:
+        row = models.AppStats(id=STATS_ID)
+        db.add(row)
+    row.total_sets = total_sets
+    row.total_questions = total_questions
+    row.flagged_questions = flagged
+    row.difficulty_sum = float(diff_sum)
+    row.difficulty_count = diff_count
+    row.version = (row.version or 0) + 1
+    db.flush()
+    return row
+
+
+def read(db: Session) -> Dict:
+    row = db.get(models.AppStats, STATS_ID)
+    if row is None:
+        row = rebuild(db)
+        db.commit()
+    avg_diff = row.difficulty_sum / row.difficulty_count if row.difficulty_count else None
+    return {
+        "total_sets": row.total_sets,
+        "total_questions": row.total_questions,
+        "flagged_questions": row.flagged_questions,
+        "avg_difficulty": round(avg_diff, 2) if avg_diff is not None else None,
+    }
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["rebuild"]:
+        print("usage: python -m app.stats rebuild", file=sys.stderr)
+        return 2
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        print(read(db))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Microbenchmark: cost of building one GET /api/questions page body, before and
+after the column-tuple + orjson path.
+
+Runs the page query and serialization in-process against a seeded SQLite file
+(no HTTP, no ASGI), so the numbers isolate row hydration, validation and JSON
+encoding. "before" reproduces the old path: ORM objects, QuestionOut per row,
+QuestionsPage validation and model_dump_json (list) or model_dump + json.dumps
+(the legacy /api/questions/page response_model round trip).
+
+    cd backend
+    python -m benchmarks.serialize --page-size 100 --iterations 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--size", type=int, default=5000, help="questions to seed")
+    p.add_argument("--page-size", type=int, default=100)
+    p.add_argument("--iterations", type=int, default=300)
+    p.add_argument("--seed", type=int, default=42)
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.environ["DATABASE_URL"] = f"sqlite+pysqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ.setdefault("CORS_ORIGINS", "http://bench")
+
+    import orjson
+    from sqlalchemy import select
+    from app import schemas
+    from app.database import SessionLocal
+    from app.main import _ITEM_COLUMNS, _item, models
+    from benchmarks.run import reset_and_seed
+
+    reset_and_seed(args.size, random.Random(args.seed))
+    Q = models.Question
+
+    def page_dict(items):
+        return {"items": items, "total": args.size, "page": 1, "size": args.page_size,
+                "pages": (args.size + args.page_size - 1) // args.page_size, "next_cursor": None}
+
+    def before_list(db):
+        rows = db.scalars(select(Q).order_by(Q.id.desc()).limit(args.page_size)).all()
+        items = [schemas.QuestionOut.model_validate(r) for r in rows]
+        return schemas.QuestionsPage.model_validate(page_dict(items)).model_dump_json().encode()
+
+    def before_legacy(db):
+        rows = db.scalars(select(Q).order_by(Q.id.desc()).limit(args.page_size)).all()
+        items = [schemas.QuestionOut.model_validate(r) for r in rows]
+        # What FastAPI did with response_model: validate the dict again, dump, encode
+        page = schemas.QuestionsPage.model_validate(page_dict(items)).model_dump(mode="json")
+        return json.dumps(page, separators=(",", ":")).encode()
+
+    def after(db):
+        rows = db.execute(select(*_ITEM_COLUMNS).order_by(Q.id.desc()).limit(args.page_size)).all()
+        return orjson.dumps(page_dict([_item(r) for r in rows]))
+
+    results = {}
+    with SessionLocal() as db:
+        assert json.loads(before_list(db)) == json.loads(after(db))
+        for name, fn in (("before_list", before_list), ("before_legacy", before_legacy), ("after", after)):
+            fn(db)  # warm-up
+            timings = []
+            for _ in range(args.iterations):
+                t0 = time.perf_counter()
+                fn(db)
+                timings.append((time.perf_counter() - t0) * 1e6)
+            timings.sort()
+            results[name] = {
+                "mean_us": round(statistics.fmean(timings), 1),
+                "p50_us": round(timings[len(timings) // 2], 1),
+                "p95_us": round(timings[int(len(timings) * 0.95)], 1),
+            }
+            print(f"{name:<14} p50={results[name]['p50_us']:>9}us mean={results[name]['mean_us']:>9}us",
+                  file=sys.stderr)
+
+    print(json.dumps({"page_size": args.page_size, "size": args.size, "iterations": args.iterations,
+                      "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Microbenchmark: the "similar questions" index at scale, without the database.
+
+Embeds N synthetic question texts into an in-memory SimilarIndex (the same
+path the write routes use), then times top-k queries. Reports embedding
+throughput, resident matrix size and query latency.
+
+    cd backend
+    python -m benchmarks.similar --size 1000000 --queries 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+_WORDS = (
+    "design api cache database index shard replica queue latency throughput consistency partition "
+    "python java kubernetes docker service deploy monitor incident debug test review mentor conflict "
+    "deadline team customer priority feedback migration schema transaction lock retry timeout scale"
+).split()
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--size", type=int, default=200_000, help="questions to index")
+    p.add_argument("--dim", type=int, default=256)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--batch", type=int, default=5000, help="texts per add() call")
+    p.add_argument("--seed", type=int, default=42)
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+    os.environ.setdefault("CORS_ORIGINS", "http://bench")
+
+    from app.similar import SimilarIndex
+
+    rng = random.Random(args.seed)
+    index = SimilarIndex(args.dim)
+    index._ready.set()  # nothing to load: every row comes from add()
+
+    t0 = time.perf_counter()
+    for start in range(1, args.size + 1, args.batch):
+        ids = range(start, min(start + args.batch, args.size + 1))
+        index.add((qid, " ".join(rng.choices(_WORDS, k=rng.randint(6, 16)))) for qid in ids)
+    embed_s = time.perf_counter() - t0
+    print(f"embedded {args.size} in {embed_s:.1f}s", file=sys.stderr)
+
+    index.query(1, args.k)  # warm-up
+    timings = []
+    for _ in range(args.queries):
+        qid = rng.randint(1, args.size)
+        t0 = time.perf_counter()
+        index.query(qid, args.k)
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    result = {
+        "size": args.size,
+        "dim": args.dim,
+        "matrix_mb": round(index.vectors[:index.count].nbytes / 2**20, 1),
+        "embed_per_second": round(args.size / embed_s),
+        "query_ms": {
+            "mean": round(statistics.fmean(timings), 2),
+            "p50": round(timings[len(timings) // 2], 2),
+            "p95": round(timings[int(len(timings) * 0.95)], 2),
+        },
+    }
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
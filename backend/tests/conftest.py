@@ -1,29 +1,24 @@
-import sys, os
+import sys, os, shutil, tempfile
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
-# Import after setting envs
-os.environ["DATABASE_URL"] = "sqlite+pysqlite:///:memory:"
+# Import after setting envs. A temp-file SQLite database is shared by the app's
+# async engine (aiosqlite) and the sync engine the fixtures use.
+_tmpdir = tempfile.mkdtemp(prefix="interview-prep-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+pysqlite:///{os.path.join(_tmpdir, 'test.db')}"
 os.environ["CORS_ORIGINS"] = "http://testserver"
 
-from app.database import Base
-from app.main import app, get_db
+from app.database import Base, engine as app_engine
+from app.main import app
 from app import models
 
 
 @pytest.fixture(scope="session")
 def engine():
-    from sqlalchemy.pool import StaticPool
-    engine = create_engine(
-        "sqlite+pysqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-    return engine
+    return app_engine
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -31,6 +26,8 @@ def create_tables(engine):
     Base.metadata.create_all(engine)
     yield
     Base.metadata.drop_all(engine)
+    engine.dispose()
+    shutil.rmtree(_tmpdir, ignore_errors=True)
 
 
 @pytest.fixture
@@ -43,16 +40,6 @@ def db_session(engine):
         db.close()
 
 
-@pytest.fixture(autouse=True)
-def override_get_db(db_session):
-    def _override():
-        try:
-            yield db_session
-        finally:
-            pass
-    app.dependency_overrides[get_db] = _override
-
-
 @pytest.fixture
 def client():
     return TestClient(app)
@@ -322,6 +322,15 @@ def test_database_utilities():
     init_db_for_tests()  # Should create tables for tests
 
 
+def test_async_database_url():
+    from app.database import async_database_url
+    assert async_database_url("postgresql+psycopg2://u:pw@db:5432/app") == "postgresql+asyncpg://u:pw@db:5432/app"
+    assert async_database_url("postgresql://u:pw@db/app") == "postgresql+asyncpg://u:pw@db/app"
+    assert async_database_url("sqlite+pysqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    with pytest.raises(ValueError):
+        async_database_url("mysql+pymysql://u@db/app")
+
+
 def test_model_representations():
     """Test model __repr__ methods"""
     qa_set = models.QASet(id=1, job_title="Test Job")
@@ -359,4 +368,312 @@ def test_error_handling_in_endpoints(client):
 
     # Test invalid field types
     res = client.post("/api/questions/generate", json={"job_title": 123})
-    assert res.status_code == 422
\ No newline at end of file
+    assert res.status_code == 422
+
+def test_cursor_pagination(client):
+    """Test keyset (cursor) pagination"""
+    payload = {
+        "job_title": "Cursor Job",
+        "name": "Cursor Set",
+        "questions": [{"type": "technical", "text": f"Cursor question {i}"} for i in range(5)]
+    }
+    res = client.post("/api/questions", json=payload)
+    set_id = res.json()["id"]
+
+    # Empty cursor starts cursor mode; count() is skipped
+    res = client.get(f"/api/questions?set_id={set_id}&size=2&after=")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["total"] is None and data["pages"] is None
+    seen = [q["id"] for q in data["items"]]
+    while data["next_cursor"]:
+        res = client.get(f"/api/questions?set_id={set_id}&size=2&after={data['next_cursor']}")
+        assert res.status_code == 200
+        data = res.json()
+        seen += [q["id"] for q in data["items"]]
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+    # Offset mode hands out a cursor for the rest of the listing
+    res = client.get(f"/api/questions?set_id={set_id}&size=2")
+    data = res.json()
+    assert data["total"] == 5
+    res = client.get(f"/api/questions?set_id={set_id}&size=2&after={data['next_cursor']}")
+    assert [q["id"] for q in res.json()["items"]] == seen[2:4]
+
+    # Malformed cursor
+    res = client.get("/api/questions?after=not-a-cursor")
+    assert res.status_code == 400
+
+
+def test_stats_counters_and_rebuild(client, db_session):
+    """Stats counters track writes and match a full rebuild"""
+    from app import stats as app_stats
+
+    app_stats.rebuild(db_session)
+    db_session.commit()
+    before = client.get("/api/stats").json()
+
+    payload = {
+        "job_title": "Counter Job",
+        "questions": [
+            {"type": "technical", "text": "Counter question 1"},
+            {"type": "behavioral", "text": "Counter question 2"}
+        ]
+    }
+    client.post("/api/questions", json=payload)
+    res = client.get("/api/questions?size=2")
+    qid, other_id = [q["id"] for q in res.json()["items"]]
+    client.patch(f"/api/questions/{qid}", json={"difficulty": 2, "flagged": True})
+    client.patch(f"/api/questions/{qid}", json={"difficulty": 4})
+    client.patch(f"/api/questions/{other_id}", json={"flagged": True})
+    client.delete(f"/api/questions/{other_id}")
+
+    after = client.get("/api/stats").json()
+    assert after["total_sets"] == before["total_sets"] + 1
+    assert after["total_questions"] == before["total_questions"] + 1
+    assert after["flagged_questions"] == before["flagged_questions"] + 1
+
+    # Incremental counters agree with a from-scratch recomputation
+    app_stats.rebuild(db_session)
+    db_session.commit()
+    assert client.get("/api/stats").json() == after
+
+
+def test_bulk_create_sets(client):
+    """Test multi-set import endpoint"""
+    before = client.get("/api/stats").json()
+    payload = {
+        "sets": [
+            {"job_title": "Bulk Job A", "name": "A", "questions": [
+                {"type": "technical", "text": "Bulk A1"}, {"type": "behavioral", "text": "Bulk A2"}]},
+            {"job_title": "   ", "questions": [{"type": "technical", "text": "Never saved"}]},
+            {"job_title": "Bulk Job B", "questions": [{"type": "technical", "text": "Bulk B1"}]},
+        ]
+    }
+    res = client.post("/api/sets/bulk", json=payload)
+    assert res.status_code == 201
+    data = res.json()
+    assert data["created"] == 2 and data["failed"] == 1
+    ok_a, bad, ok_b = data["results"]
+    assert ok_a["status"] == "created" and ok_a["questions"] == 2 and ok_a["index"] == 0
+    assert bad["status"] == "error" and bad["id"] is None
+    assert ok_b["status"] == "created" and ok_b["job_title"] == "Bulk Job B"
+
+    # Questions land in the right sets
+    items = client.get(f"/api/questions?set_id={ok_a['id']}").json()["items"]
+    assert sorted(q["text"] for q in items) == ["Bulk A1", "Bulk A2"]
+    items = client.get(f"/api/questions?set_id={ok_b['id']}").json()["items"]
+    assert [q["text"] for q in items] == ["Bulk B1"]
+
+    after = client.get("/api/stats").json()
+    assert after["total_sets"] == before["total_sets"] + 2
+    assert after["total_questions"] == before["total_questions"] + 3
+
+    # Empty request is rejected by validation
+    res = client.post("/api/sets/bulk", json={"sets": []})
+    assert res.status_code == 422
+
+
+def test_batch_patch_questions(client):
+    """Test batch flag/rate endpoint"""
+    payload = {
+        "job_title": "Batch Job",
+        "questions": [{"type": "technical", "text": f"Batch question {i}"} for i in range(3)]
+    }
+    set_id = client.post("/api/questions", json=payload).json()["id"]
+    ids = [q["id"] for q in client.get(f"/api/questions?set_id={set_id}").json()["items"]]
+    before = client.get("/api/stats").json()
+
+    edits = [
+        {"id": ids[0], "flagged": True, "difficulty": 2},
+        {"id": ids[1], "flagged": True, "difficulty": 2},
+        {"id": ids[2], "user_answer": "Batch answer", "difficulty": 5},
+        {"id": 999999, "flagged": True},
+    ]
+    res = client.patch("/api/questions", json=edits)
+    assert res.status_code == 200
+    data = res.json()
+    assert data["updated"] == 3 and data["not_found"] == 1
+    results = {r["id"]: r for r in data["results"]}
+    assert results[999999]["status"] == "not_found"
+    assert results[ids[0]]["item"]["flagged"] is True
+    assert results[ids[0]]["item"]["difficulty"] == 2
+    assert results[ids[2]]["item"]["user_answer"] == "Batch answer"
+    assert results[ids[2]]["item"]["flagged"] is False
+
+    after = client.get("/api/stats").json()
+    assert after["flagged_questions"] == before["flagged_questions"] + 2
+
+    # Same validation rules as QuestionPatch
+    res = client.patch("/api/questions", json=[{"id": ids[0], "difficulty": 6}])
+    assert res.status_code == 422
+    res = client.patch("/api/questions", json=[{"id": ids[0], "flagged": False}, {"id": ids[0], "flagged": True}])
+    assert res.status_code == 400
+    res = client.patch("/api/questions", json=[])
+    assert res.status_code == 400
+
+
+def test_noop_batch_patch_keeps_data_version(client, db_session):
+    set_id = client.post("/api/questions", json={
+        "job_title": "Noop Batch Job", "questions": [{"type": "technical", "text": "Noop batch question"}],
+    }).json()["id"]
+    qid = client.get(f"/api/questions?set_id={set_id}").json()["items"][0]["id"]
+
+    def versions():
+        db_session.expire_all()
+        return db_session.query(models.AppStats.version).scalar(), db_session.get(models.QASet, set_id).version
+
+    before = versions()
+    res = client.patch("/api/questions", json=[{"id": 999999, "flagged": True}, {"id": qid}])
+    assert res.status_code == 200 and res.json()["updated"] == 1
+    # Nothing changed, so no ETag or response-cache entry is invalidated
+    assert versions() == before
+
+
+def test_search_questions(client):
+    """Test full-text search"""
+    payload = {
+        "job_title": "Search Job",
+        "questions": [
+            {"type": "technical", "text": "How does a zebrafish index work?"},
+            {"type": "behavioral", "text": "Tell me about zebrafish teamwork and zebrafish culture."},
+            {"type": "technical", "text": "Explain caching."}
+        ]
+    }
+    set_id = client.post("/api/questions", json=payload).json()["id"]
+
+    res = client.get("/api/questions/search?q=zebrafish")
+    assert res.status_code == 200
+    items = res.json()["items"]
+    assert len(items) == 2
+    # More occurrences rank higher
+    assert items[0]["type"] == "behavioral"
+    assert items[0]["rank"] >= items[1]["rank"]
+
+    res = client.get(f"/api/questions/search?q=zebrafish&type=technical&set_id={set_id}")
+    assert [q["text"] for q in res.json()["items"]] == ["How does a zebrafish index work?"]
+
+    # Answers are searchable and index updates follow PATCH
+    qid = items[1]["id"]
+    client.patch(f"/api/questions/{qid}", json={"user_answer": "Use a quokka strategy", "flagged": True})
+    res = client.get("/api/questions/search?q=quokka&flagged=true")
+    assert [q["id"] for q in res.json()["items"]] == [qid]
+
+    # Deleted rows drop out; FTS operators in user input are treated as words
+    client.delete(f"/api/questions/{qid}")
+    assert client.get("/api/questions/search?q=quokka").json()["items"] == []
+    assert client.get('/api/questions/search?q=NEAR(" OR *').status_code == 200
+    assert client.get("/api/questions/search?q=").status_code == 422
+
+
+def test_etag_conditional_get(client, monkeypatch):
+    """Test ETags, 304s and version-keyed response cache"""
+    from app.etag import response_cache
+
+    def create(title):
+        res = client.post("/api/questions", json={
+            "job_title": title, "questions": [{"type": "technical", "text": f"ETag question for {title}?"}],
+        })
+        set_id = res.json()["id"]
+        return set_id, client.get(f"/api/questions?set_id={set_id}").json()["items"][0]["id"]
+
+    set_a, qid_a = create("ETag Job A")
+    set_b, qid_b = create("ETag Job B")
+
+    res = client.get("/api/stats")
+    stats_tag = res.headers["etag"]
+    assert res.headers["cache-control"] == "no-cache"
+    res = client.get("/api/stats", headers={"If-None-Match": stats_tag})
+    assert res.status_code == 304 and res.content == b""
+
+    res = client.get(f"/api/questions?set_id={set_a}")
+    tag_a = res.headers["etag"]
+    assert client.get(f"/api/questions?set_id={set_a}", headers={"If-None-Match": f'W/{tag_a}, "x"'}).status_code == 304
+    # Different query parameters, different representation
+    assert client.get(f"/api/questions?set_id={set_a}&size=5").headers["etag"] != tag_a
+
+    # A write to set B leaves set A's tag alone but changes the global ones
+    client.patch(f"/api/questions/{qid_b}", json={"user_answer": "changed"})
+    assert client.get(f"/api/questions?set_id={set_a}", headers={"If-None-Match": tag_a}).status_code == 304
+    assert client.get("/api/stats", headers={"If-None-Match": stats_tag}).status_code == 200
+
+    client.patch(f"/api/questions/{qid_a}", json={"flagged": True})
+    res = client.get(f"/api/questions?set_id={set_a}", headers={"If-None-Match": tag_a})
+    assert res.status_code == 200 and res.json()["items"][0]["flagged"] is True
+    tag_a = res.headers["etag"]
+    client.patch("/api/questions", json=[{"id": qid_a, "difficulty": 2}])
+    assert client.get(f"/api/questions?set_id={set_a}", headers={"If-None-Match": tag_a}).status_code == 200
+    tag_a = client.get(f"/api/questions?set_id={set_a}").headers["etag"]
+    client.delete(f"/api/questions/{qid_a}")
+    res = client.get(f"/api/questions?set_id={set_a}", headers={"If-None-Match": tag_a})
+    assert res.status_code == 200 and res.json()["items"] == []
+
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    first = client.get(f"/api/questions?set_id={set_b}")
+    hits = response_cache.hits
+    second = client.get(f"/api/questions?set_id={set_b}")
+    assert response_cache.hits == hits + 1
+    assert second.json() == first.json() and second.headers["etag"] == first.headers["etag"]
+
+
+def test_export_questions(client, monkeypatch):
+    """Test streaming NDJSON/CSV export, with and without gzip"""
+    import csv
+    import gzip
+    import io
+
+    monkeypatch.setattr(settings, "export_chunk_size", 2)
+    texts = [f"Export question {i}, with \"quotes\"?" for i in range(5)]
+    res = client.post("/api/questions", json={
+        "job_title": "Export Job", "name": "Export set",
+        "questions": [{"type": "technical", "text": t} for t in texts],
+    })
+    set_id = res.json()["id"]
+
+    res = client.get(f"/api/questions/export?set_id={set_id}", headers={"Accept-Encoding": "identity"})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in res.headers
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["text"] for r in rows] == texts
+    assert rows[0]["job_title"] == "Export Job" and rows[0]["name"] == "Export set"
+    assert rows[0]["type"] == "technical" and rows[0]["set_id"] == set_id and rows[0]["difficulty"] is None
+
+    res = client.get(f"/api/questions/export?format=csv&set_id={set_id}", headers={"Accept-Encoding": "identity"})
+    assert res.headers["content-type"].startswith("text/csv")
+    assert 'filename="questions.csv"' in res.headers["content-disposition"]
+    records = list(csv.DictReader(io.StringIO(res.text)))
+    assert [r["text"] for r in records] == texts
+    assert records[0]["difficulty"] == "" and records[0]["flagged"] == "False"
+
+    # gzip on the fly: raw bytes are a valid gzip stream of the same body
+    with client.stream("GET", f"/api/questions/export?set_id={set_id}", headers={"Accept-Encoding": "gzip"}) as res:
+        assert res.headers["content-encoding"] == "gzip"
+        raw = b"".join(res.iter_raw())
+    assert [json.loads(line)["text"] for line in gzip.decompress(raw).decode().splitlines()] == texts
+    res = client.get(f"/api/questions/export?set_id={set_id}", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in res.headers
+
+    # Unknown set exports nothing; bad format is a validation error
+    assert client.get("/api/questions/export?set_id=999999", headers={"Accept-Encoding": "identity"}).text == ""
+    assert client.get("/api/questions/export?format=xml").status_code == 422
+
+
+def test_list_fast_path_matches_schema(client):
+    """Test that the column-tuple/orjson list bodies still match QuestionsPage and the OpenAPI schema"""
+    from app import schemas
+    from app.main import app
+
+    client.post("/api/questions", json={"job_title": "Fast Path", "questions": [
+        {"type": "behavioral", "text": "Fast path question?"}]})
+    for url in ("/api/questions?size=5", "/api/questions?size=5&after=", "/api/questions/page?page_size=5"):
+        body = client.get(url).json()
+        assert body == schemas.QuestionsPage.model_validate(body).model_dump(mode="json")
+    item = client.get("/api/questions?size=1").json()["items"][0]
+    assert item == schemas.QuestionOut.model_validate(item).model_dump(mode="json")
+
+    paths = app.openapi()["paths"]
+    for path in ("/api/questions", "/api/questions/page"):
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema == {"$ref": "#/components/schemas/QuestionsPage"}
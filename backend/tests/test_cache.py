@@ -0,0 +1,86 @@
+import time
+import pytest
+from app import models
+from app.cache import GenerationCache, LRUCache, generation_cache, normalize_job_title
+
+
+def test_normalize_job_title():
+    assert normalize_job_title("Backend Developer") == "back end developer"
+    assert normalize_job_title("  backend   DEV!! ") == "back end developer"
+    assert normalize_job_title("Back-End Developer") == "back end developer"
+    assert normalize_job_title("Sr. SWE") == "senior software engineer"
+    assert normalize_job_title("C++ Dev") == "c++ developer"
+
+
+def test_lru_cache_eviction_and_ttl():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recent
+    cache.set("c", 3)           # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["evictions"] == 1
+
+    cache.set("short", 1, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_generation_cache_memory_and_db(db_session):
+    calls = []
+
+    def fake_generator(job_title):
+        calls.append(job_title)
+        return [{"type": "technical", "text": f"Q about {job_title}"}]
+
+    cache = GenerationCache(max_entries=10, ttl_seconds=60, generator=fake_generator)
+    first = cache.get_or_generate(db_session, "Data Engineer")
+    assert cache.get_or_generate(db_session, "data   engineer.") == first
+    assert calls == ["Data Engineer"]
+    assert db_session.get(models.GenerationCache, "data engineer") is not None
+
+    # A fresh process (empty LRU) is served from the shared table
+    restarted = GenerationCache(max_entries=10, ttl_seconds=60, generator=fake_generator)
+    assert restarted.get_or_generate(db_session, "DATA ENGINEER") == first
+    assert calls == ["Data Engineer"]
+    assert restarted.stats()["db_hits"] == 1
+
+
+def test_generation_cache_skips_fallback(db_session):
+    from app.llm import _fallback_questions
+    cache = GenerationCache(max_entries=10, ttl_seconds=60, generator=_fallback_questions)
+    cache.get_or_generate(db_session, "Astronaut")
+    cache.get_or_generate(db_session, "Astronaut")
+    assert cache.stats()["llm_calls"] == 2
+    assert db_session.get(models.GenerationCache, "astronaut") is None
+
+
+@pytest.fixture
+def stub_generation_cache(db_session):
+    original = generation_cache.agenerator
+
+    async def fake_agenerator(title, key):
+        return [{"type": "behavioral", "text": f"Why {title}?"}]
+
+    generation_cache.agenerator = fake_agenerator
+    generation_cache.clear(db_session)
+    yield generation_cache
+    generation_cache.agenerator = original
+    generation_cache.clear(db_session)
+
+
+def test_generate_endpoint_uses_cache(client, stub_generation_cache):
+    llm_calls = stub_generation_cache.stats()["llm_calls"]
+    res = client.post("/api/questions/generate", json={"job_title": "Frontend Dev"})
+    assert res.status_code == 200
+    res = client.post("/api/questions/generate", json={"job_title": "front-end developer"})
+    assert res.status_code == 200
+    assert res.json()["questions"][0]["text"] == "Why Frontend Dev?"
+
+    stats = client.get("/api/generation-cache/stats").json()
+    assert stats["enabled"] is True
+    assert stats["llm_calls"] == llm_calls + 1
+    assert stats["hits"] >= 1
@@ -0,0 +1,88 @@
+import pytest
+from app import dedup, models
+from app.config import settings
+
+
+def test_fingerprint_similarity():
+    a = dedup.fingerprint("Explain the difference between concurrency and parallelism.")
+    b = dedup.fingerprint("explain the difference between PARALLELISM and concurrency")
+    c = dedup.fingerprint("Tell me about a time you handled a tight deadline.")
+    assert dedup.fingerprint("  Explain the difference between concurrency, and parallelism").content_hash == a.content_hash
+    assert len(a.buckets) == dedup.NUM_BANDS
+    assert dedup.jaccard(a.shingles, b.shingles) >= settings.duplicate_threshold
+    assert dedup.jaccard(a.shingles, c.shingles) < 0.2
+    # Buckets are deterministic (they are persisted)
+    assert dedup.fingerprint("Explain the difference between concurrency and parallelism.").buckets == a.buckets
+
+
+def _create(client, job_title, texts):
+    payload = {"job_title": job_title, "questions": [{"type": "technical", "text": t} for t in texts]}
+    res = client.post("/api/sets/bulk", json={"sets": [payload]})
+    assert res.status_code == 201
+    return res.json()["results"][0]
+
+
+def test_duplicates_are_linked_and_reported(client):
+    first = _create(client, "Dedup One", [
+        "How would you shard a pelican database?",
+        "What is pelican eventual consistency?",
+    ])
+    assert first["duplicates"] == 0
+    second = _create(client, "Dedup Two", [
+        "How would you shard a Pelican database",        # exact after normalization
+        "How would you shard the pelican database?",     # near duplicate
+        "Describe a pelican you mentored.",
+        "Describe a pelican you mentored!",              # duplicate within the batch
+    ])
+    assert second["questions"] == 4 and second["duplicates"] == 3
+
+    res = client.get(f"/api/questions/duplicates?set_id={second['id']}")
+    assert res.status_code == 200
+    groups = {g["original"]["text"]: g for g in res.json()["groups"]}
+    shard = groups["How would you shard a pelican database?"]
+    assert sorted(d["text"] for d in shard["duplicates"]) == [
+        "How would you shard a Pelican database", "How would you shard the pelican database?"]
+    mentor = groups["Describe a pelican you mentored."]
+    assert [d["text"] for d in mentor["duplicates"]] == ["Describe a pelican you mentored!"]
+
+
+def test_deleted_question_leaves_no_buckets_or_links(client, db_session):
+    first = _create(client, "Delete Dedup", ["How does a plover queue retry?", "How does a plover queue retry"])
+    original, copy = sorted(q["id"] for q in client.get(f"/api/questions?set_id={first['id']}").json()["items"])
+    assert client.delete(f"/api/questions/{original}").status_code == 200
+
+    Q = models.Question
+    assert db_session.query(models.QuestionLSHBucket).filter_by(question_id=original).count() == 0
+    assert db_session.get(Q, copy).duplicate_of is None
+
+    # A new copy links to the surviving question, never to the deleted one
+    second = _create(client, "Delete Dedup Again", ["How does a plover queue retry?!"])
+    assert second["duplicates"] == 1
+    (added,) = client.get(f"/api/questions?set_id={second['id']}").json()["items"]
+    assert db_session.get(Q, added["id"]).duplicate_of == copy
+
+
+def test_skip_policy(client, monkeypatch):
+    monkeypatch.setattr(settings, "duplicate_policy", "skip")
+    _create(client, "Skip One", ["What does a heron cache layer do?"])
+    res = _create(client, "Skip Two", ["What does a heron cache layer do", "Why herons?", "Why herons"])
+    assert res["questions"] == 1 and res["duplicates"] == 2
+    items = client.get(f"/api/questions?set_id={res['id']}").json()["items"]
+    assert [q["text"] for q in items] == ["Why herons?"]
+
+
+def test_backfill(db_session):
+    qa_set = models.QASet(job_title="Backfill")
+    db_session.add(qa_set)
+    db_session.flush()
+    original = models.Question(set_id=qa_set.id, type=models.QuestionType.technical, text="Backfill ibis question")
+    copy = models.Question(set_id=qa_set.id, type=models.QuestionType.technical, text="backfill ibis question!")
+    db_session.add_all([original, copy])
+    db_session.commit()
+
+    assert dedup.backfill(db_session) >= 2
+    db_session.refresh(original)
+    db_session.refresh(copy)
+    assert original.content_hash == copy.content_hash
+    assert copy.duplicate_of == original.id
+    assert db_session.query(models.QuestionLSHBucket).filter_by(question_id=copy.id).count() == dedup.NUM_BANDS
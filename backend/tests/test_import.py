@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from app import importer
+from app.config import settings
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _parse(data: bytes, fmt: str, size: int = 3):
+    async def collect():
+        parser = importer.parse_csv if fmt == "csv" else importer.parse_ndjson
+        return [item async for item in parser(importer.iter_lines(_chunks(data, size)))]
+    return asyncio.run(collect())
+
+
+def test_incremental_parsing():
+    # Chunk boundaries fall inside multi-byte characters and quoted fields
+    body = "job_title,text,type\r\nDév,\"Line one\nline, two\",technical\n\nDév,\"He said \"\"hi\"\"\",behavioral\nX,a\n"
+    rows = _parse(body.encode(), "csv")
+    assert rows[0] == (2, {"job_title": "Dév", "text": "Line one\nline, two", "type": "technical"})
+    assert rows[1] == (5, {"job_title": "Dév", "text": 'He said "hi"', "type": "behavioral"})
+    assert rows[2] == (6, "Expected 3 fields, got 2")
+    assert _parse(b'job_title,text\nA,"never closed\n', "csv") == [(2, "Unterminated quoted field")]
+
+    rows = _parse('﻿{"a": "é"}\n[1]\n\nnot json\n{"b": 1}'.encode(), "ndjson", size=1)
+    assert rows[0] == (1, {"a": "é"}) and rows[1] == (2, "Expected a JSON object")
+    assert rows[2][0] == 4 and rows[2][1].startswith("Invalid JSON")
+    assert rows[3] == (5, {"b": 1})
+
+
+def test_import_ndjson(client, monkeypatch):
+    monkeypatch.setattr(settings, "import_chunk_size", 2)
+    before = client.get("/api/stats").json()
+    lines = [
+        {"job_title": "Import Job A", "name": "A", "type": "technical", "text": "Import osprey question 1?"},
+        {"job_title": "Import Job A", "name": "A", "type": "behavioral", "text": "Import osprey question 2?",
+         "flagged": True, "difficulty": 4},
+        {"job_title": "Import Job A", "name": "A", "type": "technical", "text": "Import osprey question 3?"},
+        {"job_title": "Import Job A", "name": "A", "type": "sql", "text": "Bad type"},
+        {"job_title": "   ", "type": "technical", "text": "Blank title"},
+        {"job_title": "Import Job B", "type": "technical", "text": "Import osprey question 1"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{oops\n"
+    res = client.post("/api/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert res.status_code == 201
+    data = res.json()
+    assert data["format"] == "ndjson" and data["records"] == 7
+    assert data["sets"] == 2 and data["questions"] == 4 and data["duplicates"] == 1 and data["failed"] == 3
+    assert [e["line"] for e in data["errors"]] == [4, 5, 7]
+    assert data["errors"][0]["error"].startswith("type:")
+    assert data["errors"][1]["error"] == "Job title cannot be empty"
+
+    # Set A spans two chunks but stays one set
+    export = client.get("/api/questions/export", headers={"Accept-Encoding": "identity"}).text
+    rows = [json.loads(line) for line in export.splitlines() if "osprey" in line]
+    assert len({r["set_id"] for r in rows if r["job_title"] == "Import Job A"}) == 1
+    assert [r["text"] for r in rows] == [
+        "Import osprey question 1?", "Import osprey question 2?", "Import osprey question 3?",
+        "Import osprey question 1"]
+    assert rows[1]["flagged"] is True and rows[1]["difficulty"] == 4
+
+    after = client.get("/api/stats").json()
+    assert after["total_sets"] == before["total_sets"] + 2
+    assert after["total_questions"] == before["total_questions"] + 4
+    assert after["flagged_questions"] == before["flagged_questions"] + 1
+
+
+def test_import_csv_round_trip(client, monkeypatch):
+    monkeypatch.setattr(settings, "duplicate_policy", "off")
+    res = client.post("/api/questions", json={
+        "job_title": "Round Trip", "questions": [
+            {"type": "technical", "text": "Multi-line,\nquoted \"kestrel\" question?"},
+            {"type": "behavioral", "text": "Plain kestrel question"},
+        ],
+    })
+    set_id = res.json()["id"]
+    csv_body = client.get(f"/api/questions/export?format=csv&set_id={set_id}").content
+
+    res = client.post("/api/import?format=csv", content=csv_body)
+    assert res.status_code == 201
+    data = res.json()
+    assert data["records"] == 2 and data["sets"] == 1 and data["questions"] == 2 and data["failed"] == 0
+
+    new_set_id = max(q["set_id"] for q in client.get("/api/questions?size=2").json()["items"])
+    assert new_set_id != set_id
+    items = client.get(f"/api/questions?set_id={new_set_id}").json()["items"]
+    assert sorted(q["text"] for q in items) == ["Multi-line,\nquoted \"kestrel\" question?", "Plain kestrel question"]
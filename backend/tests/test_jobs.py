@@ -0,0 +1,131 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import jobs, models
+from app.database import AsyncSessionLocal, async_engine
+from app.llm import _fallback_questions
+
+
+def _workers(provider, **kwargs):
+    options = dict(concurrency=2, poll_seconds=0.01, lease_seconds=60, max_attempts=2,
+                   backoff_base_seconds=0, backoff_max_seconds=0)
+    options.update(kwargs)
+    return jobs.JobWorkers(provider=provider, **options)
+
+
+def _drain(workers):
+    async def go():
+        ran = 0
+        while await workers.run_once("test-worker"):
+            ran += 1
+        # aiosqlite connections belong to this event loop
+        await async_engine.dispose()
+        return ran
+    return asyncio.run(go())
+
+
+@pytest.fixture(autouse=True)
+def no_leftover_jobs(db_session):
+    db_session.query(models.GenerationJob).delete()
+    db_session.commit()
+
+
+async def _fake_provider(title):
+    return [{"type": "technical", "text": f"Queued question for {title}?"}]
+
+
+def test_job_lifecycle_and_save(client, db_session):
+    res = client.post("/api/generation-jobs", json={"job_title": "Queued Dev", "name": "From a job", "save": True})
+    assert res.status_code == 202
+    job = res.json()
+    assert job["status"] == "queued" and job["attempts"] == 0 and job["questions"] is None
+
+    assert _drain(_workers(_fake_provider)) == 1
+    res = client.get(f"/api/generation-jobs/{job['id']}")
+    done = res.json()
+    assert done["status"] == "succeeded" and done["attempts"] == 1
+    assert done["questions"] == [{"type": "technical", "text": "Queued question for Queued Dev?"}]
+    assert done["finished_at"] is not None
+
+    saved = db_session.get(models.QASet, done["set_id"])
+    assert saved.name == "From a job"
+    assert [q.text for q in saved.questions] == ["Queued question for Queued Dev?"]
+
+    assert client.get("/api/generation-jobs/999999").status_code == 404
+    assert client.post("/api/generation-jobs", json={"job_title": "   "}).status_code == 400
+
+
+def test_job_retries_then_fails(client):
+    calls = []
+
+    async def flaky(title):
+        calls.append(title)
+        if len(calls) == 1:
+            raise RuntimeError("quota exceeded")
+        return _fallback_questions(title)
+
+    job_id = client.post("/api/generation-jobs", json={"job_title": "Flaky Dev"}).json()["id"]
+    workers = _workers(flaky)
+    assert _drain(workers) == 2  # zero backoff: the retry is runnable right away
+    job = client.get(f"/api/generation-jobs/{job_id}").json()
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert job["error"] == "LLM returned no usable questions"
+    assert workers.stats()["retried"] == 1 and workers.stats()["failed"] == 1
+
+
+def test_claim_is_exclusive_and_reclaims_expired_leases(client, db_session):
+    job_id = client.post("/api/generation-jobs", json={"job_title": "Claimed Dev"}).json()["id"]
+
+    async def claim_twice():
+        async with AsyncSessionLocal() as a, AsyncSessionLocal() as b:
+            first = await jobs.claim(a, "worker-a", lease_seconds=60, max_attempts=2)
+            second = await jobs.claim(b, "worker-b", lease_seconds=60, max_attempts=2)
+        await async_engine.dispose()
+        return first, second
+
+    first, second = asyncio.run(claim_twice())
+    assert first.id == job_id and first.locked_by == "worker-a"
+    assert second is None
+
+    # worker-a died: once the lease expires another worker takes over
+    db_session.execute(
+        update(models.GenerationJob).where(models.GenerationJob.id == job_id)
+        .values(locked_at=jobs._now() - timedelta(seconds=120))
+    )
+    db_session.commit()
+    assert _drain(_workers(_fake_provider)) == 1
+    job = client.get(f"/api/generation-jobs/{job_id}").json()
+    assert job["status"] == "succeeded" and job["attempts"] == 2
+
+
+def _expire_lease(db_session, job_id, attempts):
+    db_session.execute(
+        update(models.GenerationJob).where(models.GenerationJob.id == job_id)
+        .values(status="running", locked_by="worker-dead", attempts=attempts,
+                locked_at=jobs._now() - timedelta(seconds=120))
+    )
+    db_session.commit()
+
+
+def test_expired_lease_backs_off_or_fails(client, db_session):
+    retried = client.post("/api/generation-jobs", json={"job_title": "Requeued Dev"}).json()["id"]
+    exhausted = client.post("/api/generation-jobs", json={"job_title": "Exhausted Dev"}).json()["id"]
+    _expire_lease(db_session, retried, attempts=1)
+    _expire_lease(db_session, exhausted, attempts=2)
+
+    # Neither runs: one waits out its backoff, the other is out of attempts
+    assert _drain(_workers(_fake_provider, backoff_base_seconds=60, backoff_max_seconds=60)) == 0
+    job = client.get(f"/api/generation-jobs/{retried}").json()
+    assert job["status"] == "queued" and job["attempts"] == 1 and job["error"] == "Lease expired"
+    job = client.get(f"/api/generation-jobs/{exhausted}").json()
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert job["error"] == "Lease expired after 2 attempts" and job["finished_at"] is not None
+
+
+def test_backoff_grows_and_is_capped():
+    assert jobs.backoff_seconds(1, 5, 300) <= 6
+    assert 16 <= jobs.backoff_seconds(3, 5, 300) <= 24
+    assert jobs.backoff_seconds(20, 5, 300) <= 360
@@ -0,0 +1,347 @@
+import asyncio
+import json
+import time
+import pytest
+from app import llm
+from app.config import settings
+from app.llm import AsyncGenerator, SingleFlight, _fallback_questions, _parse_questions
+
+
+def test_parse_questions_extracts_json():
+    text = 'Sure! ```json {"questions": [{"type": "Technical", "text": " What is REST? "}, {"type": "other", "text": "x"}]} ```'
+    assert _parse_questions(text) == [{"type": "technical", "text": "What is REST?"}]
+
+
+def test_stub_provider(monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "stub")
+    sync_qs = llm.generate_questions("Data Scientist")
+    async_qs = asyncio.run(llm.agenerate_questions("Data Scientist"))
+    assert sync_qs == async_qs
+    assert len(sync_qs) == 8
+    assert {q["type"] for q in sync_qs} == {"technical", "behavioral"}
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    calls = []
+
+    async def provider(title):
+        calls.append(title)
+        await asyncio.sleep(0.05)
+        return [{"type": "technical", "text": title}]
+
+    async def run(coalesce):
+        gen = AsyncGenerator(max_concurrency=4, timeout_seconds=1, coalesce=coalesce, provider=provider)
+        results = await asyncio.gather(*[gen.generate("Backend Dev", key="backend dev") for _ in range(10)])
+        return gen, results
+
+    gen, results = asyncio.run(run(coalesce=True))
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    assert gen.stats()["coalesced"] == 9 and gen.stats()["in_flight"] == 0
+
+    calls.clear()
+    asyncio.run(run(coalesce=False))
+    assert len(calls) == 10
+
+
+def test_async_generator_bounds_concurrency():
+    active = 0
+    peak = 0
+
+    async def provider(title):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return [{"type": "technical", "text": title}]
+
+    async def run():
+        gen = AsyncGenerator(max_concurrency=2, timeout_seconds=1, provider=provider)
+        await asyncio.gather(*[gen.generate(f"Job {i}") for i in range(8)])
+
+    asyncio.run(run())
+    assert peak == 2
+
+
+def test_async_generator_timeout_falls_back():
+    async def slow_provider(title):
+        await asyncio.sleep(1)
+        return [{"type": "technical", "text": "too late"}]
+
+    gen = AsyncGenerator(max_concurrency=1, timeout_seconds=0.01, provider=slow_provider)
+    assert asyncio.run(gen.generate("SRE")) == _fallback_questions("SRE")
+    assert gen.stats()["timeouts"] == 1
+
+
+def test_single_flight_shields_shared_call():
+    async def run():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        await started.wait()
+        second = asyncio.ensure_future(flight.do("k", work))
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_question_stream_parser_handles_arbitrary_chunks():
+    payload = '```json\n{"note": "x [ {", "questions": [' \
+        '{"type": "technical", "text": "a \\"quoted\\" } brace"}, {"type": "nope", "text": "z"}, ' \
+        '{"type": "Behavioral", "text": "b"}], "extra": [{"type": "technical", "text": "no"}]}\n```'
+    expected = [
+        {"type": "technical", "text": 'a "quoted" } brace'},
+        {"type": "behavioral", "text": "b"},
+    ]
+    for step in (1, 3, 7, len(payload)):
+        parser = llm.QuestionStreamParser()
+        out = []
+        for i in range(0, len(payload), step):
+            out += parser.feed(payload[i:i + step])
+        assert out == expected
+
+
+def test_async_generator_stream_falls_back_when_empty():
+    async def empty_stream(title):
+        return
+        yield
+
+    async def run():
+        gen = AsyncGenerator(max_concurrency=1, timeout_seconds=1, stream_provider=empty_stream)
+        return [item async for item in gen.stream("SRE")]
+
+    items = asyncio.run(run())
+    assert [q for _, q in items] == _fallback_questions("SRE")
+    assert {source for source, _ in items} == {"fallback"}
+
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_generate_stream_endpoint(client, monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "stub")
+    monkeypatch.setattr(settings, "generation_cache_enabled", False)
+    res = client.post("/api/questions/generate/stream", json={"job_title": "Streamer"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(res.text)
+    assert [e for e, _ in events] == ["question"] * 8 + ["done"]
+    assert events[-1][1] == {"count": 8, "source": "stub"}
+
+    # Fallback also streams, and GET works for EventSource clients
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    res = client.get("/api/questions/generate/stream", params={"job_title": "Streamer"})
+    events = _sse_events(res.text)
+    assert events[-1][1] == {"count": 4, "source": "fallback"}
+
+    res = client.get("/api/questions/generate/stream", params={"job_title": "a" * 51})
+    assert res.status_code == 422
+
+
+class _FakeProvider(llm.Provider):
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def agenerate(self, job_title):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise llm.ProviderError("provider_error")
+        return [{"type": "technical", "text": f"{self.name}: {job_title}"}]
+
+    def generate(self, job_title):
+        return asyncio.run(self.agenerate(job_title))
+
+    async def astream(self, job_title):
+        for q in await self.agenerate(job_title):
+            yield q
+
+
+def _router(monkeypatch, *providers, **overrides):
+    monkeypatch.setattr(settings, "llm_providers", ",".join(p.name for p in providers))
+    for key, value in overrides.items():
+        monkeypatch.setattr(settings, key, value)
+    return llm.ProviderRouter(registry={p.name: (lambda p=p: p) for p in providers})
+
+
+def test_circuit_breaker_transitions():
+    breaker = llm.CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    assert breaker.allow() and not breaker.record_failure()
+    assert breaker.record_failure() and breaker.state == "open"
+    assert not breaker.ready() and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # one trial at a time
+    assert breaker.record_failure() and breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_router_fails_over_and_opens_circuit(monkeypatch):
+    bad, good = _FakeProvider("bad", fail=True), _FakeProvider("good")
+    router = _router(monkeypatch, bad, good, llm_breaker_failures=2, llm_breaker_reset_seconds=60,
+                     llm_route_max_error_rate=1.0)
+
+    for _ in range(2):
+        assert asyncio.run(router.agenerate("SRE")) == [{"type": "technical", "text": "good: SRE"}]
+    assert router.breaker("bad").state == "open"
+    # Open circuit: the unhealthy provider isn't even called
+    asyncio.run(router.agenerate("SRE"))
+    assert bad.calls == 2 and good.calls == 3
+    assert router.candidates() == (["good"], "circuit_open")
+
+    good.fail = True
+    with pytest.raises(llm.ProviderError):
+        asyncio.run(router.agenerate("SRE"))
+    stats = router.stats()["providers"]
+    assert stats["bad"]["circuit"] == "open" and stats["good"]["failures"] == 1
+
+
+def test_router_ranks_by_error_rate(monkeypatch):
+    first, second = _FakeProvider("first"), _FakeProvider("second")
+    router = _router(monkeypatch, first, second, llm_breaker_failures=100, llm_route_max_error_rate=0.5)
+    assert router.candidates()[0] == ["first", "second"]
+    first.fail = True
+    asyncio.run(router.agenerate("SRE"))
+    # 1 failure out of 1 call: above the threshold, so "first" is tried last
+    assert router.candidates()[0] == ["second", "first"]
+
+
+def test_router_hedges_slow_primary(monkeypatch):
+    slow, fast = _FakeProvider("slow", delay=0.5), _FakeProvider("fast", delay=0.01)
+    router = _router(monkeypatch, slow, fast, llm_hedge_enabled=True, llm_hedge_delay_ms=20,
+                     llm_hedge_min_samples=1000)
+
+    async def run():
+        t0 = asyncio.get_running_loop().time()
+        questions = await router.agenerate("SRE")
+        return questions, asyncio.get_running_loop().time() - t0
+
+    questions, elapsed = asyncio.run(run())
+    assert questions == [{"type": "technical", "text": "fast: SRE"}]
+    assert elapsed < 0.3
+    assert router.hedges == 1 and router.hedge_wins == 1
+    # The cancelled loser records no outcome
+    assert router.provider_stats("slow").calls == 0
+
+    # Without hedging the primary's answer is awaited
+    monkeypatch.setattr(settings, "llm_hedge_enabled", False)
+    slow.delay = 0.05
+    assert asyncio.run(router.agenerate("SRE")) == [{"type": "technical", "text": "slow: SRE"}]
+
+
+def test_router_stream_fails_over_before_first_question(monkeypatch):
+    bad, good = _FakeProvider("bad", fail=True), _FakeProvider("good")
+    router = _router(monkeypatch, bad, good)
+
+    async def run():
+        return [item async for item in router.astream("SRE")]
+
+    assert asyncio.run(run()) == [("llm", {"type": "technical", "text": "good: SRE"})]
+    assert router.provider_stats("bad").failures == 1
+
+
+def test_router_start_records_startup(monkeypatch):
+    class Starting(_FakeProvider):
+        async def start(self, warm_up=False):
+            await asyncio.sleep(0.01)
+            if self.fail:
+                raise RuntimeError("no network")
+            return {"init_ms": 1.0, "warmup_ms": 2.0} if warm_up else {"init_ms": 1.0}
+
+    ok, broken = Starting("ok"), Starting("broken", fail=True)
+    router = _router(monkeypatch, ok, broken)
+    startup = asyncio.run(router.start(warm_up=True, timeout_seconds=1))
+    assert startup["ok"]["ok"] and startup["ok"]["warmup_ms"] == 2.0 and startup["ok"]["total_ms"] >= 10
+    # A provider that fails to start doesn't stop the others (or the app)
+    assert startup["broken"] == {"ok": False, "error": "RuntimeError", "total_ms": startup["broken"]["total_ms"]}
+    assert router.stats()["providers"]["ok"]["startup"] == startup["ok"]
+
+
+def test_gemini_client_is_reused(monkeypatch):
+    monkeypatch.setattr(settings, "gemini_api_key", "test-key")
+    provider = llm.GeminiProvider()
+    model = provider._model()
+    assert provider._model() is model
+    assert llm._contents("SRE") is llm._contents("SRE")
+    monkeypatch.setattr(settings, "llm_gemini_model", "other-model")
+    assert provider._model() is not model
+    asyncio.run(provider.aclose())
+    assert provider._client is None
+
+
+async def _stalls_after_one(title):
+    yield "llm", {"type": "technical", "text": f"{title}: only question"}
+    await asyncio.sleep(10)
+    yield "llm", {"type": "technical", "text": "never sent"}
+
+
+def test_async_generator_stream_marks_timeout_incomplete():
+    async def run():
+        gen = AsyncGenerator(max_concurrency=1, timeout_seconds=0.05, stream_provider=_stalls_after_one)
+        return gen, [item async for item in gen.stream("SRE")]
+
+    gen, items = asyncio.run(run())
+    assert items == [("llm", {"type": "technical", "text": "SRE: only question"}), (llm.INCOMPLETE, None)]
+    assert gen.stats()["timeouts"] == 1 and gen.stats()["incomplete_streams"] == 1
+
+
+def test_generate_stream_does_not_cache_truncated_list(client, db_session, monkeypatch):
+    from app.cache import generation_cache
+    monkeypatch.setattr(settings, "generation_cache_enabled", True)
+    monkeypatch.setattr(llm.async_generator, "stream_provider", _stalls_after_one)
+    monkeypatch.setattr(llm.async_generator, "timeout_seconds", 0.05)
+    events = _sse_events(client.post("/api/questions/generate/stream", json={"job_title": "Truncated Dev"}).text)
+    assert [e for e, _ in events] == ["question", "done"]
+    assert events[-1][1] == {"count": 1, "source": "llm", "incomplete": True}
+    assert generation_cache.lookup(db_session, "Truncated Dev") is None
+
+
+def test_router_stream_raises_after_partial_failure(monkeypatch):
+    class Truncating(_FakeProvider):
+        async def astream(self, job_title):
+            yield {"type": "technical", "text": f"{self.name}: first"}
+            raise llm.ProviderError("provider_error")
+
+    flaky, backup = Truncating("flaky"), _FakeProvider("backup")
+    router = _router(monkeypatch, flaky, backup, llm_route_max_error_rate=1.0)
+    received = []
+
+    async def run():
+        async for item in router.astream("SRE"):
+            received.append(item)
+
+    with pytest.raises(llm.ProviderError):
+        asyncio.run(run())
+    # No failover once a question was sent, and the failure is recorded
+    assert received == [("llm", {"type": "technical", "text": "flaky: first"})]
+    assert backup.calls == 0 and router.provider_stats("flaky").failures == 1
+
+    # Through the generator the partial stream ends with the incomplete marker
+    monkeypatch.setattr(llm, "router", router)
+
+    async def generate():
+        gen = AsyncGenerator(max_concurrency=1, timeout_seconds=1, stream_provider=llm.astream_questions)
+        return [item async for item in gen.stream("SRE")]
+
+    assert asyncio.run(generate())[-1] == (llm.INCOMPLETE, None)
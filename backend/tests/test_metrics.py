@@ -0,0 +1,66 @@
+import asyncio
+
+from app import metrics
+from app.llm import AsyncGenerator, _fallback_questions
+
+
+def test_histogram_and_counter_render():
+    h = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    h.observe(0.05, route="/a")
+    h.observe(0.5, route="/a")
+    h.observe(5, route="/a")
+    c = metrics.Counter("demo_total", "Demo.", ("route",))
+    c.inc(route='/"q"')
+    registry = metrics.Registry()
+    registry.register(h)
+    registry.register(c)
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+    assert 'demo_total{route="/\\"q\\""} 1' in text
+
+
+def test_request_metrics_by_route_template(client):
+    res = client.post("/api/questions", json={
+        "job_title": "Metrics Dev", "questions": [{"type": "technical", "text": "What is a histogram bucket?"}],
+    })
+    set_id = res.json()["id"]
+    qid = client.get(f"/api/questions?set_id={set_id}").json()["items"][0]["id"]
+    before = metrics.HTTP_REQUESTS.value(method="GET", route="/api/questions", status=200)
+    patched = metrics.HTTP_LATENCY.count(method="PATCH", route="/api/questions/{qid}")
+    listed = metrics.HTTP_DB_QUERIES.count(method="GET", route="/api/questions")
+    listed_queries = metrics.HTTP_DB_QUERIES.sum(method="GET", route="/api/questions")
+
+    assert client.get("/api/questions").status_code == 200
+    assert client.patch(f"/api/questions/{qid}", json={"flagged": True}).status_code == 200
+    assert client.get("/no/such/path").status_code == 404
+
+    assert metrics.HTTP_REQUESTS.value(method="GET", route="/api/questions", status=200) == before + 1
+    # Labelled by template, not by the concrete id
+    assert metrics.HTTP_LATENCY.count(method="PATCH", route="/api/questions/{qid}") == patched + 1
+    assert metrics.HTTP_REQUESTS.value(method="GET", route="unmatched", status=404) >= 1
+    assert metrics.HTTP_IN_FLIGHT.value() == 0
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'http_request_duration_seconds_bucket{method="PATCH",route="/api/questions/{qid}",le="+Inf"}' in body
+    assert 'http_request_db_queries_count{method="GET",route="/api/questions"}' in body
+    # The list request was observed once, with at least one statement
+    assert metrics.HTTP_DB_QUERIES.count(method="GET", route="/api/questions") == listed + 1
+    assert metrics.HTTP_DB_QUERIES.sum(method="GET", route="/api/questions") > listed_queries
+
+
+def test_llm_fallback_reasons_are_counted():
+    async def slow(job_title):
+        await asyncio.sleep(1)
+        return []
+
+    timeouts = metrics.LLM_FALLBACKS.value(reason="timeout")
+    gen = AsyncGenerator(max_concurrency=1, timeout_seconds=0.01, coalesce=False, provider=slow)
+    assert asyncio.run(gen.generate("Pilot")) == _fallback_questions("Pilot")
+    assert metrics.LLM_FALLBACKS.value(reason="timeout") == timeouts + 1
@@ -0,0 +1,75 @@
+from sqlalchemy import select
+
+from app import models, practice
+from app.config import settings
+
+
+def _new_set(client, title, texts):
+    res = client.post("/api/questions", json={
+        "job_title": title, "questions": [{"type": "technical", "text": t} for t in texts],
+    })
+    assert res.status_code == 201
+    set_id = res.json()["id"]
+    return set_id, sorted(q["id"] for q in client.get(f"/api/questions?set_id={set_id}").json()["items"])
+
+
+def test_interval_grows_with_streak():
+    day = settings.practice_base_interval_hours * 3600
+    assert practice.interval_seconds(True, 1, None) == day
+    assert practice.interval_seconds(True, 3, None) == 4 * day
+    assert practice.interval_seconds(True, 1, 5) < practice.interval_seconds(True, 1, 1)
+    assert practice.interval_seconds(True, 30, None) == settings.practice_max_interval_days * 86400
+    assert practice.interval_seconds(False, 5, None) == settings.practice_retry_minutes * 60
+
+
+def test_priority_kept_current_by_patches(client, db_session):
+    _, (a, b, c) = _new_set(client, "Practice Patch", ["Practice wren 1?", "Practice wren 2?", "Practice wren 3?"])
+    client.patch(f"/api/questions/{a}", json={"flagged": True, "difficulty": 5})
+    client.patch("/api/questions", json=[{"id": b, "user_answer": "An answer", "difficulty": 2},
+                                         {"id": c, "flagged": True}])
+    Q = models.Question
+    rows = db_session.execute(
+        select(Q.id, Q.practice_priority, Q.practice_due_at, Q.flagged, Q.user_answer, Q.difficulty)
+        .where(Q.id.in_([a, b, c]))
+    ).all()
+    # The SQL expression (batch PATCH) and the Python function (single PATCH) agree
+    for row in rows:
+        assert row.practice_priority == practice.priority(row.practice_due_at, row.flagged, row.user_answer,
+                                                          row.difficulty)
+    assert {row.id: row.practice_priority for row in rows} == {
+        a: -practice.FLAGGED_BOOST - 2 * practice.DIFFICULTY_BOOST,
+        b: practice.ANSWERED_DELAY + practice.DIFFICULTY_BOOST,
+        c: -practice.FLAGGED_BOOST,
+    }
+
+
+def test_practice_flow(client):
+    set_id, (q1, q2, q3) = _new_set(client, "Practice Flow", ["Flow kite 1?", "Flow kite 2?", "Flow kite 3?"])
+
+    def next_id():
+        res = client.get(f"/api/practice/next?set_id={set_id}")
+        assert res.status_code == 200
+        return res.json()["id"]
+
+    assert next_id() == q1
+    client.patch(f"/api/questions/{q3}", json={"flagged": True})
+    assert next_id() == q3
+
+    res = client.post(f"/api/practice/{q3}/result", json={"outcome": "correct"})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["practice_count"] == 1 and data["practice_streak"] == 1 and data["due"] is False
+    assert data["practiced_at"] and data["due_at"] > data["practiced_at"]
+    assert next_id() == q1
+
+    # Incorrect: due again in a few minutes, after the never-practiced q2
+    data = client.post(f"/api/practice/{q1}/result", json={"outcome": "incorrect"}).json()
+    assert data["practice_streak"] == 0 and data["practice_count"] == 1
+    assert next_id() == q2
+    client.post(f"/api/practice/{q2}/result", json={"outcome": "correct"})
+    assert next_id() == q1
+
+    assert client.get("/api/practice/next?set_id=999999").status_code == 404
+    assert client.post("/api/practice/999999/result", json={"outcome": "correct"}).status_code == 404
+    assert client.post(f"/api/practice/{q1}/result", json={"outcome": "maybe"}).status_code == 422
+    assert client.get("/api/practice/next").status_code == 200
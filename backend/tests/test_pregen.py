@@ -0,0 +1,108 @@
+import asyncio
+
+from app import pregen
+from app.config import settings
+from app.llm import _fallback_questions
+
+
+def _pool(**kwargs):
+    calls = []
+
+    async def fake_generator(title, key):
+        calls.append(title)
+        return [{"type": "technical", "text": f"Pooled question {len(calls)} for {title}?"}]
+
+    options = dict(top_n=2, batches_per_title=2, max_batches=3, max_calls_per_minute=60_000)
+    options.update(kwargs)
+    return pregen.PregenPool(generator=fake_generator, **options), calls
+
+
+def test_popularity_and_pool_caps():
+    pool, calls = _pool()
+    pool.load_popularity([("Backend Developer", 5), ("Data Engineer", 3), ("Chef", 1)])
+    pool.record("backend dev")  # same normalized title as "Backend Developer"
+    assert [t for _, t in pool.top_titles()] == ["Backend Developer", "Data Engineer"]
+
+    assert asyncio.run(pool.fill_once()) == 3  # capped by max_batches, not 2 titles x 2
+    assert pool.size() == 3 and len(calls) == 3
+    assert asyncio.run(pool.fill_once()) == 0
+
+    batch = pool.take("Back-end developer")
+    assert batch[0]["text"] == "Pooled question 1 for Backend Developer?"
+    assert pool.take("Chef") is None
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+    # A title leaving the top N frees its slots
+    pool.load_popularity([("Chef", 50), ("Data Engineer", 3)])
+    asyncio.run(pool.fill_once())
+    assert set(pool.stats()["titles"]) == {"Chef", "Data Engineer"}
+
+
+def test_unreferenced_titles_are_forgotten():
+    pool, _ = _pool()
+    pool.load_popularity([("Chef", 1)])
+    for i in range(100):
+        pool.record(f"One-off title {i}")
+    pool.record("Busy Title")
+    pool.record("Busy Title")
+    # A single request halves to zero on the next refresh, and its title goes with it
+    pool.load_popularity([("Chef", 1)])
+    assert set(pool._titles.values()) == {"Chef", "Busy Title"}
+    pool.load_popularity([])
+    assert pool._titles == {}
+
+
+def test_fallback_batches_are_not_pooled():
+    async def failing(title, key):
+        return _fallback_questions(title)
+
+    pool = pregen.PregenPool(top_n=1, batches_per_title=2, max_batches=10, max_calls_per_minute=60_000,
+                             generator=failing)
+    pool.load_popularity([("Pilot", 1)])
+    assert asyncio.run(pool.fill_once()) == 0
+    assert pool.stats()["rejected"] == 1 and pool.size() == 0
+
+
+def test_rate_limit_spaces_llm_calls():
+    pool, _ = _pool(top_n=1, max_calls_per_minute=60 * 50)  # one call per 20ms
+    pool.load_popularity([("Pilot", 1)])
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await pool.fill_once()
+        return loop.time() - start
+
+    assert asyncio.run(timed()) >= 0.015  # second call waited for the first one's slot
+
+
+def test_generate_endpoint_serves_from_pool(client, monkeypatch):
+    pool, _ = _pool(top_n=1)
+    pool.load_popularity([("Pool Title", 1)])
+    asyncio.run(pool.fill_once())
+    monkeypatch.setattr(pregen, "pool", pool)
+    monkeypatch.setattr(settings, "pregen_enabled", True)
+    monkeypatch.setattr(settings, "generation_cache_enabled", False)
+
+    res = client.post("/api/questions/generate", json={"job_title": "pool title"})
+    assert res.json()["questions"][0]["text"] == "Pooled question 1 for Pool Title?"
+    assert client.get("/api/pregen/stats").json()["hits"] == 1
+
+
+def test_pool_is_served_before_the_generation_cache(client, monkeypatch):
+    from app.cache import generation_cache
+
+    pool, _ = _pool(top_n=1)
+    pool.load_popularity([("Cached Pool Title", 1)])
+    asyncio.run(pool.fill_once())
+    monkeypatch.setattr(pregen, "pool", pool)
+    monkeypatch.setattr(settings, "pregen_enabled", True)
+    monkeypatch.setattr(settings, "generation_cache_enabled", True)
+    llm_calls = generation_cache.stats()["llm_calls"]
+
+    texts = [client.post("/api/questions/generate", json={"job_title": "Cached Pool Title"}).json()
+             ["questions"][0]["text"] for _ in range(2)]
+    # Both batches came from the pool, and neither went through (or into) the cache
+    assert texts == ["Pooled question 1 for Cached Pool Title?", "Pooled question 2 for Cached Pool Title?"]
+    assert pool.stats()["hits"] == 2 and generation_cache.stats()["llm_calls"] == llm_calls
+    assert generation_cache.memory.get("cached pool title") is None
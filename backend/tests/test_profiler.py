@@ -0,0 +1,49 @@
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import profiler
+from app.config import settings
+from app.database import async_engine
+from app.main import app
+
+
+def test_normalize_sql():
+    assert profiler.normalize_sql(
+        "SELECT * FROM questions\n WHERE id = ? AND text = 'it''s' LIMIT 10"
+    ) == "SELECT * FROM questions WHERE id = ? AND text = ? LIMIT ?"
+    assert profiler.normalize_sql(
+        "SELECT id FROM questions WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)"
+    ) == profiler.normalize_sql("SELECT id FROM questions WHERE id IN (:a)")
+
+
+def test_profiler_headers_and_n_plus_one(engine, db_session, caplog, monkeypatch):
+    profiler.instrument_engine(async_engine.sync_engine)
+    profiler.instrument_engine(engine)
+    monkeypatch.setattr(settings, "query_profiler_slow_ms", 0)
+    client = TestClient(profiler.QueryProfilerMiddleware(app))
+
+    res = client.post("/api/questions", json={
+        "job_title": "Profiled Dev", "questions": [{"type": "technical", "text": "What is a query plan?"}],
+    })
+    assert res.status_code == 201
+    count = int(res.headers["x-query-count"])
+    assert count >= 2
+    assert res.headers["server-timing"].startswith("db;dur=")
+
+    # Same statement shape in a loop, as a lazy-load N+1 would produce
+    token = profiler.current_profile.set(profiler.RequestProfile())
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.profiler"):
+            for i in range(settings.query_profiler_n_plus_one_threshold):
+                db_session.execute(text(f"SELECT {i}"))
+            profile = profiler.current_profile.get()
+            profiler._report({"method": "GET", "path": "/x"}, profile)
+    finally:
+        profiler.current_profile.reset(token)
+    assert profile.repeated_shapes(settings.query_profiler_n_plus_one_threshold) == [
+        ("SELECT ?", settings.query_profiler_n_plus_one_threshold)
+    ]
+    assert any("possible N+1" in r.message for r in caplog.records)
+    assert any("slow query" in r.message for r in caplog.records)
@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import ratelimit
+from app.config import settings
+from app.database import async_engine
+from app.main import app
+
+
+def test_parse_and_match_rules():
+    rules = ratelimit.parse_rules("post /api/questions/generate=10/60:5, PATCH /api/questions/{qid}=1/2")
+    assert [r.name for r in rules] == ["POST /api/questions/generate", "PATCH /api/questions/{qid}"]
+    assert rules[0].burst == 5 and rules[1].burst == 1 and rules[1].per_second == 0.5
+    assert ratelimit.match_rule(rules, "PATCH", "/api/questions/42") is rules[1]
+    assert ratelimit.match_rule(rules, "PATCH", "/api/questions/42/x") is None
+    assert ratelimit.match_rule(rules, "GET", "/api/questions/generate") is None
+    for bad in ("POST /x=abc/60", "/x=1/60", "POST /x=1/0", "POST /x=1/60:0"):
+        with pytest.raises(ValueError):
+            ratelimit.parse_rules(bad)
+
+
+def test_memory_token_bucket_refills():
+    rule = ratelimit.parse_rules("POST /x=2/10:2")[0]
+    backend = ratelimit.MemoryBackend(max_keys=2)
+    take = lambda key, now: asyncio.run(backend.take(key, rule, now))
+    assert take("a", 0)[0] and take("a", 0)[0]
+    allowed, tokens = take("a", 0)
+    assert not allowed and ratelimit.retry_after(tokens, rule) == pytest.approx(5)
+    assert take("a", 5)[0]  # 2 tokens per 10s: one back after 5s
+    assert take("b", 5)[0] and take("c", 5)[0]
+    assert len(backend._buckets) == 2  # LRU-bounded
+
+
+def test_generate_is_rate_limited_per_client(monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "stub")
+    monkeypatch.setattr(settings, "generation_cache_enabled", False)
+    limiter = ratelimit.RateLimiter(
+        ratelimit.parse_rules("POST /api/questions/generate=2/60"), ratelimit.MemoryBackend(100),
+    )
+    client = TestClient(ratelimit.AdmissionMiddleware(app, limiter=limiter, max_in_flight=0))
+    body = {"job_title": "Limited"}
+    assert [client.post("/api/questions/generate", json=body).status_code for _ in range(2)] == [200, 200]
+    res = client.post("/api/questions/generate", json=body)
+    assert res.status_code == 429 and res.json() == {"detail": "Rate limit exceeded"}
+    assert int(res.headers["retry-after"]) >= 29
+    assert res.headers["x-ratelimit-limit"] == "2/60s"
+    # Other clients and other routes keep their own budget
+    assert client.post("/api/questions/generate", json=body, headers={"X-API-Key": "k1"}).status_code == 200
+    assert client.get("/api/stats").status_code == 200
+    assert limiter.limited == 1
+
+
+def test_db_backend_shares_buckets():
+    rule = ratelimit.parse_rules("POST /x=1/60:2")[0]
+    backend = ratelimit.DBBackend()
+
+    async def run():
+        try:
+            results = [await backend.take("POST /x|ip:1", rule, 1000.0) for _ in range(3)]
+            # A second backend instance (another worker) sees the same bucket
+            results.append(await ratelimit.DBBackend().take("POST /x|ip:1", rule, 1000.0))
+            results.append(await backend.take("POST /x|ip:1", rule, 1060.0))
+            results.append(await backend.take("POST /x|ip:2", rule, 1000.0))
+            return results
+        finally:
+            await async_engine.dispose()
+
+    results = asyncio.run(run())
+    assert [allowed for allowed, _ in results] == [True, True, False, False, True, True]
+    assert results[1][1] == pytest.approx(0) and results[4][1] == pytest.approx(0)
+
+
+def test_in_flight_limit_sheds_with_503():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limiter = ratelimit.RateLimiter([], ratelimit.MemoryBackend(10))
+    middleware = ratelimit.AdmissionMiddleware(slow_app, limiter=limiter, max_in_flight=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/api/questions"))
+            while middleware.in_flight == 0:
+                await asyncio.sleep(0.001)
+            shed = await client.get("/api/questions")
+            health = asyncio.ensure_future(client.get("/healthz"))
+            release.set()
+            return (await first).status_code, shed, (await health).status_code
+
+    first, shed, health = asyncio.run(run())
+    assert first == 200 and health == 200
+    assert shed.status_code == 503 and shed.headers["retry-after"] == "1"
+    assert middleware.shed == 1 and middleware.in_flight == 0
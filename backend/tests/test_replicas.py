@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import models, replicas, stats as app_stats
+from app.database import Base
+from app.main import app
+
+
+@pytest.fixture
+def replica(engine, tmp_path, monkeypatch):
+    """A second SQLite database standing in for a replica, with one set of its own."""
+    url = f"sqlite+pysqlite:///{tmp_path / 'replica.db'}"
+    replica_engine = create_engine(url)
+    Base.metadata.create_all(replica_engine)
+    with Session(replica_engine) as db:
+        qa_set = models.QASet(job_title="Replica Job")
+        qa_set.questions.append(models.Question(type=models.QuestionType.technical, text="Only on the replica?"))
+        db.add(qa_set)
+        db.flush()
+        app_stats.rebuild(db)
+        db.commit()
+        set_id = qa_set.id
+
+    broken = f"sqlite+pysqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    router = replicas.ReplicaRouter([url, broken], retry_seconds=60)
+    monkeypatch.setattr(replicas, "router", router)
+    yield router, set_id
+    replica_engine.dispose()
+
+
+def _texts(client, set_id, **kwargs):
+    res = client.get(f"/api/questions?set_id={set_id}", **kwargs)
+    assert res.status_code == 200
+    return [q["text"] for q in res.json()["items"]]
+
+
+def test_reads_use_replica_and_fail_over(client, replica):
+    router, set_id = replica
+    assert _texts(client, set_id) == ["Only on the replica?"]
+    # Round robin reaches the unreachable replica, marks it down and retries the healthy one
+    assert _texts(client, set_id) == ["Only on the replica?"]
+    assert client.get("/api/stats").json()["total_questions"] == 1
+
+    health = client.get("/healthz").json()
+    assert [r["healthy"] for r in health["replicas"]] == [True, False]
+    assert health["failovers"] == 1
+    assert router.reads[0] >= 3
+
+    # Explicit primary read
+    assert "Only on the replica?" not in _texts(client, set_id, headers={"X-Read-Primary": "1"})
+
+
+def test_all_replicas_down_falls_back_to_primary(client, replica):
+    router, _ = replica
+    router._down_until[0] = float("inf")
+    assert client.get("/api/stats").status_code == 200
+    assert router.primary_fallbacks >= 1
+
+
+def test_exhausted_replica_pool_falls_back(client, replica):
+    router, _ = replica
+    router._down_until[1] = float("inf")
+
+    class ExhaustedPool:
+        async def connection(self):
+            raise PoolTimeoutError("QueuePool limit of size 5 overflow 10 reached")
+
+        async def close(self):
+            pass
+
+    router._sessionmakers[0] = ExhaustedPool
+    assert client.get("/api/stats").status_code == 200
+    assert router.primary_fallbacks >= 1 and router.failovers == 1
+    assert router.stats()["replicas"][0]["healthy"] is False
+
+
+def test_primary_pin_after_write(replica):
+    client = TestClient(replicas.PrimaryPinMiddleware(app))
+    res = client.post("/api/questions", json={
+        "job_title": "Pinned Dev", "questions": [{"type": "technical", "text": "Is this read from the primary?"}],
+    })
+    assert res.status_code == 201
+    assert replicas.PIN_COOKIE in res.headers["set-cookie"]
+    # The client sends the pin cookie back, so it reads its own write
+    assert _texts(client, res.json()["id"]) == ["Is this read from the primary?"]
+    assert replicas.wants_primary({}, {replicas.PIN_COOKIE: "0"}) is False
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import numpy as np
+
+from app import dedup, models, similar
+from app.database import SessionLocal
+
+
+class _FlakySessions:
+    """Session factory that fails the first `failures` loads and runs `during` inside each load."""
+
+    def __init__(self, failures=0, during=None):
+        self.failures, self.during, self.calls = failures, during, 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("database unavailable")
+        if self.during is not None:
+            self.during()
+        return SessionLocal()
+
+
+def _ids(items):
+    return [q["id"] for q in items]
+
+
+def test_embedding_is_normalized_and_stable():
+    texts = ["How do you design a rate limiter?", "Design a rate limiter for an API", "", "Tell me about a conflict"]
+    docs, terms, tf = similar.term_counts(texts)
+    df = np.zeros(similar.DF_SLOTS, np.int32)
+    similar.count_docs(df, terms)
+    vectors = similar.embed(docs, terms, tf, len(texts), 64, df, len(texts))
+    assert vectors.shape == (4, 64) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[[0, 1, 3]], axis=1), 1.0) and not vectors[2].any()
+    scores = vectors @ vectors[0]
+    assert scores[1] > 0.3 > scores[3]
+    # Same text, same vector, in any batch
+    again = similar.embed(*similar.term_counts([texts[1]]), 1, 64, df, len(texts))
+    assert np.allclose(again[0], vectors[1])
+
+
+def test_similar_endpoint(client):
+    res = client.post("/api/questions", json={"job_title": "Similar Pelican", "questions": [
+        {"type": "technical", "text": "How would you shard a pelican database across regions?"},
+        {"type": "technical", "text": "Explain sharding a pelican database by region"},
+        {"type": "behavioral", "text": "Describe a time you mentored a junior pelican engineer"},
+    ]})
+    assert res.status_code == 201
+    items = client.get(f"/api/questions?set_id={res.json()['id']}").json()["items"]
+    shard, shard2, mentor = sorted(_ids(items))
+
+    data = client.get(f"/api/questions/{shard}/similar?k=10").json()
+    ids = _ids(data["items"])
+    assert data["id"] == shard and shard not in ids
+    assert shard2 in ids and (mentor not in ids or ids.index(shard2) < ids.index(mentor))
+    assert data["items"][ids.index(shard2)]["text"].startswith("Explain sharding")
+    scores = [q["score"] for q in data["items"]]
+    assert scores == sorted(scores, reverse=True) and scores[-1] > 0
+
+    # Deletes are applied to the index right away
+    assert client.delete(f"/api/questions/{shard2}").status_code == 200
+    assert shard2 not in _ids(client.get(f"/api/questions/{shard}/similar").json()["items"])
+    assert client.get(f"/api/questions/{shard2}/similar").status_code == 404
+    assert client.get(f"/api/questions/{mentor}/similar?k=51").status_code == 422
+    assert similar.index.stats()["ready"] is True
+
+
+def test_index_persists_and_catches_up(client, tmp_path):
+    res = client.post("/api/questions", json={"job_title": "Persisted Heron", "questions": [
+        {"type": "technical", "text": "What is heron consistent hashing?"},
+        {"type": "technical", "text": "Explain heron consistent hashing with virtual nodes"},
+    ]})
+    first, second = sorted(_ids(client.get(f"/api/questions?set_id={res.json()['id']}").json()["items"]))
+
+    index = similar.SimilarIndex(32, str(tmp_path))
+    index.load()
+    total = index.count
+    assert index.stats()["persisted"] and not index.loaded_from_disk and index.embedded == total
+    before = index.query(first, 3)
+    asyncio.run(index.aclose())
+
+    # Written while the index was down: one question deleted, one added (SQLite may reuse the id)
+    text = "Heron consistent hashing ring rebalancing"
+    with SessionLocal() as db:
+        db.query(models.Question).filter(models.Question.id == second).delete()
+        added = models.Question(set_id=res.json()["id"], type=models.QuestionType.technical, text=text,
+                                content_hash=dedup.content_hash(text))
+        db.add(added)
+        db.commit()
+        added_id = added.id
+
+    reopened = similar.SimilarIndex(32, str(tmp_path))
+    reopened.load()
+    assert reopened.loaded_from_disk and reopened.embedded == 1 and reopened.count >= total
+    hits = dict(reopened.query(first, 10))
+    assert added_id in hits and (second == added_id or second not in hits)
+    assert dict(before)[second] > 0
+    asyncio.run(reopened.aclose())
+
+
+def test_meta_is_saved_on_flush_not_per_write(client, tmp_path):
+    index = similar.SimilarIndex(16, str(tmp_path))
+    index.load()
+
+    def saved_count():
+        with open(tmp_path / "meta.json") as f:
+            return json.load(f)["count"]
+
+    count = index.count
+    assert saved_count() == count
+    index.add([(10**9, "Egret write batching question"), (10**9 + 1, "Another egret question")])
+    index.remove([10**9])
+    assert index.count == count + 2 and saved_count() == count
+    index.flush()
+    assert saved_count() == count + 2
+    asyncio.run(index.aclose())
+
+
+def test_failed_load_drops_queued_writes_and_retries(monkeypatch):
+    monkeypatch.setattr(similar, "_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(similar, "_MAX_PENDING", 3)
+    sessions = _FlakySessions(failures=1)
+    index = similar.SimilarIndex(16, session_factory=sessions)
+    index._load_logged()
+    assert not index._ready.is_set() and index._pending == []
+
+    # Writes while the index is down are capped, not queued forever
+    for i in range(10):
+        index.add([(10**9 + i, f"Queued osprey question {i}")])
+    assert index._pending == [] and index._overflowed
+    assert asyncio.run(index.wait_ready(5)) and sessions.calls == 2
+    assert index._pending == [] and not index._overflowed
+    asyncio.run(index.aclose())
+
+
+def test_overflow_during_load_reconciles_again(client, monkeypatch):
+    res = client.post("/api/questions", json={"job_title": "Overflow Stork", "questions": [
+        {"type": "technical", "text": "How does a stork cache stay warm?"},
+    ]})
+    (qid,) = _ids(client.get(f"/api/questions?set_id={res.json()['id']}").json()["items"])
+    monkeypatch.setattr(similar, "_MAX_PENDING", 1)
+
+    def writes_while_loading():
+        if sessions.calls == 1:
+            index.add([(qid, "How does a stork cache stay warm?")])
+            index.remove([qid + 1])
+    sessions = _FlakySessions(during=writes_while_loading)
+    index = similar.SimilarIndex(16, session_factory=sessions)
+    index.load()
+    # The dropped writes were covered by a second pass over the database
+    assert sessions.calls == 2 and index._ready.is_set() and index.query(qid, 5) is not None